@@ -0,0 +1,123 @@
+from django.db import transaction
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery, Window
+from django.db.models.functions import Coalesce, RowNumber
+
+from tasks.models import (
+    Task,
+    Annotation,
+    ANNOTATOR_ANNOTATION,
+    REVIEWER_ANNOTATION,
+    SUPER_CHECKER_ANNOTATION,
+)
+
+"""
+Deduplication of the items of a dataset instance
+
+Items are grouped by the values of the deduplication fields in the database.
+In every group, the item with the most annotations is kept (the oldest one on
+a tie) and every other item is deleted along with its tasks and annotations.
+"""
+
+DEDUPLICATION_CHUNK_SIZE = 1000
+
+# Annotations are deleted children first, parent_annotation is a protected
+# foreign key
+ANNOTATION_DELETION_ORDER = (
+    SUPER_CHECKER_ANNOTATION,
+    REVIEWER_ANNOTATION,
+    ANNOTATOR_ANNOTATION,
+)
+
+
+def get_count_subquery(queryset, group_field):
+    return Coalesce(
+        Subquery(
+            queryset.order_by()
+            .values(group_field)
+            .annotate(total=Count("id"))
+            .values("total"),
+            output_field=IntegerField(),
+        ),
+        0,
+    )
+
+
+def iter_duplicate_items(dataset_model, dataset_instance, deduplicate_field_list):
+    """
+    Yield (item id, task count, annotation count) for every item of the dataset
+    instance which has to be deleted as a duplicate, with a single query
+    """
+    items = (
+        dataset_model.objects.filter(instance_id=dataset_instance)
+        .annotate(
+            task_count=get_count_subquery(
+                Task.objects.filter(input_data=OuterRef("pk")), "input_data"
+            ),
+            annotation_count=get_count_subquery(
+                Annotation.objects.filter(task__input_data=OuterRef("pk")),
+                "task__input_data",
+            ),
+        )
+        .annotate(
+            duplicate_rank=Window(
+                expression=RowNumber(),
+                partition_by=[F(field) for field in deduplicate_field_list],
+                order_by=[F("annotation_count").desc(), F("id").asc()],
+            )
+        )
+        .order_by()
+        .values_list("id", "duplicate_rank", "task_count", "annotation_count")
+    )
+    for item_id, duplicate_rank, task_count, annotation_count in items.iterator(
+        chunk_size=DEDUPLICATION_CHUNK_SIZE
+    ):
+        if duplicate_rank > 1:
+            yield item_id, task_count, annotation_count
+
+
+def delete_dataset_items(dataset_model, item_ids):
+    """
+    Delete dataset items with their annotations and tasks
+    """
+    with transaction.atomic():
+        for annotation_type in ANNOTATION_DELETION_ORDER:
+            Annotation.objects.filter(
+                task__input_data_id__in=item_ids, annotation_type=annotation_type
+            ).delete()
+        dataset_model.objects.filter(pk__in=item_ids).delete()
+
+
+def deduplicate_dataset_items(
+    dataset_model, dataset_instance, deduplicate_field_list, dry_run=False
+):
+    """
+    Remove the duplicate items of a dataset instance.
+
+    Args:
+        dataset_model: Model of the dataset instance's items
+        dataset_instance (DatasetInstance): The dataset instance to deduplicate
+        deduplicate_field_list (list): Fields whose values identify a duplicate
+        dry_run (bool): Only count the duplicates, without deleting anything
+
+    Returns:
+        tuple: Number of dataset items, tasks and annotations (to be) deleted
+    """
+    dataset_items_count = 0
+    tasks_count = 0
+    annotations_count = 0
+    item_ids = []
+    for item_id, task_count, annotation_count in iter_duplicate_items(
+        dataset_model, dataset_instance, deduplicate_field_list
+    ):
+        dataset_items_count += 1
+        tasks_count += task_count
+        annotations_count += annotation_count
+        if dry_run:
+            continue
+        item_ids.append(item_id)
+        if len(item_ids) >= DEDUPLICATION_CHUNK_SIZE:
+            delete_dataset_items(dataset_model, item_ids)
+            item_ids = []
+    if item_ids:
+        delete_dataset_items(dataset_model, item_ids)
+    return dataset_items_count, tasks_count, annotations_count
@@ -0,0 +1,386 @@
+import json
+import os
+import uuid
+
+import pandas as pd
+import yaml
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files.storage import default_storage
+from django.db import connection, models, transaction
+from openpyxl import load_workbook
+
+from utils.custom_bulk_create import multi_inheritance_table_bulk_insert
+
+"""
+Streaming ingestion of the files uploaded to a dataset instance
+
+The uploaded file is saved once to the default storage and only its name is
+sent to the celery worker. The worker reads the rows in chunks of
+DATASET_UPLOAD_CHUNK_SIZE, validates every column of a chunk at once with
+pandas and inserts the valid rows with multi_inheritance_table_bulk_insert.
+
+An upload is all or nothing like the tablib import it replaces: the rows are
+inserted in a single transaction which is rolled back when any row is
+invalid, and the invalid rows are reported with their errors. As with the
+import resources, whose import_id_fields is id with force_init_instance, a
+row with an id is inserted with that id and is invalid if the id is taken.
+The values of the unique fields are checked against the database and the
+previous rows. csv, tsv and xlsx files are read as a stream, xls, json and
+yaml files are loaded at once and then processed in chunks.
+
+The values seen in the previous chunks, the unique values and the hashes of
+the rows for the deduplication, are kept in a temporary table of the upload
+transaction instead of the memory of the worker.
+"""
+
+# Value of the cells which are left to the default of their field
+USE_DEFAULT = object()
+
+INTEGER_FIELDS = (
+    models.IntegerField,
+    models.BigIntegerField,
+    models.SmallIntegerField,
+    models.PositiveIntegerField,
+    models.PositiveSmallIntegerField,
+)
+
+
+class IngestionError(Exception):
+    pass
+
+
+def store_dataset_file(dataset_file, content_type):
+    """
+    Save an uploaded dataset file to the default storage and return its name
+    """
+    name = os.path.join(
+        settings.DATASET_UPLOAD_DIR, f"{uuid.uuid4().hex}.{content_type}"
+    )
+    return default_storage.save(name, dataset_file)
+
+
+def iter_record_chunks(records, chunk_size):
+    for start in range(0, len(records), chunk_size):
+        yield pd.DataFrame.from_records(records[start : start + chunk_size])
+
+
+def iter_xlsx_chunks(dataset_file, chunk_size):
+    workbook = load_workbook(dataset_file, read_only=True, data_only=True)
+    rows = workbook.active.iter_rows(values_only=True)
+    headers = next(rows, None)
+    if headers is None:
+        return
+    columns = [i for i, header in enumerate(headers) if header is not None]
+    headers = [str(headers[i]) for i in columns]
+    chunk = []
+    for row in rows:
+        chunk.append(
+            ["" if i >= len(row) or row[i] is None else str(row[i]) for i in columns]
+        )
+        if len(chunk) == chunk_size:
+            yield pd.DataFrame(chunk, columns=headers)
+            chunk = []
+    if chunk:
+        yield pd.DataFrame(chunk, columns=headers)
+    workbook.close()
+
+
+def iter_file_chunks(dataset_file, content_type, chunk_size):
+    """
+    Yield the rows of a dataset file as DataFrames of at most chunk_size rows.
+    The cells of csv, tsv and excel files are strings, empty for empty
+    cells, json and yaml files keep their values.
+    """
+    if content_type in ["csv", "tsv"]:
+        yield from pd.read_csv(
+            dataset_file,
+            sep="\t" if content_type == "tsv" else ",",
+            dtype=str,
+            keep_default_na=False,
+            chunksize=chunk_size,
+            encoding="utf-8",
+        )
+    elif content_type == "xlsx":
+        yield from iter_xlsx_chunks(dataset_file, chunk_size)
+    elif content_type == "xls":
+        data = pd.read_excel(dataset_file, dtype=str, keep_default_na=False)
+        for start in range(0, len(data), chunk_size):
+            yield data.iloc[start : start + chunk_size]
+    elif content_type == "json":
+        yield from iter_record_chunks(json.load(dataset_file), chunk_size)
+    elif content_type == "yaml":
+        yield from iter_record_chunks(yaml.safe_load(dataset_file), chunk_size)
+    else:
+        raise IngestionError(f"Unsupported file format: {content_type}")
+
+
+def get_import_fields(model):
+    """
+    Fields of a dataset model which are read from the uploaded files, the id
+    of DatasetBase but not the link of the dataset model to it
+    """
+    return [
+        field
+        for field in model._meta.concrete_fields
+        if (not field.primary_key or field.name == "id") and field.name != "instance_id"
+    ]
+
+
+class SeenValues(object):
+    """
+    Values seen by an upload so far, in a temporary table dropped at the end
+    of the upload transaction
+    """
+
+    table = "dataset_upload_seen_values"
+
+    def __init__(self):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"CREATE TEMPORARY TABLE IF NOT EXISTS {self.table} "
+                "(name text, value text, PRIMARY KEY (name, value)) ON COMMIT DROP"
+            )
+
+    def add(self, name, values):
+        """
+        Add distinct values under a name and return the ones which weren't
+        seen before
+        """
+        if not values:
+            return set()
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"INSERT INTO {self.table} (name, value) "
+                "SELECT %s, unnest(%s::text[]) ON CONFLICT DO NOTHING RETURNING value",
+                [name, [str(value) for value in values]],
+            )
+            return {value for (value,) in cursor.fetchall()}
+
+
+def add_errors(errors, mask, message):
+    errors[mask] = errors[mask] + message + "; "
+
+
+def clean_values(field, values, errors):
+    """
+    Convert the non empty values of a field, adding the errors of the
+    invalid values to errors
+    """
+    if isinstance(field, models.JSONField):
+
+        def parse_json(value):
+            return json.loads(value) if isinstance(value, str) else value
+
+        cleaned = pd.Series(index=values.index, dtype=object)
+        for index, value in values.items():
+            try:
+                cleaned[index] = parse_json(value)
+            except ValueError:
+                errors[index] += f"{field.name}: Enter a valid JSON; "
+        return cleaned
+
+    values = values.astype(str)
+    if isinstance(field, INTEGER_FIELDS + (models.ForeignKey,)):
+        numbers = pd.to_numeric(values, errors="coerce")
+        invalid = numbers.isna() | (numbers % 1 != 0)
+        add_errors(
+            errors, invalid[invalid].index, f"{field.name}: Enter a whole number"
+        )
+        return numbers[~invalid].astype("int64").astype(object)
+    if isinstance(field, (models.DecimalField, models.FloatField)):
+        numbers = pd.to_numeric(values, errors="coerce")
+        add_errors(
+            errors, numbers[numbers.isna()].index, f"{field.name}: Enter a number"
+        )
+        if isinstance(field, models.FloatField):
+            return numbers.astype(object)
+        return values
+    if isinstance(field, models.BooleanField):
+        booleans = values.str.lower().map(
+            {"true": True, "1": True, "false": False, "0": False}
+        )
+        add_errors(
+            errors,
+            booleans[booleans.isna()].index,
+            f"{field.name}: Must be true or false",
+        )
+        return booleans.astype(object)
+
+    if field.max_length is not None:
+        too_long = values.str.len() > field.max_length
+        add_errors(
+            errors,
+            too_long[too_long].index,
+            f"{field.name}: Ensure this value has at most {field.max_length} characters",
+        )
+    if field.choices:
+        invalid = ~values.isin([str(choice) for choice, _ in field.flatchoices])
+        add_errors(errors, invalid[invalid].index, f"{field.name}: Invalid choice")
+    if field.validators and not field.choices:
+        for index, value in values.items():
+            try:
+                for validator in field.validators:
+                    validator(value)
+            except ValidationError as e:
+                errors[index] += f"{field.name}: {' '.join(e.messages)}; "
+    return values
+
+
+def clean_chunk(chunk, fields):
+    """
+    Validate and convert the rows of a chunk.
+
+    Returns:
+        tuple: DataFrame of the values of the rows by field attname, with
+            USE_DEFAULT for the cells left to the field default, and Series
+            of the errors of every row, empty for the valid rows.
+    """
+    errors = pd.Series("", index=chunk.index, dtype=object)
+    cleaned = pd.DataFrame(index=chunk.index)
+    for field in fields:
+        if field.name in chunk.columns:
+            values = chunk[field.name]
+        else:
+            values = pd.Series("", index=chunk.index, dtype=object)
+        empty = values.isna() | (values == "")
+
+        if field.primary_key or field.has_default():
+            empty_value = USE_DEFAULT
+        elif field.null:
+            empty_value = None
+        elif field.blank and isinstance(field, (models.CharField, models.TextField)):
+            empty_value = ""
+        else:
+            empty_value = USE_DEFAULT
+            add_errors(
+                errors, empty[empty].index, f"{field.name}: This field cannot be blank"
+            )
+
+        column = pd.Series(empty_value, index=chunk.index, dtype=object)
+        non_empty = values[~empty]
+        if len(non_empty):
+            converted = clean_values(field, non_empty, errors)
+            column[converted.index] = converted
+
+        if isinstance(field, models.ForeignKey):
+            ids = column[column.map(lambda value: isinstance(value, int))]
+            existing_ids = set(
+                field.related_model._default_manager.filter(
+                    pk__in=set(ids)
+                ).values_list("pk", flat=True)
+            )
+            missing = ids[~ids.isin(existing_ids)]
+            add_errors(errors, missing.index, f"{field.name}: Object does not exist")
+        cleaned[field.attname] = column
+    return cleaned, errors
+
+
+def check_unique_values(fields, cleaned, errors, seen_values):
+    """
+    Add an error to the rows whose value of a unique field is already in the
+    database or in a previous row
+    """
+    for field in fields:
+        if not field.unique:
+            continue
+        column = cleaned[field.attname]
+        valid = errors == ""
+        values = column[
+            valid & column.map(lambda value: value is not USE_DEFAULT)
+        ].dropna()
+        if values.empty:
+            continue
+        existing = set(
+            field.model._default_manager.filter(
+                **{f"{field.attname}__in": set(values)}
+            ).values_list(field.attname, flat=True)
+        )
+        new_values = seen_values.add(field.attname, set(values) - existing)
+        taken = values[
+            values.duplicated() | ~values.map(lambda value: str(value) in new_values)
+        ]
+        add_errors(
+            errors,
+            taken.index,
+            f"{field.name}: {field.model._meta.verbose_name.capitalize()} with this "
+            f"{field.verbose_name} already exists",
+        )
+
+
+def ingest_dataset_file(
+    file_name, model, instance_id, content_type, deduplicate, progress_callback=None
+):
+    """
+    Insert the rows of a stored dataset file into a dataset instance.
+
+    Args:
+        file_name (str): Name of the file in the default storage.
+        model: Dataset model of the instance.
+        instance_id (int): ID of the dataset instance.
+        content_type (str): Format of the file.
+        deduplicate (bool): Skip the rows identical to a previous row.
+        progress_callback (function, optional): Called with the number of
+            rows processed and the number of invalid rows after every chunk.
+
+    Returns:
+        tuple: Number of rows processed, number of invalid rows, and a list
+            of (row number, errors) of the invalid rows, at most
+            DATASET_UPLOAD_MAX_REPORTED_ERRORS. Nothing is inserted when
+            there are invalid rows.
+    """
+    fields = get_import_fields(model)
+    processed_count = 0
+    failed_count = 0
+    failed_rows = []
+    row_number = 0
+
+    with transaction.atomic(), default_storage.open(file_name, "rb") as dataset_file:
+        seen_values = SeenValues()
+        for chunk in iter_file_chunks(
+            dataset_file, content_type, settings.DATASET_UPLOAD_CHUNK_SIZE
+        ):
+            # Number the rows from 1 in the order of the file
+            chunk = chunk.set_axis(
+                range(row_number + 1, row_number + len(chunk) + 1), axis=0
+            )
+            row_number += len(chunk)
+            if deduplicate:
+                row_hashes = pd.util.hash_pandas_object(chunk.astype(str), index=False)
+                new_hashes = seen_values.add("row_hash", set(row_hashes))
+                duplicated = row_hashes.duplicated() | ~row_hashes.map(
+                    lambda row_hash: str(row_hash) in new_hashes
+                )
+                chunk = chunk[~duplicated]
+
+            cleaned, errors = clean_chunk(chunk, fields)
+            check_unique_values(fields, cleaned, errors, seen_values)
+            invalid = errors != ""
+            processed_count += len(chunk)
+            failed_count += int(invalid.sum())
+            for number, row_errors in errors[invalid].items():
+                if len(failed_rows) < settings.DATASET_UPLOAD_MAX_REPORTED_ERRORS:
+                    failed_rows.append((number, row_errors.rstrip("; ")))
+
+            # Once a row is invalid nothing is inserted, the remaining rows
+            # are only validated
+            if not failed_count:
+                multi_inheritance_table_bulk_insert(
+                    [
+                        model(
+                            instance_id_id=instance_id,
+                            **{
+                                attname: value
+                                for attname, value in record.items()
+                                if value is not USE_DEFAULT
+                            },
+                        )
+                        for record in cleaned.to_dict("records")
+                    ]
+                )
+            if progress_callback is not None:
+                progress_callback(processed_count, failed_count)
+
+        if failed_count:
+            transaction.set_rollback(True)
+    return processed_count, failed_count, failed_rows
@@ -1,14 +1,12 @@
 import ast
 import json
 import re
-from base64 import b64encode
 from urllib.parse import parse_qsl
 from utils.pagination import paginate_queryset
 from django.apps import apps
 from django.db.models import Q
 from django.http import StreamingHttpResponse
 from django.shortcuts import get_object_or_404
-from django_celery_results.models import TaskResult
 from users.serializers import UserFetchSerializer
 from filters import filter
 from projects.serializers import ProjectSerializer
@@ -38,8 +36,16 @@ from projects.utils import (
 from . import resources
 from .models import *
 from .serializers import *
+from .ingestion import store_dataset_file
 from .tasks import upload_data_to_data_instance, deduplicate_dataset_instance_items
 import dataset
+from tasks.async_jobs import (
+    get_job_result,
+    get_job_status_date_time,
+    get_jobs,
+    get_latest_job,
+    get_task_results,
+)
 from tasks.models import (
     Task,
     Annotation,
@@ -50,25 +56,6 @@ from tasks.models import (
 
 
 ## Utility functions used inside the view functions
-def extract_status_date_time_from_task_queryset(task_queryset):
-    # Sort the tasks by newest items first by date
-    task_queryset = task_queryset.order_by("-date_done")
-
-    # Get the export task status and last update date
-    task_status = task_queryset.first().as_dict()["status"]
-    task_datetime = task_queryset.first().as_dict()["date_done"]
-
-    # Remove quotes from the status if it is present in the string
-    if '"' in task_status:
-        task_status = task_status.strip('"')
-
-    # Extract date and time from the datetime object
-    task_date = task_datetime.date()
-    task_time = f"{str(task_datetime.time().replace(microsecond=0))} UTC"
-
-    return task_status, task_date, task_time
-
-
 def get_project_export_status(pk):
     """Function to return status of the project export background task.
 
@@ -81,28 +68,18 @@ def get_project_export_status(pk):
         str: Time when the last time project was exported
     """
 
-    # Create the keyword argument for project ID
-    project_id_keyword_arg = "'project_id': " + "'" + str(pk) + "'" + ","
-
     # Check the celery project export status
-    task_queryset = TaskResult.objects.filter(
-        task_name__in=[
+    job = get_latest_job(
+        [
             "projects.tasks.export_project_in_place",
             "projects.tasks.export_project_new_record",
         ],
-        # task_name = 'projects.tasks.export_project_in_place',
-        task_kwargs__contains=project_id_keyword_arg,
+        project_id=pk,
     )
 
-    # If the celery TaskResults table returns
-    if task_queryset:
-        (
-            task_status,
-            task_date,
-            task_time,
-        ) = extract_status_date_time_from_task_queryset(task_queryset)
-
-        return task_status, task_date, task_time
+    # If the project has been exported
+    if job is not None:
+        return get_job_status_date_time(job)
 
     return (
         "Success",
@@ -123,46 +100,24 @@ def get_dataset_upload_status(dataset_instance_pk):
         str: Time when the last time dataset was uploaded
     """
 
-    # Create the keyword argument for dataset instance ID
-    instance_id_keyword_arg = "{'pk': " + "'" + str(dataset_instance_pk) + "'" + ","
-
-    # Check the celery project export status
-    task_queryset = TaskResult.objects.filter(
-        task_name="dataset.tasks.upload_data_to_data_instance",
-        task_kwargs__contains=instance_id_keyword_arg,
+    # Check the celery dataset upload status
+    job = get_latest_job(
+        ["dataset.tasks.upload_data_to_data_instance"],
+        dataset_instance_id=dataset_instance_pk,
     )
 
-    # If the celery TaskResults table returns data
-    if task_queryset:
-        (
-            task_status,
-            task_date,
-            task_time,
-        ) = extract_status_date_time_from_task_queryset(task_queryset)
-
-        # Sort the tasks by newest items first by date
-        task_queryset = task_queryset.order_by("-date_done")
-
-        # Get the export task status and last update date
-        task_status = task_queryset.first().as_dict()["status"]
-        task_datetime = task_queryset.first().as_dict()["date_done"]
-        task_result = task_queryset.first().as_dict()["result"]
+    # If a dataset has been uploaded
+    if job is not None:
+        task_status, task_date, task_time = get_job_status_date_time(job)
+        task_result = get_job_result(job) or "None"
 
         # Convert task result
         if "exc_message" in task_result:
             task_result = ast.literal_eval(task_result)["exc_message"]
 
-        # Remove quotes from the status if it is present in the string
-        if '"' in task_status:
-            task_status = task_status.strip('"')
-
         if '"' in task_result:
             task_result = task_result.strip('"')
 
-        # Extract date and time from the datetime object
-        task_date = task_datetime.date()
-        task_time = f"{str(task_datetime.time().replace(microsecond=0))} UTC"
-
         # Get the error messages if the task is a failure
         if task_status == "FAILURE":
             task_status = "Ingestion Failed!"
@@ -372,13 +327,9 @@ class DatasetInstanceViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
-        # Read the dataset as a string from the dataset pointer
+        # Store the file for the worker, which reads it in chunks
         try:
-            if content_type in ["xls", "xlsx"]:
-                # xls and xlsx files cannot be decoded as a string
-                dataset_string = b64encode(dataset.read()).decode()
-            else:
-                dataset_string = dataset.read().decode()
+            file_name = store_dataset_file(dataset, content_type)
         except Exception as e:
             return Response(
                 {
@@ -392,7 +343,7 @@ class DatasetInstanceViewSet(viewsets.ModelViewSet):
         upload_data_to_data_instance.delay(
             pk=pk,
             dataset_type=dataset_type,
-            dataset_string=dataset_string,
+            file_name=file_name,
             content_type=content_type,
             deduplicate=if_deduplicate,
         )
@@ -480,28 +431,14 @@ class DatasetInstanceViewSet(viewsets.ModelViewSet):
         # Check if the task name has the word projects in it
         if "projects" in task_name:
             # Get the IDs of the projects associated with the dataset instance
-            project_ids = (
+            project_ids = list(
                 apps.get_model("projects", "Project")
                 .objects.filter(dataset_id=pk)
                 .values_list("id", flat=True)
             )
 
-            # Create the project keywords list
-            project_id_keyword_args = [
-                "'project_id': " + "'" + str(pk) + "'" for pk in project_ids
-            ]
-
-            # Turn list of project ID keywords into list of Q objects
-            queries = [
-                Q(task_kwargs__contains=project_keyword)
-                for project_keyword in project_id_keyword_args
-            ]
-
-            # Handle exception when queries is empty
-            try:
-                query = queries.pop()
-
-            except IndexError:
+            # Handle exception when there are no projects
+            if not project_ids:
                 return Response(
                     {
                         "message": "No projects associated with this task.",
@@ -509,24 +446,15 @@ class DatasetInstanceViewSet(viewsets.ModelViewSet):
                     status=status.HTTP_400_BAD_REQUEST,
                 )
 
-            # Convert the list of Q objects into a single query
-            for item in queries:
-                query |= item
-
             # Get the task queryset for the task name and all the corresponding projects for this dataset
-            task_queryset = TaskResult.objects.filter(
-                query,
-                task_name=task_name,
+            task_queryset = get_task_results(
+                get_jobs([task_name], project_id__in=project_ids)
             )
 
         else:
-            # Create the keyword argument for dataset instance ID
-            instance_id_keyword_arg = "{'pk': " + "'" + str(pk) + "'" + ","
-
-            # Check the celery project export status
-            task_queryset = TaskResult.objects.filter(
-                task_name=task_name,
-                task_kwargs__contains=instance_id_keyword_arg,
+            # Check the celery tasks of the dataset instance
+            task_queryset = get_task_results(
+                get_jobs([task_name], dataset_instance_id=pk)
             )
 
         # Sort the task queryset by date and time
@@ -798,7 +726,16 @@ class DatasetInstanceViewSet(viewsets.ModelViewSet):
                 type=openapi.TYPE_ARRAY,
                 items=openapi.Items(type=openapi.TYPE_STRING),
                 required=True,
-            )
+            ),
+            openapi.Parameter(
+                "dry_run",
+                openapi.IN_QUERY,
+                description=(
+                    "If true, the duplicates are only counted and nothing is deleted"
+                ),
+                type=openapi.TYPE_BOOLEAN,
+                required=False,
+            ),
         ],
         responses={200: "Duplicate removal started"},
     )
@@ -822,8 +759,12 @@ class DatasetInstanceViewSet(viewsets.ModelViewSet):
                 {"message": "Fields list cannot be empty."},
                 status=status.HTTP_400_BAD_REQUEST,
             )
-        deduplicate_dataset_instance_items.delay(pk, deduplicate_fields_list)
-        ret_dict = {"message": "Duplicate removal started"}
+        dry_run = request.query_params.get("dry_run", "false").lower() == "true"
+        deduplicate_dataset_instance_items.delay(pk, deduplicate_fields_list, dry_run)
+        if dry_run:
+            ret_dict = {"message": "Duplicate count started"}
+        else:
+            ret_dict = {"message": "Duplicate removal started"}
         ret_status = status.HTTP_200_OK
         return Response(ret_dict, status=ret_status)
 
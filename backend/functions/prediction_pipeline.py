@@ -0,0 +1,170 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import redis
+from django.conf import settings
+from django.db.models import Q
+
+from utils.redis_connection import get_redis_connection
+
+"""
+Prediction pipeline for the OCR and ASR prediction tasks
+
+The data items of a dataset instance are read in chunks ordered by id. The
+predictions of a chunk are fetched from the inference API on a thread pool,
+with a rate limit shared by all the workers, and written with one
+bulk_update. The id of the last item of every written chunk is saved in
+redis as a checkpoint of the run (task, dataset instance, API and mode), so
+a run which crashed or couldn't write a chunk resumes after the last written
+chunk instead of starting over.
+"""
+
+
+class RateLimiter(object):
+    """
+    Space out calls from any number of threads to at most rate per second
+    """
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate else 0
+        self.next_call = 0.0
+        self.lock = threading.Lock()
+
+    def wait(self):
+        if not self.interval:
+            return
+        with self.lock:
+            now = time.monotonic()
+            wait_time = self.next_call - now
+            self.next_call = max(now, self.next_call) + self.interval
+        if wait_time > 0:
+            time.sleep(wait_time)
+
+
+def get_checkpoint_key(
+    task_name, dataset_instance_id, api_type, automate_missing_data_items
+):
+    # A run with another API or mode predicts other items, it must not resume
+    # from the checkpoint of this one
+    return (
+        f"prediction_checkpoint:{task_name}:{dataset_instance_id}:{api_type}:"
+        f"{int(bool(automate_missing_data_items))}"
+    )
+
+
+def get_checkpoint(checkpoint_key):
+    try:
+        checkpoint = get_redis_connection().get(checkpoint_key)
+    except redis.RedisError as e:
+        print(f"Unable to read the prediction checkpoint. Error: {e}")
+        return 0
+    return int(checkpoint) if checkpoint else 0
+
+
+def set_checkpoint(checkpoint_key, last_id):
+    try:
+        get_redis_connection().set(
+            checkpoint_key, last_id, ex=settings.PREDICTION_CHECKPOINT_TTL
+        )
+    except redis.RedisError as e:
+        print(f"Unable to save the prediction checkpoint. Error: {e}")
+
+
+def clear_checkpoint(checkpoint_key):
+    try:
+        get_redis_connection().delete(checkpoint_key)
+    except redis.RedisError as e:
+        print(f"Unable to clear the prediction checkpoint. Error: {e}")
+
+
+def generate_predictions(
+    task_name,
+    dataset_model,
+    dataset_instance_id,
+    api_type,
+    prediction_field,
+    item_fields,
+    predict,
+    automate_missing_data_items,
+    progress_callback=None,
+):
+    """
+    Fetch and save the predictions of the items of a dataset instance.
+
+    Args:
+        task_name (str): Name of the task, used for the checkpoint.
+        dataset_model: Model of the data items.
+        dataset_instance_id (int): ID of the dataset instance.
+        api_type (str): API of the predictions, used for the checkpoint.
+        prediction_field (str): Field where the predictions are saved.
+        item_fields (list): Fields of the item passed to predict.
+        predict (function): Called with a dict of the item_fields of an item,
+            returns the dict returned by get_batch_*_predictions.
+        automate_missing_data_items (bool): Only predict the items without predictions.
+        progress_callback (function, optional): Called with the success and
+            total counts after every chunk.
+
+    Returns:
+        tuple: Number of items predicted successfully and number of items processed.
+
+    Raises:
+        DatabaseError: The predictions of a chunk can't be saved.
+    """
+    items = dataset_model.objects.filter(instance_id=dataset_instance_id)
+    if automate_missing_data_items:
+        items = items.filter(
+            Q(**{f"{prediction_field}__isnull": True})
+            | Q(**{prediction_field: ""})
+            | Q(**{prediction_field: []})
+            | Q(**{prediction_field: {}})
+        )
+    items = items.order_by("id").values("id", *item_fields)
+
+    chunk_size = settings.PREDICTION_CHUNK_SIZE
+    rate_limiter = RateLimiter(settings.PREDICTION_RATE_LIMIT)
+
+    def rate_limited_predict(item):
+        rate_limiter.wait()
+        return predict(item)
+
+    success_count, total_count = 0, 0
+    checkpoint_key = get_checkpoint_key(
+        task_name, dataset_instance_id, api_type, automate_missing_data_items
+    )
+    last_id = get_checkpoint(checkpoint_key)
+    with ThreadPoolExecutor(max_workers=settings.PREDICTION_MAX_WORKERS) as executor:
+        while True:
+            chunk = list(items.filter(id__gt=last_id)[:chunk_size])
+            if not chunk:
+                break
+            total_count += len(chunk)
+
+            updated_items = []
+            for item, predictions in zip(
+                chunk, executor.map(rate_limited_predict, chunk)
+            ):
+                if predictions["status"] == "Success":
+                    # The data items are children of DatasetBase, their
+                    # primary key is datasetbase_ptr and not id
+                    updated_items.append(
+                        dataset_model(
+                            pk=item["id"], **{prediction_field: predictions["output"]}
+                        )
+                    )
+                else:
+                    print(
+                        f"The API has not generated predictions for data item with id-{item['id']}"
+                    )
+            # A chunk which can't be written fails the run, the checkpoint
+            # stays on the last written chunk
+            dataset_model.objects.bulk_update(updated_items, [prediction_field])
+            success_count += len(updated_items)
+
+            last_id = chunk[-1]["id"]
+            set_checkpoint(checkpoint_key, last_id)
+            if progress_callback is not None:
+                progress_callback(success_count, total_count)
+
+    clear_checkpoint(checkpoint_key)
+    return success_count, total_count
@@ -0,0 +1,158 @@
+import base64
+import shutil
+import tempfile
+import zipfile
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, as_completed, wait
+
+from django.conf import settings
+from django.db import connection
+
+from projects.streaming_export import stream_project_export
+from tasks.models import Task
+
+"""
+Archive of the exports of many projects
+
+The CSV exports of the projects are generated on a thread pool, each one into
+a temporary file which is kept in memory while it is small. Finished exports
+are added to a zip archive as soon as they are ready, and the archive is
+uploaded to a block blob while it is written, so neither the whole archive
+nor all the exports are ever on the disk of the worker.
+"""
+
+ARCHIVE_TASK_STATUSES = [
+    "incomplete",
+    "annotated",
+    "reviewed",
+    "super_checked",
+    "exported",
+]
+
+# Bytes copied at a time from an export into the archive
+COPY_BUFFER_SIZE = 1024 * 1024
+
+
+class BlobBlockWriter(object):
+    """
+    Write-only file object which uploads what is written to a block blob, in
+    blocks of block_size bytes. The blob is only created when commit() is
+    called.
+    """
+
+    def __init__(self, blob_client, block_size):
+        self.blob_client = blob_client
+        self.block_size = block_size
+        self.buffer = bytearray()
+        self.block_ids = []
+
+    def write(self, data):
+        self.buffer += data
+        while len(self.buffer) >= self.block_size:
+            self.stage_block(bytes(self.buffer[: self.block_size]))
+            del self.buffer[: self.block_size]
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def stage_block(self, data):
+        # Block ids of a blob must all have the same length
+        block_id = base64.b64encode(f"{len(self.block_ids):08d}".encode()).decode()
+        self.blob_client.stage_block(block_id, data)
+        self.block_ids.append(block_id)
+
+    def commit(self):
+        if self.buffer:
+            self.stage_block(bytes(self.buffer))
+            self.buffer = bytearray()
+        self.blob_client.commit_block_list(self.block_ids)
+
+
+def get_archive_file_name(project):
+    return f"{project.id} - {project.title}.csv".replace("/", "-")
+
+
+def export_project(project):
+    """
+    Export the tasks of a project as CSV into a temporary file.
+
+    Returns:
+        SpooledTemporaryFile: The export, positioned at its start, or None
+            when the project has no tasks to export.
+    """
+    try:
+        tasks = Task.objects.filter(
+            project_id=project, task_status__in=ARCHIVE_TASK_STATUSES
+        )
+        export_file = tempfile.SpooledTemporaryFile(
+            max_size=settings.PROJECT_ARCHIVE_SPOOL_SIZE
+        )
+        for row in stream_project_export(
+            project, tasks, "CSV", include_input_data_metadata_json=True
+        ):
+            export_file.write(row.encode("utf-8"))
+        if not export_file.tell():
+            export_file.close()
+            return None
+        export_file.seek(0)
+        return export_file
+    finally:
+        # Every thread of the pool opens its own database connection
+        connection.close()
+
+
+def iter_project_exports(projects, executor, max_pending):
+    """
+    Yield (project, future) pairs as the exports of the projects finish, with
+    at most max_pending exports running or waiting to be archived
+    """
+    pending = {}
+    for project in projects:
+        pending[executor.submit(export_project, project)] = project
+        if len(pending) >= max_pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield pending.pop(future), future
+    for future in as_completed(pending):
+        yield pending[future], future
+
+
+def build_projects_archive(projects, blob_client, progress_callback=None):
+    """
+    Export projects as CSV files into a zip archive uploaded to a block blob.
+
+    Args:
+        projects (list): Projects to export, projects without tasks and the
+            ones which can't be exported are left out of the archive.
+        blob_client (BlobClient): Client of the blob the archive is uploaded to.
+        progress_callback (function, optional): Called with the number of
+            projects archived and the number of projects processed after
+            every project.
+
+    Returns:
+        int: Number of projects in the archive.
+    """
+    max_workers = settings.PROJECT_ARCHIVE_MAX_WORKERS
+    writer = BlobBlockWriter(blob_client, settings.PROJECT_ARCHIVE_BLOCK_SIZE)
+    success_count, processed_count = 0, 0
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        with zipfile.ZipFile(writer, "w", zipfile.ZIP_DEFLATED) as archive:
+            for project, future in iter_project_exports(
+                projects, executor, 2 * max_workers
+            ):
+                processed_count += 1
+                try:
+                    export_file = future.result()
+                except Exception as e:
+                    print(f"Unable to export project {project.id}. Error: {e}")
+                    export_file = None
+                if export_file is not None:
+                    with export_file, archive.open(
+                        get_archive_file_name(project), "w", force_zip64=True
+                    ) as archive_file:
+                        shutil.copyfileobj(export_file, archive_file, COPY_BUFFER_SIZE)
+                    success_count += 1
+                if progress_callback is not None:
+                    progress_callback(success_count, processed_count)
+    writer.commit()
+    return success_count
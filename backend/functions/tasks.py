@@ -1,7 +1,7 @@
 import datetime
 import time
-import zipfile
 import threading
+from concurrent.futures import ThreadPoolExecutor
 from azure.storage.blob import BlobServiceClient, generate_blob_sas, BlobSasPermissions
 import pandas as pd
 from celery import shared_task
@@ -12,11 +12,11 @@ from projects.utils import (
     convert_seconds_to_hours,
     get_audio_project_types,
     get_audio_transcription_duration,
-    calculate_word_error_rate_between_two_audio_transcription_annotation,
+    get_audio_transcription_text,
     ocr_word_count,
     get_not_null_audio_transcription_duration,
 )
-from projects.views import get_task_count_unassigned, ProjectViewSet
+from projects.views import get_task_count_unassigned
 from shoonya_backend import settings
 from tasks.models import (
     Annotation,
@@ -28,7 +28,6 @@ from tasks.models import (
     Task,
     ANNOTATED,
 )
-from tasks.views import SentenceOperationViewSet
 from users.models import User, LANG_CHOICES
 from django.core.mail import EmailMessage
 
@@ -39,21 +38,23 @@ from utils.blob_functions import (
     test_container_connection,
 )
 from utils.custom_bulk_create import multi_inheritance_table_bulk_insert
+from utils.sentence_scores import normalized_edit_distances, word_error_rates
 from workspaces.models import Workspace
 
+from .prediction_pipeline import generate_predictions
+from .project_archive import build_projects_archive
 from .utils import (
     get_batch_translations,
+    get_cached_batch_translations,
     get_batch_ocr_predictions,
     get_batch_asr_predictions,
 )
+from django.core.exceptions import FieldDoesNotExist
 from django.db import transaction, DataError, IntegrityError
-from dataset.models import DatasetInstance
+from django.db.models import Count
+from dataset.models import DatasetBase, DatasetInstance
 from django.apps import apps
-from rest_framework.test import APIRequestFactory
-from django.http import QueryDict
-from rest_framework.request import Request
 import os
-import tempfile
 
 from shoonya_backend.locks import Lock
 
@@ -62,6 +63,14 @@ import logging
 logger = logging.getLogger(__name__)
 logging.basicConfig(level=logging.INFO)
 
+CED_PROJECT_TYPE_CHOICES = ["ContextualTranslationEditing"]
+
+# Annotations read per query by the project reports
+STATS_CHUNK_SIZE = 1000
+
+# Dataset items written per query by populate_draft_data_json
+DRAFT_DATA_CHUNK_SIZE = 1000
+
 
 ## CELERY SHARED TASKS
 @shared_task(bind=True)
@@ -152,7 +161,8 @@ def sentence_text_translate_and_save_translation_pairs(
     # Keep count of the number of sentences translated
     translated_sentences_count = 0
 
-    # Iterate through the languages
+    # Split the sentences to be translated into batches, for all the languages
+    translation_batches = []
     for output_language in languages:
         if automate_missing_data_items == True:
             # Fetch all parent ids of translation pairs present in the target dataset instance
@@ -170,28 +180,38 @@ def sentence_text_translate_and_save_translation_pairs(
             # Fetch all samples from the input dataset instance
             input_sentences_df = input_sentences_complete_df
 
-        # Make a sentence list for valid sentences to be translated
-        all_sentences_to_be_translated = input_sentences_df["corrected_text"].tolist()
-
-        # Loop through all the sentences to be translated in batch format
-        for i in range(0, len(all_sentences_to_be_translated), batch_size):
-            # Create a TranslationPair object list
-            translation_pair_objects = []
-
-            batch_of_input_sentences = all_sentences_to_be_translated[
-                i : i + batch_size
-            ]
+        for i in range(0, input_sentences_df.shape[0], batch_size):
+            translation_batches.append(
+                (
+                    output_language,
+                    input_sentences_df["input_language"].iloc[0],
+                    input_sentences_df[i : i + batch_size],
+                )
+            )
 
-            # Get the translations for the batch of sentences
-            translations_output = get_batch_translations(
-                sentences_to_translate=batch_of_input_sentences,
-                source_lang=input_sentences_df["input_language"].iloc[0],
+    # Translate the batches in parallel, the results are saved in order as they arrive
+    with ThreadPoolExecutor(max_workers=settings.TRANSLATION_MAX_WORKERS) as executor:
+        translation_futures = [
+            executor.submit(
+                get_cached_batch_translations,
+                sentences_to_translate=batch_df["corrected_text"].tolist(),
+                source_lang=source_language,
                 target_lang=output_language,
                 api_type=api_type,
                 checks_for_particular_languages=checks_for_particular_languages,
             )
+            for output_language, source_language, batch_df in translation_batches
+        ]
+
+        for (output_language, _, batch_df), translation_future in zip(
+            translation_batches, translation_futures
+        ):
+            translations_output = translation_future.result()
 
             if translations_output["status"] == "failure":
+                for future in translation_futures:
+                    future.cancel()
+
                 # Update the task status and raise an exception
                 self.update_state(
                     state="FAILURE",
@@ -208,7 +228,10 @@ def sentence_text_translate_and_save_translation_pairs(
                 translated_sentences = translations_output["output"]
 
             # Check if the translated sentences are equal to the input sentences
-            if len(translated_sentences) != len(batch_of_input_sentences):
+            if len(translated_sentences) != batch_df.shape[0]:
+                for future in translation_futures:
+                    future.cancel()
+
                 # Update the task status and raise an exception
                 self.update_state(
                     state="FAILURE",
@@ -221,35 +244,22 @@ def sentence_text_translate_and_save_translation_pairs(
                     "The number of translated sentences does not match the number of input sentences."
                 )
 
-            # Iterate through the dataframe
-            for index, row in input_sentences_df[i : i + batch_size].iterrows():
-                # Get the values for the TranslationPair model
-                sentence_text_id = row["sentence_text_id"]
-                input_sentence = row["corrected_text"]
-                input_language = row["input_language"]
-                translated_sentence = translated_sentences[index - i]
-                metadata = row["metadata"]
-                context = row["context"]
-
-                # Get the sentencetext model object by ID
-                sentence_text_object = dataset_models.SentenceText.objects.get(
-                    id=sentence_text_id
-                )
-
-                # Create and save a TranslationPair object
-                translation_pair_obj = dataset_models.TranslationPair(
-                    parent_data=sentence_text_object,
+            # Create the TranslationPair objects, linked to their SentenceText by id
+            translation_pair_objects = [
+                dataset_models.TranslationPair(
+                    parent_data_id=row["sentence_text_id"],
                     instance_id=output_dataset_instance,
-                    input_language=input_language,
+                    input_language=row["input_language"],
                     output_language=output_language,
-                    input_text=input_sentence,
+                    input_text=row["corrected_text"],
                     machine_translation=translated_sentence,
-                    context=context,
-                    metadata_json=metadata,
+                    context=row["context"],
+                    metadata_json=row["metadata"],
                 )
-
-                # Append the object to TranslationPair list for bulk create
-                translation_pair_objects.append(translation_pair_obj)
+                for (_, row), translated_sentence in zip(
+                    batch_df.iterrows(), translated_sentences
+                )
+            ]
 
             # Bulk create the TranslationPair objects for the particular language
             multi_inheritance_table_bulk_insert(translation_pair_objects)
@@ -413,138 +423,32 @@ def generate_ocr_prediction_json(
         automate_missing_data_items (bool): "Boolean to translate only missing data items"
     """
     task_name = "generate_ocr_prediction_json"
-    # Fetching the data items for the given dataset instance.
-    success_count, total_count = 0, 0
-    try:
-        ocr_data_items = dataset_models.OCRDocument.objects.filter(
-            instance_id=dataset_instance_id
-        ).values_list(
-            "id",
-            "metadata_json",
-            "draft_data_json",
-            "file_type",
-            "file_url",
-            "image_url",
-            "page_number",
-            "language",
-            "ocr_type",
-            "ocr_domain",
-            "ocr_transcribed_json",
-            "ocr_prediction_json",
-            "image_details_json",
-            "parent_data",
-        )
-    except Exception as e:
-        ocr_data_items = []
 
-    # converting the dataset_instance to pandas dataframe.
-    ocr_data_items_df = pd.DataFrame(
-        ocr_data_items,
-        columns=[
-            "id",
-            "metadata_json",
-            "draft_data_json",
-            "file_type",
-            "file_url",
-            "image_url",
-            "page_number",
-            "language",
-            "ocr_type",
-            "ocr_domain",
-            "ocr_transcribed_json",
-            "ocr_prediction_json",
-            "image_details_json",
-            "parent_data",
-        ],
-    )
-
-    # Check if the dataframe is empty
-    if ocr_data_items_df.shape[0] == 0:
+    # Check if the dataset instance is empty
+    if not dataset_models.OCRDocument.objects.filter(
+        instance_id=dataset_instance_id
+    ).exists():
         raise Exception("The OCR data is empty.")
 
-    required_columns = {
-        "id",
-        "metadata_json",
-        "draft_data_json",
-        "file_type",
-        "file_url",
-        "image_url",
-        "page_number",
-        "language",
-        "ocr_type",
-        "ocr_domain",
-        "ocr_transcribed_json",
-        "ocr_prediction_json",
-        "image_details_json",
-        "parent_data",
-    }
-    if not required_columns.issubset(ocr_data_items_df.columns):
-        missing_columns = required_columns - set(ocr_data_items_df.columns)
-        celery_lock = Lock(user_id, task_name)
-        try:
-            celery_lock.releaseLock()
-        except Exception as e:
-            print(f"Error while releasing the lock for {task_name}: {str(e)}")
-        raise ValueError(
-            f"The following required columns are missing: {missing_columns}"
+    def update_progress(success_count, total_count):
+        self.update_state(
+            state="PROGRESS",
+            meta={"success_count": success_count, "total_count": total_count},
         )
 
-    # Update the ocr_predictions field for each row in the DataFrame
-    for index, row in ocr_data_items_df.iterrows():
-        curr_id = row["id"]
-        if "image_url" not in row:
-            print(f"The OCR item with {curr_id} has missing image_url.")
-            continue
-        image_url = row["image_url"]
-
-        # Considering the case when we should generate predictions for data items
-        # which already have ocr_predictions or not.
-        if automate_missing_data_items and row["ocr_prediction_json"]:
-            continue
-        total_count += 1
-        ocr_predictions = get_batch_ocr_predictions(curr_id, image_url, api_type)
-        if ocr_predictions["status"] == "Success":
-            success_count += 1
-            ocr_predictions_json = ocr_predictions["output"]
-
-            # Updating the ocr_prediction_json column and saving in OCRDocument dataset with the new ocr predictions
-            try:
-                ocr_data_items_df.at[
-                    index, "ocr_prediction_json"
-                ] = ocr_predictions_json
-                ocr_document = dataset_models.OCRDocument(
-                    instance_id_id=dataset_instance_id,
-                    id=curr_id,
-                    metadata_json=row["metadata_json"],
-                    draft_data_json=row["draft_data_json"],
-                    file_type=row["file_type"],
-                    file_url=row["file_url"],
-                    image_url=image_url,
-                    page_number=row["page_number"],
-                    language=row["language"],
-                    ocr_type=row["ocr_type"],
-                    ocr_domain=row["ocr_domain"],
-                    ocr_transcribed_json=row["ocr_transcribed_json"],
-                    ocr_prediction_json=ocr_predictions_json,
-                    image_details_json=row["image_details_json"],
-                    parent_data=row["parent_data"],
-                )
-                with transaction.atomic():
-                    ocr_document.save()
-            except IntegrityError as e:
-                # Handling unique constraint violations or other data integrity issues
-                print(f"Error while saving dataset id- {curr_id}, IntegrityError: {e}")
-            except DataError as e:
-                # Handling data-related issues like incorrect data types, etc.
-                print(f"Error while saving dataset id- {curr_id}, DataError: {e}")
-            except Exception as e:
-                # Handling other unexpected exceptions.
-                print(f"Error while saving dataset id- {curr_id}, Error message: {e}")
+    # Generate the predictions in parallel and save them chunk by chunk
+    success_count, total_count = generate_predictions(
+        task_name,
+        dataset_models.OCRDocument,
+        dataset_instance_id,
+        api_type,
+        "ocr_prediction_json",
+        ["image_url"],
+        lambda item: get_batch_ocr_predictions(item["id"], item["image_url"], api_type),
+        automate_missing_data_items,
+        update_progress,
+    )
 
-        else:
-            print(
-                f"The {api_type} API has not generated predictions for data item with id-{curr_id}"
-            )
     celery_lock = Lock(user_id, task_name)
     try:
         celery_lock.releaseLock()
@@ -565,139 +469,33 @@ def generate_asr_prediction_json(
         automate_missing_data_items (bool): "Boolean to translate only missing data items"
     """
     task_name = "generate_asr_prediction_json"
-    # Fetching the data items for the given dataset instance.
-    success_count, total_count = 0, 0
-    try:
-        asr_data_items = dataset_models.SpeechConversation.objects.filter(
-            instance_id=dataset_instance_id
-        ).values_list(
-            "id",
-            "metadata_json",
-            "draft_data_json",
-            "domain",
-            "scenario",
-            "speaker_count",
-            "speakers_json",
-            "language",
-            "transcribed_json",
-            "machine_transcribed_json",
-            "audio_url",
-            "audio_duration",
-            "reference_raw_transcript",
-            "prediction_json",
-            "parent_data",
-        )
-    except Exception as e:
-        asr_data_items = []
 
-    # converting the dataset_instance to pandas dataframe.
-    asr_data_items_df = pd.DataFrame(
-        asr_data_items,
-        columns=[
-            "id",
-            "metadata_json",
-            "draft_data_json",
-            "domain",
-            "scenario",
-            "speaker_count",
-            "speakers_json",
-            "language",
-            "transcribed_json",
-            "machine_transcribed_json",
-            "audio_url",
-            "audio_duration",
-            "reference_raw_transcript",
-            "prediction_json",
-            "parent_data",
-        ],
-    )
-
-    # Check if the dataframe is empty
-    if asr_data_items_df.shape[0] == 0:
+    # Check if the dataset instance is empty
+    if not dataset_models.SpeechConversation.objects.filter(
+        instance_id=dataset_instance_id
+    ).exists():
         raise Exception("The ASR data is empty.")
 
-    required_columns = {
-        "id",
-        "metadata_json",
-        "draft_data_json",
-        "domain",
-        "scenario",
-        "speaker_count",
-        "speakers_json",
-        "language",
-        "transcribed_json",
-        "machine_transcribed_json",
-        "audio_url",
-        "audio_duration",
-        "reference_raw_transcript",
-        "prediction_json",
-        "parent_data",
-    }
-    if not required_columns.issubset(asr_data_items_df.columns):
-        missing_columns = required_columns - set(asr_data_items_df.columns)
-
-        raise ValueError(
-            f"The following required columns are missing: {missing_columns}"
-        )
-
-    # Update the asr_predictions field for each row in the DataFrame
-    for index, row in asr_data_items_df.iterrows():
-        curr_id = row["id"]
-        if "audio_url" not in row:
-            print(f"The ASR item with {curr_id} has missing audio_url.")
-            continue
-        audio_url = row["audio_url"]
-        language = row["language"]
-
-        # Considering the case when we should generate predictions for data items
-        # which already have asr_predictions or not.
-        if automate_missing_data_items and row["prediction_json"]:
-            continue
-        total_count += 1
-        asr_predictions = get_batch_asr_predictions(
-            curr_id, audio_url, api_type, language
+    def update_progress(success_count, total_count):
+        self.update_state(
+            state="PROGRESS",
+            meta={"success_count": success_count, "total_count": total_count},
         )
-        if asr_predictions["status"] == "Success":
-            success_count += 1
-            prediction_json = asr_predictions["output"]
-
-            # Updating the asr_prediction_json column and saving in SpeechConversation dataset with the new asr predictions
-            try:
-                asr_data_items_df.at[index, "prediction_json"] = prediction_json
-                asr_document = dataset_models.SpeechConversation(
-                    instance_id_id=dataset_instance_id,
-                    id=curr_id,
-                    metadata_json=row["metadata_json"],
-                    draft_data_json=row["draft_data_json"],
-                    domain=row["domain"],
-                    scenario=row["scenario"],
-                    speaker_count=row["speaker_count"],
-                    speakers_json=row["speakers_json"],
-                    language=row["language"],
-                    transcribed_json=row["transcribed_json"],
-                    machine_transcribed_json=row["machine_transcribed_json"],
-                    audio_url=audio_url,
-                    audio_duration=row["audio_duration"],
-                    reference_raw_transcript=row["reference_raw_transcript"],
-                    prediction_json=prediction_json,
-                    parent_data=row["parent_data"],
-                )
-                with transaction.atomic():
-                    asr_document.save()
-            except IntegrityError as e:
-                # Handling unique constraint violations or other data integrity issues
-                print(f"Error while saving dataset id- {curr_id}, IntegrityError: {e}")
-            except DataError as e:
-                # Handling data-related issues like incorrect data types, etc.
-                print(f"Error while saving dataset id- {curr_id}, DataError: {e}")
-            except Exception as e:
-                # Handling other unexpected exceptions.
-                print(f"Error while saving dataset id- {curr_id}, Error message: {e}")
 
-        else:
-            print(
-                f"The {api_type} API has not generated predictions for data item with id-{curr_id}"
-            )
+    # Generate the predictions in parallel and save them chunk by chunk
+    success_count, total_count = generate_predictions(
+        task_name,
+        dataset_models.SpeechConversation,
+        dataset_instance_id,
+        api_type,
+        "prediction_json",
+        ["audio_url", "language"],
+        lambda item: get_batch_asr_predictions(
+            item["id"], item["audio_url"], api_type, item["language"]
+        ),
+        automate_missing_data_items,
+        update_progress,
+    )
 
     print(f"{success_count} out of {total_count} populated")
 
@@ -711,29 +509,58 @@ def populate_draft_data_json(self, pk, user_id, fields_list):
         return error
     dataset_type = dataset_instance.dataset_type
     dataset_model = apps.get_model("dataset", dataset_type)
-    dataset_items = dataset_model.objects.filter(instance_id=dataset_instance)
-    cnt = 0
-    for dataset_item in dataset_items:
-        new_draft_data_json = {}
-        for field in fields_list:
-            try:
-                new_draft_data_json[field] = getattr(dataset_item, field)
-                if new_draft_data_json[field] == None:
-                    del new_draft_data_json[field]
-            except:
-                pass
 
+    # Only the fields of the dataset model can be copied, other names are skipped
+    model_fields = []
+    for field in fields_list:
+        try:
+            if dataset_model._meta.get_field(field).concrete:
+                model_fields.append(field)
+        except FieldDoesNotExist:
+            pass
+
+    dataset_items = (
+        dataset_model.objects.filter(instance_id=dataset_instance)
+        .order_by()
+        .values("id", *model_fields)
+    )
+    total_count = dataset_items.count()
+    cnt = 0
+    processed_count = 0
+    updated_items = []
+    # draft_data_json is a field of the parent table, the items are updated
+    # through DatasetBase so every chunk is a single UPDATE
+    for dataset_item in dataset_items.iterator(chunk_size=DRAFT_DATA_CHUNK_SIZE):
+        new_draft_data_json = {
+            field: dataset_item[field]
+            for field in model_fields
+            if dataset_item[field] is not None
+        }
         if new_draft_data_json != {}:
-            dataset_item.draft_data_json = new_draft_data_json
-            dataset_item.save()
-            cnt += 1
+            updated_items.append(
+                DatasetBase(id=dataset_item["id"], draft_data_json=new_draft_data_json)
+            )
+        if len(updated_items) >= DRAFT_DATA_CHUNK_SIZE:
+            DatasetBase.objects.bulk_update(updated_items, ["draft_data_json"])
+            cnt += len(updated_items)
+            updated_items = []
+
+        processed_count += 1
+        if processed_count % DRAFT_DATA_CHUNK_SIZE == 0:
+            self.update_state(
+                state="PROGRESS",
+                meta={"success_count": cnt, "total_count": total_count},
+            )
+    if updated_items:
+        DatasetBase.objects.bulk_update(updated_items, ["draft_data_json"])
+        cnt += len(updated_items)
 
     return f"successfully populated {cnt} dataset items with draft_data_json"
 
 
 # The flow for project_reports- schedule_mail_for_project_reports -> get_proj_objs, get_stats ->
-# get_modified_stats_result, get_stats_helper -> update_meta_stats -> calculate_ced_between_two_annotations,
-# calculate_wer_between_two_annotations, get_most_recent_annotation.
+# get_annotation_status_counts, update_project_meta_stats, update_comparison_stats -> load_annotation_chains,
+# append_ced_scores, append_wer_scores -> get_modified_stats_result.
 @shared_task(queue="reports")
 def schedule_mail_for_project_reports(
     project_type,
@@ -882,8 +709,11 @@ def schedule_mail_for_project_reports(
 
 def get_stats(proj_objs, anno_stats, meta_stats, complete_stats, project_type, user):
     result = {}
+    proj_objs = list(proj_objs)
+    status_counts = {}
+    if anno_stats or complete_stats:
+        status_counts = get_annotation_status_counts([proj.id for proj in proj_objs])
     for proj in proj_objs:
-        annotations = Annotation.objects.filter(task__project_id=proj.id)
         (
             result_ann_anno_stats,
             result_rev_anno_stats,
@@ -898,64 +728,35 @@ def get_stats(proj_objs, anno_stats, meta_stats, complete_stats, project_type, u
             average_ann_vs_sup_CED,
             average_ann_vs_sup_WER,
         ) = get_stats_definitions()
-        for ann_obj in annotations:
-            if ann_obj.annotation_type == ANNOTATOR_ANNOTATION:
-                try:
-                    get_stats_helper(
-                        anno_stats,
-                        meta_stats,
-                        complete_stats,
-                        result_ann_anno_stats,
-                        result_ann_meta_stats,
-                        ann_obj,
-                        project_type,
-                        average_ann_vs_rev_CED,
-                        average_ann_vs_rev_WER,
-                        average_rev_vs_sup_CED,
-                        average_rev_vs_sup_WER,
-                        average_ann_vs_sup_CED,
-                        average_ann_vs_sup_WER,
-                    )
-                except:
-                    continue
-            elif ann_obj.annotation_type == REVIEWER_ANNOTATION:
-                try:
-                    get_stats_helper(
-                        anno_stats,
-                        meta_stats,
-                        complete_stats,
-                        result_rev_anno_stats,
-                        result_rev_meta_stats,
-                        ann_obj,
-                        project_type,
-                        average_ann_vs_rev_CED,
-                        average_ann_vs_rev_WER,
-                        average_rev_vs_sup_CED,
-                        average_rev_vs_sup_WER,
-                        average_ann_vs_sup_CED,
-                        average_ann_vs_sup_WER,
-                    )
-                except:
-                    continue
-            elif ann_obj.annotation_type == SUPER_CHECKER_ANNOTATION:
-                try:
-                    get_stats_helper(
-                        anno_stats,
-                        meta_stats,
-                        complete_stats,
-                        result_sup_anno_stats,
-                        result_sup_meta_stats,
-                        ann_obj,
-                        project_type,
-                        average_ann_vs_rev_CED,
-                        average_ann_vs_rev_WER,
-                        average_rev_vs_sup_CED,
-                        average_rev_vs_sup_WER,
-                        average_ann_vs_sup_CED,
-                        average_ann_vs_sup_WER,
-                    )
-                except:
-                    continue
+        result_anno_stats = {
+            ANNOTATOR_ANNOTATION: result_ann_anno_stats,
+            REVIEWER_ANNOTATION: result_rev_anno_stats,
+            SUPER_CHECKER_ANNOTATION: result_sup_anno_stats,
+        }
+        result_meta_stats = {
+            ANNOTATOR_ANNOTATION: result_ann_meta_stats,
+            REVIEWER_ANNOTATION: result_rev_meta_stats,
+            SUPER_CHECKER_ANNOTATION: result_sup_meta_stats,
+        }
+        for (annotation_type, annotation_status), count in status_counts.get(
+            proj.id, {}
+        ).items():
+            if annotation_status in result_anno_stats.get(annotation_type, {}):
+                result_anno_stats[annotation_type][annotation_status] += count
+        if not anno_stats:
+            comparison_annotations = update_project_meta_stats(
+                proj.id, project_type, result_meta_stats, complete_stats
+            )
+            update_comparison_stats(
+                comparison_annotations,
+                project_type,
+                average_ann_vs_rev_CED,
+                average_ann_vs_rev_WER,
+                average_rev_vs_sup_CED,
+                average_rev_vs_sup_WER,
+                average_ann_vs_sup_CED,
+                average_ann_vs_sup_WER,
+            )
         result[f"{proj.id} - {proj.title}"] = get_modified_stats_result(
             result_ann_meta_stats,
             result_rev_meta_stats,
@@ -979,6 +780,26 @@ def get_stats(proj_objs, anno_stats, meta_stats, complete_stats, project_type, u
     return result
 
 
+def get_annotation_status_counts(proj_ids):
+    """
+    Number of annotations of every project per (annotation type, annotation status),
+    with a single query for all the projects
+    """
+    status_counts = {}
+    for proj_id, annotation_type, annotation_status, count in (
+        Annotation.objects.filter(task__project_id__in=proj_ids)
+        .values("task__project_id", "annotation_type", "annotation_status")
+        .annotate(count=Count("id"))
+        .values_list(
+            "task__project_id", "annotation_type", "annotation_status", "count"
+        )
+    ):
+        status_counts.setdefault(proj_id, {})[
+            (annotation_type, annotation_status)
+        ] = count
+    return status_counts
+
+
 def get_stats_definitions():
     result_ann_anno_stats = {
         "unlabeled": 0,
@@ -1316,13 +1137,143 @@ def get_proj_objs(
     return proj_objs
 
 
-def get_stats_helper(
-    anno_stats,
-    meta_stats,
-    complete_stats,
-    result_anno_stats,
-    result_meta_stats,
-    ann_obj,
+def get_meta_stats_kind(project_type):
+    if project_type is None:
+        return None
+    if project_type in CED_PROJECT_TYPE_CHOICES:
+        return "ced"
+    if "OCRTranscription" in project_type:
+        return "ocr"
+    if project_type in get_audio_project_types():
+        return "audio"
+    return None
+
+
+def update_project_meta_stats(proj_id, project_type, result_meta_stats, complete_stats):
+    """
+    Add the word counts and audio durations of the annotations of a project to
+    result_meta_stats, reading only the fields the project type needs.
+
+    Returns the (annotation id, task id) of the reviewer annotations of reviewed
+    tasks and of the superchecker annotations of superchecked tasks, which are
+    compared with the annotations they were made from.
+    """
+    kind = get_meta_stats_kind(project_type)
+    if kind is None:
+        return []
+    fields = [
+        "id",
+        "task_id",
+        "annotation_type",
+        "annotation_status",
+        "task__task_status",
+    ]
+    if kind in ["ocr", "audio"]:
+        fields.append("result")
+    if kind in ["ced", "audio"]:
+        fields.append("task__data")
+
+    comparison_annotations = []
+    for ann in (
+        Annotation.objects.filter(
+            task__project_id=proj_id,
+            annotation_type__in=[
+                ANNOTATOR_ANNOTATION,
+                REVIEWER_ANNOTATION,
+                SUPER_CHECKER_ANNOTATION,
+            ],
+        )
+        .values(*fields)
+        .iterator(chunk_size=STATS_CHUNK_SIZE)
+    ):
+        status_stats = result_meta_stats[ann["annotation_type"]].get(
+            ann["annotation_status"]
+        )
+        # The complete report skips the annotations it can't count
+        if status_stats is None and complete_stats:
+            continue
+        try:
+            if kind == "ced":
+                try:
+                    status_stats["Word Count"] += ann["task__data"]["word_count"]
+                except Exception as e:
+                    pass
+            elif kind == "ocr":
+                status_stats["Word Count"] += ocr_word_count(ann["result"])
+            else:
+                status_stats["Raw Audio Duration"] += ann["task__data"][
+                    "audio_duration"
+                ]
+                status_stats["Segment Duration"] += get_audio_transcription_duration(
+                    ann["result"]
+                )
+                status_stats[
+                    "Not Null Segment Duration"
+                ] += get_not_null_audio_transcription_duration(ann["result"], ann["id"])
+        except:
+            continue
+
+        if (
+            ann["task__task_status"] == REVIEWED
+            and ann["annotation_type"] == REVIEWER_ANNOTATION
+        ) or (
+            ann["task__task_status"] == SUPER_CHECKED
+            and ann["annotation_type"] == SUPER_CHECKER_ANNOTATION
+        ):
+            comparison_annotations.append((ann["id"], ann["task_id"]))
+    return comparison_annotations
+
+
+def load_annotation_chains(task_ids):
+    """
+    Load the annotations of the given tasks and of the tasks of their parent
+    annotations with a few bulk queries.
+
+    Returns a map of annotation id to annotation and a map of (task id,
+    annotation type) to the most recently updated annotation.
+    """
+    annotations_by_id = {}
+    loaded_task_ids = set()
+    while task_ids:
+        loaded_task_ids.update(task_ids)
+        for ann in Annotation.objects.filter(task_id__in=task_ids).only(
+            "id",
+            "task_id",
+            "annotation_type",
+            "updated_at",
+            "result",
+            "parent_annotation",
+        ):
+            annotations_by_id[ann.id] = ann
+        missing_parent_ids = {
+            ann.parent_annotation_id
+            for ann in annotations_by_id.values()
+            if ann.parent_annotation_id is not None
+            and ann.parent_annotation_id not in annotations_by_id
+        }
+        task_ids = (
+            set(
+                Annotation.objects.filter(id__in=missing_parent_ids).values_list(
+                    "task_id", flat=True
+                )
+            )
+            - loaded_task_ids
+        )
+
+    most_recent_annotations = {}
+    for ann_id in sorted(annotations_by_id):
+        ann = annotations_by_id[ann_id]
+        key = (ann.task_id, ann.annotation_type)
+        if (
+            key not in most_recent_annotations
+            or most_recent_annotations[key].updated_at < ann.updated_at
+        ):
+            most_recent_annotations[key] = ann
+    return annotations_by_id, most_recent_annotations
+
+
+def update_comparison_stats(
+    comparison_annotations,
     project_type,
     average_ann_vs_rev_CED,
     average_ann_vs_rev_WER,
@@ -1331,163 +1282,146 @@ def get_stats_helper(
     average_ann_vs_sup_CED,
     average_ann_vs_sup_WER,
 ):
-    ced_project_type_choices = ["ContextualTranslationEditing"]
-    task_obj = ann_obj.task
-    task_data = task_obj.data
+    """
+    Compare the reviewer and superchecker annotations with the annotations they
+    were made from, using the most recent annotation of each type of a task
+    """
+    is_ced_project_type = project_type in CED_PROJECT_TYPE_CHOICES
+    if not is_ced_project_type and project_type not in get_audio_project_types():
+        return
+
+    for i in range(0, len(comparison_annotations), STATS_CHUNK_SIZE):
+        chunk = comparison_annotations[i : i + STATS_CHUNK_SIZE]
+        annotations_by_id, most_recent_annotations = load_annotation_chains(
+            {task_id for _, task_id in chunk}
+        )
 
-    if anno_stats or complete_stats:
-        update_anno_stats(result_anno_stats, ann_obj, anno_stats)
-        if anno_stats:
-            return 0
-    update_meta_stats(
-        result_meta_stats,
-        ann_obj,
-        task_data,
-        project_type,
-        ced_project_type_choices,
-    )
-    if task_obj.task_status == REVIEWED:
-        if ann_obj.annotation_type == REVIEWER_ANNOTATION:
-            if project_type in ced_project_type_choices:
-                try:
-                    average_ann_vs_rev_CED.append(
-                        get_average_of_a_list(
-                            calculate_ced_between_two_annotations(
-                                get_most_recent_annotation(ann_obj.parent_annotation),
+        def get_most_recent_annotation(annotation):
+            most_recent_annotation = most_recent_annotations[
+                (annotation.task_id, annotation.annotation_type)
+            ]
+            if annotation.updated_at < most_recent_annotation.updated_at:
+                return most_recent_annotation
+            return annotation
+
+        def get_parent_annotation(annotation):
+            return annotations_by_id[annotation.parent_annotation_id]
+
+        ced_pairs = []
+        wer_pairs = []
+        for ann_id, _ in chunk:
+            ann_obj = annotations_by_id[ann_id]
+            if ann_obj.annotation_type == REVIEWER_ANNOTATION:
+                if is_ced_project_type:
+                    try:
+                        ced_pairs.append(
+                            (
+                                average_ann_vs_rev_CED,
+                                get_most_recent_annotation(
+                                    get_parent_annotation(ann_obj)
+                                ),
                                 get_most_recent_annotation(ann_obj),
                             )
                         )
-                    )
-                except Exception as error:
-                    pass
-            elif project_type in get_audio_project_types():
-                try:
-                    # we pass the reviewer first has the reference sentence and annotator second which
-                    # has the hypothesis sentence.
-                    # A higher grade has the reference sentence and the lower has the hypothesis sentence
-                    average_ann_vs_rev_WER.append(
-                        calculate_wer_between_two_annotations(
-                            get_most_recent_annotation(ann_obj).result,
-                            get_most_recent_annotation(
-                                ann_obj.parent_annotation
-                            ).result,
-                        )
-                    )
-                except Exception as error:
-                    pass
-    elif task_obj.task_status == SUPER_CHECKED:
-        if ann_obj.annotation_type == SUPER_CHECKER_ANNOTATION:
-            if project_type in ced_project_type_choices:
-                try:
-                    average_ann_vs_rev_CED.append(
-                        get_average_of_a_list(
-                            calculate_ced_between_two_annotations(
+                    except Exception as error:
+                        pass
+                else:
+                    try:
+                        # we pass the reviewer first has the reference sentence and annotator second which
+                        # has the hypothesis sentence.
+                        # A higher grade has the reference sentence and the lower has the hypothesis sentence
+                        wer_pairs.append(
+                            (
+                                average_ann_vs_rev_WER,
+                                get_most_recent_annotation(ann_obj),
                                 get_most_recent_annotation(
-                                    ann_obj.parent_annotation.parent_annotation
+                                    get_parent_annotation(ann_obj)
                                 ),
-                                get_most_recent_annotation(ann_obj.parent_annotation),
                             )
                         )
+                    except Exception as error:
+                        pass
+            elif is_ced_project_type:
+                try:
+                    ced_pairs.append(
+                        (
+                            average_ann_vs_rev_CED,
+                            get_most_recent_annotation(
+                                get_parent_annotation(get_parent_annotation(ann_obj))
+                            ),
+                            get_most_recent_annotation(get_parent_annotation(ann_obj)),
+                        )
                     )
                 except Exception as error:
                     pass
                 try:
-                    average_rev_vs_sup_CED.append(
-                        get_average_of_a_list(
-                            calculate_ced_between_two_annotations(
-                                get_most_recent_annotation(ann_obj.parent_annotation),
-                                get_most_recent_annotation(ann_obj),
-                            )
+                    ced_pairs.append(
+                        (
+                            average_rev_vs_sup_CED,
+                            get_most_recent_annotation(get_parent_annotation(ann_obj)),
+                            get_most_recent_annotation(ann_obj),
                         )
                     )
                 except Exception as error:
                     pass
                 try:
-                    average_ann_vs_sup_CED.append(
-                        get_average_of_a_list(
-                            calculate_ced_between_two_annotations(
-                                get_most_recent_annotation(
-                                    ann_obj.parent_annotation.parent_annotation
-                                ),
-                                get_most_recent_annotation(ann_obj),
-                            )
+                    ced_pairs.append(
+                        (
+                            average_ann_vs_sup_CED,
+                            get_most_recent_annotation(
+                                get_parent_annotation(get_parent_annotation(ann_obj))
+                            ),
+                            get_most_recent_annotation(ann_obj),
                         )
                     )
                 except Exception as error:
                     pass
-            elif project_type in get_audio_project_types():
+            else:
                 try:
-                    average_ann_vs_rev_WER.append(
-                        calculate_wer_between_two_annotations(
+                    wer_pairs.append(
+                        (
+                            average_ann_vs_rev_WER,
+                            get_most_recent_annotation(get_parent_annotation(ann_obj)),
                             get_most_recent_annotation(
-                                ann_obj.parent_annotation
-                            ).result,
-                            get_most_recent_annotation(
-                                ann_obj.parent_annotation.parent_annotation
-                            ).result,
+                                get_parent_annotation(get_parent_annotation(ann_obj))
+                            ),
                         )
                     )
                 except Exception as error:
                     pass
                 try:
-                    average_rev_vs_sup_WER.append(
-                        calculate_wer_between_two_annotations(
-                            get_most_recent_annotation(ann_obj).result,
-                            get_most_recent_annotation(
-                                ann_obj.parent_annotation
-                            ).result,
+                    wer_pairs.append(
+                        (
+                            average_rev_vs_sup_WER,
+                            get_most_recent_annotation(ann_obj),
+                            get_most_recent_annotation(get_parent_annotation(ann_obj)),
                         )
                     )
                 except Exception as error:
                     pass
                 try:
-                    average_ann_vs_sup_WER.append(
-                        calculate_wer_between_two_annotations(
-                            get_most_recent_annotation(ann_obj).result,
+                    wer_pairs.append(
+                        (
+                            average_ann_vs_sup_WER,
+                            get_most_recent_annotation(ann_obj),
                             get_most_recent_annotation(
-                                ann_obj.parent_annotation.parent_annotation
-                            ).result,
+                                get_parent_annotation(get_parent_annotation(ann_obj))
+                            ),
                         )
                     )
                 except Exception as error:
                     pass
-    return 0
-
+        append_ced_scores(ced_pairs)
+        append_wer_scores(wer_pairs)
 
-def update_anno_stats(result_anno_stats, ann_obj, anno_stats):
-    result_anno_stats[ann_obj.annotation_status] += 1
-    return 0 if anno_stats else None
 
-
-def update_meta_stats(
-    result_meta_stats, ann_obj, task_data, project_type, ced_project_type_choices
-):
-    if project_type in ced_project_type_choices:
-        try:
-            result_meta_stats[ann_obj.annotation_status]["Word Count"] += task_data[
-                "word_count"
-            ]
-        except Exception as e:
-            return 0
-    elif "OCRTranscription" in project_type:
-        result_meta_stats[ann_obj.annotation_status]["Word Count"] += ocr_word_count(
-            ann_obj.result
-        )
-    elif project_type in get_audio_project_types():
-        result_meta_stats[ann_obj.annotation_status]["Raw Audio Duration"] += task_data[
-            "audio_duration"
-        ]
-        result_meta_stats[ann_obj.annotation_status][
-            "Segment Duration"
-        ] += get_audio_transcription_duration(ann_obj.result)
-        result_meta_stats[ann_obj.annotation_status][
-            "Not Null Segment Duration"
-        ] += get_not_null_audio_transcription_duration(ann_obj.result, ann_obj.id)
-
-
-def calculate_ced_between_two_annotations(annotation1, annotation2):
-    sentence_operation = SentenceOperationViewSet()
-    ced_list = []
+def get_ced_sentences(annotation1, annotation2):
+    """
+    Texts of the segments of two annotations which are compared for the CED,
+    as two lists of the same length
+    """
+    sentences1 = []
+    sentences2 = []
     for i in range(len(annotation1.result)):
         if "value" in annotation1.result[i]:
             if "text" in annotation1.result[i]["value"]:
@@ -1503,38 +1437,62 @@ def calculate_ced_between_two_annotations(annotation1, annotation2):
                 continue
         else:
             continue
-        data = {"sentence1": str1, "sentence2": str2}
+        sentences1.append(str1)
+        sentences2.append(str2)
+    return sentences1, sentences2
+
+
+def append_ced_scores(ced_pairs):
+    """
+    Append the average CED of the segments of every (list, annotation1,
+    annotation2) to the list, scoring the segments of all the pairs at once
+    """
+    pair_ranges = []
+    sentences1 = []
+    sentences2 = []
+    for ced_list, annotation1, annotation2 in ced_pairs:
         try:
-            char_level_distance = (
-                sentence_operation.calculate_normalized_character_level_edit_distance(
-                    data
-                )
-            )
-            ced_list.append(
-                char_level_distance.data["normalized_character_level_edit_distance"]
+            pair_sentences1, pair_sentences2 = get_ced_sentences(
+                annotation1, annotation2
             )
-        except Exception as e:
+        except Exception as error:
             continue
-    return ced_list
+        pair_ranges.append(
+            (ced_list, len(sentences1), len(sentences1) + len(pair_sentences1))
+        )
+        sentences1.extend(pair_sentences1)
+        sentences2.extend(pair_sentences2)
+
+    ced_scores = normalized_edit_distances(sentences1, sentences2)
+    for ced_list, start, end in pair_ranges:
+        ced_list.append(
+            get_average_of_a_list(
+                [ced for ced in ced_scores[start:end] if ced is not None]
+            )
+        )
 
 
-def calculate_wer_between_two_annotations(annotation1, annotation2):
-    try:
-        return calculate_word_error_rate_between_two_audio_transcription_annotation(
-            annotation1, annotation2
-        )
-    except Exception as e:
-        return 0
+def append_wer_scores(wer_pairs):
+    """
+    Append the WER of every (list, annotation1, annotation2) to the list, the
+    transcription text of each annotation is built once
+    """
+    texts = {}
 
+    def get_text(annotation):
+        if annotation.id not in texts:
+            try:
+                texts[annotation.id] = get_audio_transcription_text(annotation.result)
+            except Exception as e:
+                texts[annotation.id] = None
+        return texts[annotation.id]
 
-def get_most_recent_annotation(annotation):
-    duplicate_ann = Annotation.objects.filter(
-        task=annotation.task, annotation_type=annotation.annotation_type
+    wer_scores = word_error_rates(
+        [get_text(annotation1) for _, annotation1, _ in wer_pairs],
+        [get_text(annotation2) for _, _, annotation2 in wer_pairs],
     )
-    for ann in duplicate_ann:
-        if annotation.updated_at < ann.updated_at:
-            annotation = ann
-    return annotation
+    for (wer_list, _, _), wer_score in zip(wer_pairs, wer_scores):
+        wer_list.append(0 if wer_score is None else wer_score)
 
 
 @shared_task(bind=True)
@@ -1576,28 +1534,19 @@ def schedule_mail_to_download_all_projects(
             print(f"Error while releasing the lock for {task_name}: {str(e)}")
         return 0
     user = User.objects.get(id=user_id)
-    with tempfile.TemporaryDirectory() as temp_dir:
-        for proj in proj_objs:
-            proj_view_set_obj = ProjectViewSet()
-            factory = APIRequestFactory()
-            url = f"/projects/{proj.id}/download"
-            query_params = QueryDict(mutable=True)
-            query_params["include_input_data_metadata_json"] = "true"
-            query_params["export_type"] = "CSV"
-            query_params[
-                "task_status"
-            ] = "incomplete,annotated,reviewed,super_checked,exported"
-            custom_request = Request(factory.get(url, data=query_params, timeout=15))
-            custom_request.user = user
-            try:
-                proj_file = proj_view_set_obj.download(custom_request, proj.id)
-            except Exception as e:
-                print(f"Downloading project timed out, Project id- {proj.id}")
-                continue
-            file_path = os.path.join(temp_dir, f"{proj.id} - {proj.title}.csv")
-            with open(file_path, "wb") as f:
-                f.write(proj_file.content)
-        url = upload_all_projects_to_blob_and_get_url(temp_dir)
+    total_count = len(proj_objs)
+
+    def report_progress(success_count, processed_count):
+        self.update_state(
+            state="PROGRESS",
+            meta={
+                "success_count": success_count,
+                "processed_count": processed_count,
+                "total_count": total_count,
+            },
+        )
+
+    url = upload_all_projects_to_blob_and_get_url(proj_objs, report_progress)
     if url:
         message = (
             "Dear "
@@ -1634,7 +1583,7 @@ def schedule_mail_to_download_all_projects(
         print(url)
 
 
-def upload_all_projects_to_blob_and_get_url(csv_files_directory):
+def upload_all_projects_to_blob_and_get_url(proj_objs, progress_callback=None):
     date_time_string = datetime.datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
     zip_file_name = f"output_all_projects - {date_time_string}.zip"
     AZURE_STORAGE_CONNECTION_STRING = os.getenv("AZURE_CONNECTION_STRING")
@@ -1655,39 +1604,25 @@ def upload_all_projects_to_blob_and_get_url(csv_files_directory):
     ):
         print("Azure Blob Storage connection test failed. Exiting...")
         return "test_container_connection failed"
-    blob_url = ""
-    if os.path.exists(csv_files_directory):
-        zip_file_path_on_disk = csv_files_directory + "/" + f"{zip_file_name}"
-        try:
-            with zipfile.ZipFile(
-                zip_file_path_on_disk, "w", zipfile.ZIP_DEFLATED
-            ) as zipf:
-                for root, dirs, files in os.walk(csv_files_directory):
-                    for file in files:
-                        if file.endswith(".csv"):
-                            file_path = os.path.join(root, file)
-                            zipf.write(
-                                file_path,
-                                os.path.relpath(file_path, csv_files_directory),
-                            )
-        except Exception as e:
-            return "Error in creating zip file"
-        blob_client = container_client.get_blob_client(zip_file_name)
-        with open(zip_file_path_on_disk, "rb") as file:
-            blob_client.upload_blob(file, blob_type="BlockBlob")
-        try:
-            expiry = datetime.datetime.now() + datetime.timedelta(hours=1)
-            account_name = extract_account_name(AZURE_STORAGE_CONNECTION_STRING)
-            endpoint_suffix = extract_endpoint_suffix(AZURE_STORAGE_CONNECTION_STRING)
-            sas_token = generate_blob_sas(
-                container_name=CONTAINER_NAME_FOR_DOWNLOAD_ALL_PROJECTS,
-                blob_name=blob_client.blob_name,
-                account_name=account_name,
-                account_key=extract_account_key(AZURE_STORAGE_CONNECTION_STRING),
-                permission=BlobSasPermissions(read=True),
-                expiry=expiry,
-            )
-        except Exception as e:
-            return "Error in generating url"
-        blob_url = f"https://{account_name}.blob.{endpoint_suffix}/{CONTAINER_NAME_FOR_DOWNLOAD_ALL_PROJECTS}/{blob_client.blob_name}?{sas_token}"
+    blob_client = container_client.get_blob_client(zip_file_name)
+    try:
+        build_projects_archive(proj_objs, blob_client, progress_callback)
+    except Exception as e:
+        print(f"Error in creating zip file: {e}")
+        return "Error in creating zip file"
+    try:
+        expiry = datetime.datetime.now() + datetime.timedelta(hours=1)
+        account_name = extract_account_name(AZURE_STORAGE_CONNECTION_STRING)
+        endpoint_suffix = extract_endpoint_suffix(AZURE_STORAGE_CONNECTION_STRING)
+        sas_token = generate_blob_sas(
+            container_name=CONTAINER_NAME_FOR_DOWNLOAD_ALL_PROJECTS,
+            blob_name=blob_client.blob_name,
+            account_name=account_name,
+            account_key=extract_account_key(AZURE_STORAGE_CONNECTION_STRING),
+            permission=BlobSasPermissions(read=True),
+            expiry=expiry,
+        )
+    except Exception as e:
+        return "Error in generating url"
+    blob_url = f"https://{account_name}.blob.{endpoint_suffix}/{CONTAINER_NAME_FOR_DOWNLOAD_ALL_PROJECTS}/{blob_client.blob_name}?{sas_token}"
     return blob_url
@@ -1,3 +1,70 @@
-from django.test import TestCase
+from unittest import mock
 
-# Create your tests here.
+from django.db import DatabaseError
+from django.test import TestCase, override_settings
+
+from dataset.models import DatasetInstance, OCRDocument
+from functions.prediction_pipeline import generate_predictions
+from organizations.models import Organization
+
+
+def predict(item):
+    return {"status": "Success", "output": [{"text": f"image {item['image_url']}"}]}
+
+
+@override_settings(PREDICTION_CHUNK_SIZE=2, PREDICTION_RATE_LIMIT=0)
+@mock.patch("functions.prediction_pipeline.clear_checkpoint")
+@mock.patch("functions.prediction_pipeline.get_checkpoint", return_value=0)
+class GeneratePredictionsTests(TestCase):
+    def setUp(self):
+        organization = Organization.objects.create(title="Predictions")
+        self.instance = DatasetInstance.objects.create(
+            instance_name="OCR",
+            organisation_id=organization,
+            dataset_type="OCRDocument",
+        )
+        self.items = [
+            OCRDocument.objects.create(
+                instance_id=self.instance,
+                file_type="PNG",
+                image_url=f"https://example.com/{i}.png",
+                language="English",
+                ocr_type="PR",
+                ocr_domain="BO",
+            )
+            for i in range(3)
+        ]
+
+    def generate(self):
+        return generate_predictions(
+            "generate_ocr_prediction_json",
+            OCRDocument,
+            self.instance.instance_id,
+            "test",
+            "ocr_prediction_json",
+            ["image_url"],
+            predict,
+            False,
+        )
+
+    @mock.patch("functions.prediction_pipeline.set_checkpoint")
+    def test_predictions_are_stored(self, set_checkpoint, *_):
+        self.assertEqual(self.generate(), (3, 3))
+
+        for item in self.items:
+            item.refresh_from_db()
+            self.assertEqual(
+                item.ocr_prediction_json, [{"text": f"image {item.image_url}"}]
+            )
+        self.assertEqual(set_checkpoint.call_count, 2)
+
+    @mock.patch("functions.prediction_pipeline.set_checkpoint")
+    def test_failed_writes_abort_the_run(self, set_checkpoint, _, clear_checkpoint):
+        with mock.patch.object(
+            OCRDocument.objects, "bulk_update", side_effect=DatabaseError
+        ):
+            with self.assertRaises(DatabaseError):
+                self.generate()
+
+        set_checkpoint.assert_not_called()
+        clear_checkpoint.assert_not_called()
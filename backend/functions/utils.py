@@ -1,8 +1,11 @@
+import hashlib
 import json
 import os
 import re
 
+import redis
 import requests
+from django.conf import settings
 from dataset import models as dataset_models
 from google.cloud import translate_v2 as translate
 from google.oauth2 import service_account
@@ -19,6 +22,7 @@ from users.utils import (
 )
 from google.cloud import vision
 from users.utils import LANG_NAME_TO_CODE_ULCA
+from utils.redis_connection import get_redis_connection
 
 try:
     from utils.azure_translate import translator_object
@@ -464,6 +468,98 @@ def get_batch_translations(
         return {"status": "success", "output": translations_output}
 
 
+def get_translation_cache_key(sentence, source_lang, target_lang, api_type, checks):
+    content = json.dumps(
+        [sentence, source_lang, target_lang, api_type, checks], ensure_ascii=False
+    )
+    return "translation_cache:" + hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+
+def get_cached_batch_translations(
+    sentences_to_translate,
+    source_lang,
+    target_lang,
+    api_type,
+    checks_for_particular_languages,
+) -> dict:
+    """Function to get the translation for the input sentences, reusing the translations
+    cached in redis and caching the new ones. Only the sentences which are not in the
+    cache are sent to the API, each of them once.
+
+    Args:
+        sentences_to_translate (list): List of sentences to be translated.
+        source_lang (str): Original language of the sentence.
+        target_lang (str): Final language of the sentence.
+        api_type (str): Type of API to be used for translation.
+        checks_for_particular_languages (bool): If True, checks for the particular languages in the translations.
+
+    Returns:
+        dict: Dictionary containing the translated sentences or error message.
+    """
+    if api_type == "blank" or not sentences_to_translate:
+        return get_batch_translations(
+            sentences_to_translate,
+            source_lang,
+            target_lang,
+            api_type,
+            checks_for_particular_languages,
+        )
+
+    cache_keys = [
+        get_translation_cache_key(
+            sentence,
+            source_lang,
+            target_lang,
+            api_type,
+            checks_for_particular_languages,
+        )
+        for sentence in sentences_to_translate
+    ]
+    try:
+        connection = get_redis_connection()
+        cached_translations = connection.mget(cache_keys)
+    except redis.RedisError as e:
+        print(f"Translation cache is unavailable. Error: {e}")
+        connection = None
+        cached_translations = [None] * len(cache_keys)
+
+    translations = {
+        key: translation.decode("utf-8")
+        for key, translation in zip(cache_keys, cached_translations)
+        if translation is not None
+    }
+    missing_sentences = {}
+    for key, sentence in zip(cache_keys, sentences_to_translate):
+        if key not in translations:
+            missing_sentences[key] = sentence
+
+    if missing_sentences:
+        translations_output = get_batch_translations(
+            list(missing_sentences.values()),
+            source_lang,
+            target_lang,
+            api_type,
+            checks_for_particular_languages,
+        )
+        if translations_output["status"] == "failure":
+            return translations_output
+        if len(translations_output["output"]) != len(missing_sentences):
+            return translations_output
+
+        new_translations = dict(zip(missing_sentences, translations_output["output"]))
+        translations.update(new_translations)
+        if connection is not None:
+            try:
+                pipeline = connection.pipeline(transaction=False)
+                for key, translation in new_translations.items():
+                    pipeline.set(key, translation, ex=settings.TRANSLATION_CACHE_TTL)
+                pipeline.execute()
+            except redis.RedisError as e:
+                print(f"Unable to cache the translations. Error: {e}")
+
+    return {"status": "success", "output": [translations[key] for key in cache_keys]}
+
+
 def get_batch_ocr_predictions(id, image_url, api_type):
     """Function to get the ocr predictions for the images using various APIs.
 
@@ -0,0 +1,54 @@
+# Generated by Django 3.2.14 on 2026-10-18 15:20
+
+import hashlib
+
+from django.db import migrations, models
+
+
+def update_receivers_hash(apps, schema_editor):
+    Notification = apps.get_model("notifications", "Notification")
+    NotificationReceiver = Notification.reciever_user_id.through
+
+    receivers = {}
+    for notification_id, user_id in NotificationReceiver.objects.values_list(
+        "notification_id", "user_id"
+    ).iterator(chunk_size=10000):
+        receivers.setdefault(notification_id, []).append(user_id)
+
+    objs = [
+        Notification(
+            id=notification_id,
+            receivers_hash=hashlib.sha256(
+                ",".join(str(user_id) for user_id in sorted(set(user_ids))).encode()
+            ).hexdigest(),
+        )
+        for notification_id, user_ids in receivers.items()
+    ]
+    Notification.objects.bulk_update(objs, ["receivers_hash"], batch_size=10000)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("notifications", "0006_auto_20240326_0437"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="notification",
+            name="receivers_hash",
+            field=models.CharField(
+                blank=True,
+                default="",
+                help_text="Hash of the ids of the receivers, used to aggregate notifications.",
+                max_length=64,
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="notification",
+            index=models.Index(
+                fields=["notification_type", "title", "receivers_hash"],
+                name="notification_receivers_idx",
+            ),
+        ),
+        migrations.RunPython(update_receivers_hash, migrations.RunPython.noop),
+    ]
@@ -43,9 +43,21 @@ class Notification(models.Model):
         null=True,
         help_text="JSON field to store information about whether the notification has been seen.",
     )
+    receivers_hash = models.CharField(
+        max_length=64,
+        blank=True,
+        default="",
+        help_text="Hash of the ids of the receivers, used to aggregate notifications.",
+    )
 
     class Meta:
         ordering = ("-created_at",)
+        indexes = [
+            models.Index(
+                fields=["notification_type", "title", "receivers_hash"],
+                name="notification_receivers_idx",
+            )
+        ]
 
     def __str__(self) -> str:
         return f"{self.title} notification"
@@ -1,32 +1,100 @@
+import hashlib
+
 from celery import shared_task
 
 from notifications.models import Notification
 from users.models import User
 from django.db import models, transaction
-from datetime import datetime
+from django.utils import timezone
 
 NOTIFICATION_CREATED = {"message": "Notification created successfully"}
 NOTIFICATION_CREATION_FAILED = {"message": "Notification creation failed"}
 
+NotificationReceiver = Notification.reciever_user_id.through
 
-def delete_excess_Notification(user):
-    user_notifications_count = len(Notification.objects.filter(reciever_user_id=user))
-    if user_notifications_count >= user.notification_limit:
-        excess_notifications = Notification.objects.filter(
-            reciever_user_id=user
-        ).order_by("created_at")[: user_notifications_count - user.notification_limit]
-        for excess_notification in excess_notifications:
-            excess_notification.reciever_user_id.remove(user)
-            if len(excess_notification.reciever_user_id.all()) == 0:
-                excess_notification.delete()
-    return 0
+
+def get_receivers_hash(users_ids):
+    """
+    Hash of a set of receivers, notifications with the same title, type and
+    hash are aggregated
+    """
+    return hashlib.sha256(
+        ",".join(str(u_id) for u_id in sorted(set(users_ids))).encode()
+    ).hexdigest()
+
+
+def update_receivers_hash(notification_ids):
+    """
+    Recompute the receivers hash of the given notifications from their receivers
+    """
+    receivers = {notification_id: [] for notification_id in notification_ids}
+    for notification_id, user_id in NotificationReceiver.objects.filter(
+        notification_id__in=notification_ids
+    ).values_list("notification_id", "user_id"):
+        receivers[notification_id].append(user_id)
+    Notification.objects.bulk_update(
+        [
+            Notification(
+                id=notification_id, receivers_hash=get_receivers_hash(user_ids)
+            )
+            for notification_id, user_ids in receivers.items()
+        ],
+        ["receivers_hash"],
+    )
+
+
+@shared_task(name="trim_notifications")
+def trim_notifications():
+    """
+    Remove the oldest notifications of the users who have more than their
+    notification_limit, and delete the notifications left without receivers
+    """
+    excess_users = (
+        NotificationReceiver.objects.values("user_id", "user__notification_limit")
+        .annotate(notifications_count=models.Count("id"))
+        .filter(notifications_count__gt=models.F("user__notification_limit"))
+    )
+    trimmed_notification_ids = set()
+    for excess_user in excess_users:
+        excess_receivers = list(
+            NotificationReceiver.objects.filter(user_id=excess_user["user_id"])
+            .order_by("-notification__created_at", "-notification_id")
+            .values_list("id", "notification_id")[
+                excess_user["user__notification_limit"] :
+            ]
+        )
+        NotificationReceiver.objects.filter(
+            id__in=[receiver_id for receiver_id, _ in excess_receivers]
+        ).delete()
+        trimmed_notification_ids.update(
+            notification_id for _, notification_id in excess_receivers
+        )
+
+    if trimmed_notification_ids:
+        Notification.objects.filter(
+            id__in=trimmed_notification_ids, reciever_user_id__isnull=True
+        ).delete()
+        update_receivers_hash(
+            list(
+                Notification.objects.filter(
+                    id__in=trimmed_notification_ids
+                ).values_list("id", flat=True)
+            )
+        )
+    return len(trimmed_notification_ids)
 
 
-# @shared_task
+@shared_task
 def create_notification_handler(
     title, notification_type, users_ids, project_id=None, task_id=None
 ):
-    if not notification_aggregated(title, notification_type, users_ids):
+    users_ids = list(
+        User.objects.filter(id__in=list(users_ids)).values_list("id", flat=True)
+    )
+    if not users_ids:
+        return 0
+    receivers_hash = get_receivers_hash(users_ids)
+    if not notification_aggregated(title, notification_type, receivers_hash):
         notitification_url = (
             f"/projects/{project_id}/task/{task_id}"
             if project_id and task_id
@@ -41,14 +109,17 @@ def create_notification_handler(
             title=title,
             metadata_json="null",
             on_click=notitification_url,
+            receivers_hash=receivers_hash,
         )
         try:
             with transaction.atomic():
                 new_notif.save()
-                for u_id in users_ids:
-                    receiver_user = User.objects.get(id=u_id)
-                    new_notif.reciever_user_id.add(receiver_user)
-                    delete_excess_Notification(receiver_user)
+                NotificationReceiver.objects.bulk_create(
+                    [
+                        NotificationReceiver(notification_id=new_notif.id, user_id=u_id)
+                        for u_id in users_ids
+                    ]
+                )
         except Exception as e:
             print(NOTIFICATION_CREATION_FAILED)
         print(NOTIFICATION_CREATED)
@@ -57,16 +128,12 @@ def create_notification_handler(
     return 0
 
 
-def notification_aggregated(title, notification_type, users_ids):
-    users_ids.sort()
-    existing_notif = Notification.objects.filter(
-        notification_type=notification_type, title=title
+def notification_aggregated(title, notification_type, receivers_hash):
+    return (
+        Notification.objects.filter(
+            notification_type=notification_type,
+            title=title,
+            receivers_hash=receivers_hash,
+        ).update(created_at=timezone.now())
+        > 0
     )
-    for en in existing_notif:
-        existing_notif_receivers = en.reciever_user_id.all()
-        existing_notif_receivers_ids = [e.id for e in existing_notif_receivers]
-        if users_ids == sorted(existing_notif_receivers_ids):
-            en.created_at = datetime.now()
-            en.save()
-            return True
-    return False
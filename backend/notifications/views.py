@@ -1,5 +1,6 @@
 import json
 
+from django.db import transaction
 from django.db.models import Q
 from drf_yasg import openapi
 from drf_yasg.utils import swagger_auto_schema
@@ -24,9 +25,17 @@ def createNotification(
     title, notification_type, users_ids, project_id=None, task_id=None
 ):
     """calling shared task of notification creation from tasks"""
-    create_notification_handler(
-        title, notification_type, users_ids, project_id, task_id
-    )
+    users_ids = list(users_ids)
+
+    def send_notification():
+        try:
+            create_notification_handler.delay(
+                title, notification_type, users_ids, project_id, task_id
+            )
+        except Exception as e:
+            print(f"Unable to schedule the notification creation. Error: {e}")
+
+    transaction.on_commit(send_notification)
     print(f"Creating notifications title- {title} for users_ids- {users_ids}")
     return 0
 
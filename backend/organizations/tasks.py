@@ -4,7 +4,7 @@ from celery import shared_task
 import pandas as pd
 from django.conf import settings
 from django.core.mail import EmailMessage
-from tasks.views import SentenceOperationViewSet
+from utils.sentence_scores import bleu_scores, normalized_edit_distances
 
 from tasks.models import (
     Task,
@@ -12,7 +12,12 @@ from tasks.models import (
     ANNOTATOR_ANNOTATION,
     REVIEWER_ANNOTATION,
     SUPER_CHECKER_ANNOTATION,
+    LABELED,
+    SKIPPED,
+    UNLABELED,
+    DRAFT,
 )
+from tasks.annotation_stats import get_annotation_stats
 from .models import Organization
 from users.models import User
 from projects.models import Project, ANNOTATION_STAGE, REVIEW_STAGE
@@ -53,23 +58,15 @@ def get_all_annotation_reports(
     email = user.email
     user_lang = user.languages
 
-    if not start_date:
-        submitted_tasks = Annotation.objects.filter(
-            annotation_status="labeled",
-            task__project_id__in=proj_ids,
-            annotation_type=ANNOTATOR_ANNOTATION,
-            completed_by=userid,
-        )
-    else:
-        submitted_tasks = Annotation.objects.filter(
-            annotation_status="labeled",
-            task__project_id__in=proj_ids,
-            annotation_type=ANNOTATOR_ANNOTATION,
-            completed_by=userid,
-            updated_at__range=[start_date, end_date],
-        )
-
-    submitted_tasks_count = submitted_tasks.count()
+    submitted_stats = get_annotation_stats(
+        proj_ids,
+        userid,
+        ANNOTATOR_ANNOTATION,
+        [LABELED],
+        start_date,
+        end_date,
+    )
+    submitted_tasks_count = submitted_stats["annotations_count"]
 
     project_type_lower = project_type.lower()
     is_translation_project = True if "translation" in project_type_lower else False
@@ -78,37 +75,17 @@ def get_all_annotation_reports(
         if project_type in ["ConversationTranslationEditing", "ConversationTranslation"]
         else False
     )
-    total_audio_duration_list = []
-    total_raw_audio_duration_list = []
-    total_word_count_list = []
-    only_tasks = False
-    if is_translation_project:
-        for anno in submitted_tasks:
-            try:
-                total_word_count_list.append(anno.task.data["word_count"])
-            except:
-                pass
-    elif "OCRTranscription" in project_type:
-        for anno in submitted_tasks:
-            total_word_count_list.append(ocr_word_count(anno.result))
-    elif (
-        project_type in get_audio_project_types() or project_type == "AllAudioProjects"
-    ):
-        for anno in submitted_tasks:
-            try:
-                total_audio_duration_list.append(
-                    get_audio_transcription_duration(anno.result)
-                )
-                total_raw_audio_duration_list.append(anno.task.data["audio_duration"])
-            except:
-                pass
-    else:
-        only_tasks = True
+    only_tasks = not (
+        is_translation_project
+        or "OCRTranscription" in project_type
+        or project_type in get_audio_project_types()
+        or project_type == "AllAudioProjects"
+    )
 
-    total_word_count = sum(total_word_count_list)
-    total_audio_duration = convert_seconds_to_hours(sum(total_audio_duration_list))
+    total_word_count = submitted_stats["word_count"]
+    total_audio_duration = convert_seconds_to_hours(submitted_stats["audio_duration"])
     total_raw_audio_duration = convert_seconds_to_hours(
-        sum(total_raw_audio_duration_list)
+        submitted_stats["raw_audio_duration"]
     )
 
     result = {
@@ -164,33 +141,20 @@ def get_all_review_reports(
     email = user.email
     user_lang = user.languages
 
-    if not start_date:
-        submitted_tasks = Annotation.objects.filter(
-            annotation_status__in=[
-                "accepted",
-                "to_be_revised",
-                "accepted_with_minor_changes",
-                "accepted_with_major_changes",
-            ],
-            task__project_id__in=proj_ids,
-            task__review_user=userid,
-            annotation_type=REVIEWER_ANNOTATION,
-        )
-    else:
-        submitted_tasks = Annotation.objects.filter(
-            annotation_status__in=[
-                "accepted",
-                "to_be_revised",
-                "accepted_with_minor_changes",
-                "accepted_with_major_changes",
-            ],
-            task__project_id__in=proj_ids,
-            task__review_user=userid,
-            annotation_type=REVIEWER_ANNOTATION,
-            updated_at__range=[start_date, end_date],
-        )
-
-    submitted_tasks_count = submitted_tasks.count()
+    submitted_stats = get_annotation_stats(
+        proj_ids,
+        userid,
+        REVIEWER_ANNOTATION,
+        [
+            "accepted",
+            "to_be_revised",
+            "accepted_with_minor_changes",
+            "accepted_with_major_changes",
+        ],
+        start_date,
+        end_date,
+    )
+    submitted_tasks_count = submitted_stats["annotations_count"]
 
     project_type_lower = project_type.lower()
     is_translation_project = True if "translation" in project_type_lower else False
@@ -199,37 +163,17 @@ def get_all_review_reports(
         if project_type in ["ConversationTranslationEditing", "ConversationTranslation"]
         else False
     )
-    total_audio_duration_list = []
-    total_raw_audio_duration_list = []
-    total_word_count_list = []
-    only_tasks = False
-    if is_translation_project:
-        for anno in submitted_tasks:
-            try:
-                total_word_count_list.append(anno.task.data["word_count"])
-            except:
-                pass
-    elif "OCRTranscription" in project_type:
-        for anno in submitted_tasks:
-            total_word_count_list.append(ocr_word_count(anno.result))
-    elif (
-        project_type in get_audio_project_types() or project_type == "AllAudioProjects"
-    ):
-        for anno in submitted_tasks:
-            try:
-                total_audio_duration_list.append(
-                    get_audio_transcription_duration(anno.result)
-                )
-                total_raw_audio_duration_list.append(anno.task.data["audio_duration"])
-            except:
-                pass
-    else:
-        only_tasks = True
+    only_tasks = not (
+        is_translation_project
+        or "OCRTranscription" in project_type
+        or project_type in get_audio_project_types()
+        or project_type == "AllAudioProjects"
+    )
 
-    total_word_count = sum(total_word_count_list)
-    total_audio_duration = convert_seconds_to_hours(sum(total_audio_duration_list))
+    total_word_count = submitted_stats["word_count"]
+    total_audio_duration = convert_seconds_to_hours(submitted_stats["audio_duration"])
     total_raw_audio_duration = convert_seconds_to_hours(
-        sum(total_raw_audio_duration_list)
+        submitted_stats["raw_audio_duration"]
     )
 
     result = {
@@ -280,23 +224,15 @@ def get_all_supercheck_reports(
     email = user.email
     user_lang = user.languages
 
-    if not start_date:
-        submitted_tasks = Annotation.objects.filter(
-            annotation_status__in=["validated", "validated_with_changes", "rejected"],
-            task__project_id__in=proj_ids,
-            task__super_check_user=userid,
-            annotation_type=SUPER_CHECKER_ANNOTATION,
-        )
-    else:
-        submitted_tasks = Annotation.objects.filter(
-            annotation_status__in=["validated", "validated_with_changes", "rejected"],
-            task__project_id__in=proj_ids,
-            task__super_check_user=userid,
-            annotation_type=SUPER_CHECKER_ANNOTATION,
-            updated_at__range=[start_date, end_date],
-        )
-
-    submitted_tasks_count = submitted_tasks.count()
+    validated_stats = get_annotation_stats(
+        proj_ids,
+        userid,
+        SUPER_CHECKER_ANNOTATION,
+        ["validated", "validated_with_changes", "rejected"],
+        start_date,
+        end_date,
+    )
+    submitted_tasks_count = validated_stats["annotations_count"]
 
     project_type_lower = project_type.lower()
     is_translation_project = True if "translation" in project_type_lower else False
@@ -305,41 +241,19 @@ def get_all_supercheck_reports(
         if project_type in ["ConversationTranslationEditing", "ConversationTranslation"]
         else False
     )
-    validated_word_count_list = []
-    validated_audio_duration_list = []
-    validated_raw_audio_duration_list = []
-    only_tasks = False
-    if is_translation_project:
-        for anno in submitted_tasks:
-            try:
-                validated_word_count_list.append(anno.task.data["word_count"])
-            except:
-                pass
-    elif "OCRTranscription" in project_type:
-        for anno in submitted_tasks:
-            validated_word_count_list.append(ocr_word_count(anno.result))
-    elif (
-        project_type in get_audio_project_types() or project_type == "AllAudioProjects"
-    ):
-        for anno in submitted_tasks:
-            try:
-                validated_audio_duration_list.append(
-                    get_audio_transcription_duration(anno.result)
-                )
-                validated_raw_audio_duration_list.append(
-                    anno.task.data["audio_duration"]
-                )
-            except:
-                pass
-    else:
-        only_tasks = True
+    only_tasks = not (
+        is_translation_project
+        or "OCRTranscription" in project_type
+        or project_type in get_audio_project_types()
+        or project_type == "AllAudioProjects"
+    )
 
-    validated_word_count = sum(validated_word_count_list)
+    validated_word_count = validated_stats["word_count"]
     validated_audio_duration = convert_seconds_to_hours(
-        sum(validated_audio_duration_list)
+        validated_stats["audio_duration"]
     )
     validated_raw_audio_duration = convert_seconds_to_hours(
-        sum(validated_raw_audio_duration_list)
+        validated_stats["raw_audio_duration"]
     )
 
     result = {
@@ -637,89 +551,46 @@ def get_counts(
         )
 
     else:
-        labeled_annotations = Annotation.objects.filter(
-            task__project_id__in=proj_ids,
-            annotation_status="labeled",
-            annotation_type=ANNOTATOR_ANNOTATION,
-            updated_at__range=[start_date, end_date],
-            completed_by=annotator,
+        labeled_stats = get_annotation_stats(
+            proj_ids, annotator, ANNOTATOR_ANNOTATION, [LABELED], start_date, end_date
         )
 
-        annotated_tasks = labeled_annotations.count()
-        lead_time_annotated_tasks = [
-            eachtask.lead_time for eachtask in labeled_annotations
-        ]
+        annotated_tasks = labeled_stats["annotations_count"]
         avg_lead_time = 0
-        if len(lead_time_annotated_tasks) > 0:
-            avg_lead_time = sum(lead_time_annotated_tasks) / len(
-                lead_time_annotated_tasks
-            )
+        if annotated_tasks > 0:
+            avg_lead_time = labeled_stats["lead_time"] / annotated_tasks
         total_word_count = 0
-        if is_translation_project or project_type == "SemanticTextualSimilarity_Scale5":
-            total_word_count_list = []
-            for each_task in labeled_annotations:
-                try:
-                    total_word_count_list.append(each_task.task.data["word_count"])
-                except:
-                    pass
-
-            total_word_count = sum(total_word_count_list)
-        elif "OCRTranscription" in project_type:
-            total_word_count = 0
-            for each_anno in labeled_annotations:
-                total_word_count += ocr_word_count(each_anno.result)
+        if (
+            is_translation_project
+            or project_type == "SemanticTextualSimilarity_Scale5"
+            or "OCRTranscription" in project_type
+        ):
+            total_word_count = labeled_stats["word_count"]
 
         total_duration = "0:00:00"
         avg_segment_duration = 0
         avg_segments_per_task = 0
         if project_type in get_audio_project_types():
-            total_duration_list = []
-            total_raw_duration_list = []
-            total_audio_segments_list = []
-            for each_task in labeled_annotations:
-                try:
-                    total_duration_list.append(
-                        get_audio_transcription_duration(each_task.result)
-                    )
-                    total_audio_segments_list.append(
-                        get_audio_segments_count(each_task.result)
-                    )
-                    total_raw_duration_list.append(
-                        each_task.task.data["audio_duration"]
-                    )
-                except:
-                    pass
-            total_duration = convert_seconds_to_hours(sum(total_duration_list))
-            total_raw_duration = convert_seconds_to_hours(sum(total_raw_duration_list))
-            total_audio_segments = sum(total_audio_segments_list)
+            total_duration = convert_seconds_to_hours(labeled_stats["audio_duration"])
+            total_raw_duration = convert_seconds_to_hours(
+                labeled_stats["raw_audio_duration"]
+            )
+            total_audio_segments = labeled_stats["audio_segments_count"]
             try:
                 avg_segment_duration = total_duration / total_audio_segments
-                avg_segments_per_task = total_audio_segments / len(labeled_annotations)
+                avg_segments_per_task = total_audio_segments / annotated_tasks
             except:
                 avg_segment_duration = 0
                 avg_segments_per_task = 0
 
-    total_skipped_tasks = Annotation.objects.filter(
-        task__project_id__in=proj_ids,
-        annotation_status="skipped",
-        annotation_type=ANNOTATOR_ANNOTATION,
-        updated_at__range=[start_date, end_date],
-        completed_by=annotator,
+    total_skipped_tasks = get_annotation_stats(
+        proj_ids, annotator, ANNOTATOR_ANNOTATION, [SKIPPED], start_date, end_date
     )
-    all_pending_tasks_in_project = Annotation.objects.filter(
-        task__project_id__in=proj_ids,
-        annotation_status="unlabeled",
-        annotation_type=ANNOTATOR_ANNOTATION,
-        updated_at__range=[start_date, end_date],
-        completed_by=annotator,
+    all_pending_tasks_in_project = get_annotation_stats(
+        proj_ids, annotator, ANNOTATOR_ANNOTATION, [UNLABELED], start_date, end_date
     )
-
-    all_draft_tasks_in_project = Annotation.objects.filter(
-        task__project_id__in=proj_ids,
-        annotation_status="draft",
-        annotation_type=ANNOTATOR_ANNOTATION,
-        updated_at__range=[start_date, end_date],
-        completed_by=annotator,
+    all_draft_tasks_in_project = get_annotation_stats(
+        proj_ids, annotator, ANNOTATOR_ANNOTATION, [DRAFT], start_date, end_date
     )
 
     return (
@@ -731,9 +602,9 @@ def get_counts(
         accepted_wt_major_changes,
         labeled,
         avg_lead_time,
-        total_skipped_tasks.count(),
-        all_pending_tasks_in_project.count(),
-        all_draft_tasks_in_project.count(),
+        total_skipped_tasks["annotations_count"],
+        all_pending_tasks_in_project["annotations_count"],
+        all_draft_tasks_in_project["annotations_count"],
         project_count,
         no_of_workspaces_objs,
         total_word_count,
@@ -753,7 +624,6 @@ def get_translation_quality_reports(
     project_progress_stage=None,
     tgt_language=None,
 ):
-    sentence_operation = SentenceOperationViewSet()
     if tgt_language == None:
         projects_objs = Project.objects.filter(
             organization_id_id=pk,
@@ -859,41 +729,38 @@ def get_translation_quality_reports(
         minor_changes_annotations_of_user
     )
 
-    total_bleu_score = 0
-    total_char_score = 0
-
-    bleu_score_error_count = 0
-    char_score_error_count = 0
-    total_lead_time = []
-    for annot in accepted_with_changes_tasks:
-        annotator_obj = annot
-        reviewer_obj = Annotation.objects.filter(
-            parent_annotation_id=annot.id,
+    reviewer_annotations = {
+        ann.parent_annotation_id: ann
+        for ann in Annotation.objects.filter(
+            parent_annotation_id__in=[
+                annot.id for annot in accepted_with_changes_tasks
+            ],
             annotation_type=REVIEWER_ANNOTATION,
         )
+        .order_by("parent_annotation_id", "id")
+        .distinct("parent_annotation_id")
+    }
 
-        str1 = annotator_obj.result[0]["value"]["text"]
-        str2 = reviewer_obj[0].result[0]["value"]["text"]
-        lead_time = reviewer_obj[0].lead_time
-        total_lead_time.append(lead_time)
-
-        data = {"sentence1": str1[0], "sentence2": str2[0]}
-        try:
-            bleu_score = sentence_operation.calculate_bleu_score(data)
-            total_bleu_score += float(bleu_score.data["bleu_score"])
-        except:
-            bleu_score_error_count += 1
-        try:
-            char_level_distance = (
-                sentence_operation.calculate_normalized_character_level_edit_distance(
-                    data
-                )
-            )
-            total_char_score += float(
-                char_level_distance.data["normalized_character_level_edit_distance"]
-            )
-        except:
-            char_score_error_count += 1
+    annotator_sentences = []
+    reviewer_sentences = []
+    total_lead_time = []
+    for annot in accepted_with_changes_tasks:
+        reviewer_obj = reviewer_annotations[annot.id]
+
+        str1 = annot.result[0]["value"]["text"]
+        str2 = reviewer_obj.result[0]["value"]["text"]
+        total_lead_time.append(reviewer_obj.lead_time)
+
+        annotator_sentences.append(str1[0])
+        reviewer_sentences.append(str2[0])
+
+    # Sentence pairs which can't be scored get None
+    bleu_score_list = bleu_scores(annotator_sentences, reviewer_sentences)
+    char_score_list = normalized_edit_distances(annotator_sentences, reviewer_sentences)
+    total_bleu_score = sum(score for score in bleu_score_list if score is not None)
+    total_char_score = sum(score for score in char_score_list if score is not None)
+    bleu_score_error_count = bleu_score_list.count(None)
+    char_score_error_count = char_score_list.count(None)
 
     if len(accepted_with_changes_tasks) + accepted_count > 0:
         accepted_with_change_minus_bleu_score_error = (
@@ -34,7 +34,7 @@ from drf_yasg import openapi
 from drf_yasg.utils import swagger_auto_schema
 import csv
 from django.http import StreamingHttpResponse
-from tasks.views import SentenceOperationViewSet
+from utils.sentence_scores import bleu_scores, normalized_edit_distances
 from users.utils import get_role_name
 from projects.utils import (
     minor_major_accepted_task,
@@ -118,7 +118,6 @@ def get_translation_quality_reports(
             },
             status=status.HTTP_404_NOT_FOUND,
         )
-    sentence_operation = SentenceOperationViewSet()
     if tgt_language == None:
         projects_objs = Project.objects.filter(
             organization_id_id=pk,
@@ -224,41 +223,38 @@ def get_translation_quality_reports(
         minor_changes_annotations_of_user
     )
 
-    total_bleu_score = 0
-    total_char_score = 0
-
-    bleu_score_error_count = 0
-    char_score_error_count = 0
-    total_lead_time = []
-    for annot in accepted_with_changes_tasks:
-        annotator_obj = annot
-        reviewer_obj = Annotation.objects.filter(
-            parent_annotation_id=annot.id,
+    reviewer_annotations = {
+        ann.parent_annotation_id: ann
+        for ann in Annotation.objects.filter(
+            parent_annotation_id__in=[
+                annot.id for annot in accepted_with_changes_tasks
+            ],
             annotation_type=REVIEWER_ANNOTATION,
         )
+        .order_by("parent_annotation_id", "id")
+        .distinct("parent_annotation_id")
+    }
 
-        str1 = annotator_obj.result[0]["value"]["text"]
-        str2 = reviewer_obj[0].result[0]["value"]["text"]
-        lead_time = reviewer_obj[0].lead_time
-        total_lead_time.append(lead_time)
-
-        data = {"sentence1": str1[0], "sentence2": str2[0]}
-        try:
-            bleu_score = sentence_operation.calculate_bleu_score(data)
-            total_bleu_score += float(bleu_score.data["bleu_score"])
-        except:
-            bleu_score_error_count += 1
-        try:
-            char_level_distance = (
-                sentence_operation.calculate_normalized_character_level_edit_distance(
-                    data
-                )
-            )
-            total_char_score += float(
-                char_level_distance.data["normalized_character_level_edit_distance"]
-            )
-        except:
-            char_score_error_count += 1
+    annotator_sentences = []
+    reviewer_sentences = []
+    total_lead_time = []
+    for annot in accepted_with_changes_tasks:
+        reviewer_obj = reviewer_annotations[annot.id]
+
+        str1 = annot.result[0]["value"]["text"]
+        str2 = reviewer_obj.result[0]["value"]["text"]
+        total_lead_time.append(reviewer_obj.lead_time)
+
+        annotator_sentences.append(str1[0])
+        reviewer_sentences.append(str2[0])
+
+    # Sentence pairs which can't be scored get None
+    bleu_score_list = bleu_scores(annotator_sentences, reviewer_sentences)
+    char_score_list = normalized_edit_distances(annotator_sentences, reviewer_sentences)
+    total_bleu_score = sum(score for score in bleu_score_list if score is not None)
+    total_char_score = sum(score for score in char_score_list if score is not None)
+    bleu_score_error_count = bleu_score_list.count(None)
+    char_score_error_count = char_score_list.count(None)
 
     if len(accepted_with_changes_tasks) + accepted_count > 0:
         accepted_with_change_minus_bleu_score_error = (
@@ -238,14 +238,17 @@ def convert_conversation_json_to_annotation_result(conversation_json, idx):
     return result
 
 
-def draft_data_json_to_annotation_result(draft_data_json, project_type, pk=None):
-    registry_helper = ProjectRegistry.get_instance()
-    input_dataset_info = registry_helper.get_input_dataset_and_fields(project_type)
-    dataset_model = getattr(dataset_models, input_dataset_info["dataset_type"])
-    try:
-        dataset_item = dataset_model.objects.get(pk=pk)
-    except:
-        pass
+def draft_data_json_to_annotation_result(
+    draft_data_json, project_type, pk=None, dataset_item=None
+):
+    if dataset_item is None:
+        registry_helper = ProjectRegistry.get_instance()
+        input_dataset_info = registry_helper.get_input_dataset_and_fields(project_type)
+        dataset_model = getattr(dataset_models, input_dataset_info["dataset_type"])
+        try:
+            dataset_item = dataset_model.objects.get(pk=pk)
+        except:
+            pass
     result = []
     idx = 0
     for field, value in draft_data_json.items():
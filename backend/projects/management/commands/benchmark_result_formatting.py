@@ -0,0 +1,89 @@
+import timeit
+from copy import deepcopy
+
+from django.core.management.base import BaseCommand
+
+from utils.annotation_result import format_speech_result
+from utils.convert_result_to_chitralekha_format import (
+    convert_result_to_chitralekha_format,
+)
+
+
+def build_synthetic_result(segments_count, speakers_count):
+    """
+    Acoustic normalised transcription result with a labels, a verbatim
+    transcription and an acoustic normalised transcription region per segment
+    """
+    result = []
+    for i in range(segments_count):
+        value = {"start": i * 2.5, "end": i * 2.5 + 2.0}
+        result.append(
+            {
+                "id": f"segment_{i}",
+                "from_name": "labels",
+                "to_name": "audio_url",
+                "type": "labels",
+                "value": {**value, "labels": [f"Speaker {i % speakers_count}"]},
+            }
+        )
+        result.append(
+            {
+                "id": f"segment_{i}",
+                "from_name": "verbatim_transcribed_json",
+                "to_name": "audio_url",
+                "type": "textarea",
+                "value": {**value, "text": [f"verbatim text of segment {i}"]},
+            }
+        )
+        result.append(
+            {
+                "id": f"segment_{i}",
+                "from_name": "acoustic_normalised_transcribed_json",
+                "to_name": "audio_url",
+                "type": "textarea",
+                "value": {**value, "text": [f"acoustic text of segment {i}"]},
+            }
+        )
+    result.append(
+        {
+            "id": "standardised",
+            "from_name": "standardised_transcription",
+            "to_name": "audio_url",
+            "type": "textarea",
+            "value": {"text": ["standardised transcription"]},
+        }
+    )
+    return result
+
+
+class Command(BaseCommand):
+    """
+    Command to time the formatting of long speech annotation results.
+    """
+
+    help = "Time the download and chitralekha formatting of synthetic speech annotation results"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--segments", type=int, default=5000)
+        parser.add_argument("--speakers", type=int, default=4)
+        parser.add_argument("--repeat", type=int, default=5)
+
+    def handle(self, *args, **kwargs):
+        result = build_synthetic_result(kwargs["segments"], kwargs["speakers"])
+        speakers_json = [
+            {"name": f"Speaker {i}", "speaker_id": f"speaker_{i}"}
+            for i in range(kwargs["speakers"])
+        ]
+        benchmarks = {
+            "download": lambda: format_speech_result(
+                deepcopy(result), speakers_json, True
+            ),
+            "chitralekha": lambda: convert_result_to_chitralekha_format(
+                deepcopy(result), 1, "AcousticNormalisedTranscriptionEditing"
+            ),
+            "copy of the result": lambda: deepcopy(result),
+        }
+        print(f"{kwargs['segments']} segments, best of {kwargs['repeat']} runs")
+        for name, benchmark in benchmarks.items():
+            best = min(timeit.repeat(benchmark, number=1, repeat=kwargs["repeat"]))
+            print(f"{name}: {best * 1000:.1f} ms")
@@ -0,0 +1,130 @@
+from django.db import transaction
+from django.db.models import F, OuterRef, Q, Subquery
+
+from .models import ROLE_FIELDS, Project, ProjectMembership
+
+"""
+Project memberships of the users
+
+ProjectMembership has a row per user and project with the roles of the user in
+the project, as a bitmask of ANNOTATOR_ROLE, REVIEWER_ROLE and
+SUPER_CHECKER_ROLE, and the last update of an annotation of the user in the
+project. The project listings read the projects of a user and sort them by
+recency from its indexes instead of joining the member tables and reading
+every annotation of the user.
+
+The roles are refreshed from the member tables whenever they change, see the
+m2m_changed receiver in projects/models.py, and last_worked_at is moved
+forward when an annotation is saved, see tasks/models.py. The writers of
+annotations created with bulk_create move it with record_bulk_project_work.
+"""
+
+ALL_ROLES = sum(ROLE_FIELDS)
+
+
+def get_role_values(roles):
+    """
+    Values of ProjectMembership.roles including any of the given roles
+    """
+    return [value for value in range(1, ALL_ROLES + 1) if value & roles]
+
+
+def refresh_membership_roles(project_ids=None, user_ids=None):
+    """
+    Recompute the roles of the memberships of the given projects and users
+    from the project member tables, None selects all of them
+    """
+    scope = Q()
+    if project_ids is not None:
+        scope &= Q(project_id__in=list(project_ids))
+    if user_ids is not None:
+        scope &= Q(user_id__in=list(user_ids))
+
+    roles = {}
+    for role, field in ROLE_FIELDS.items():
+        members = getattr(Project, field).through.objects.filter(scope)
+        for project_id, user_id in members.values_list("project_id", "user_id"):
+            roles[(project_id, user_id)] = roles.get((project_id, user_id), 0) | role
+
+    with transaction.atomic():
+        memberships = ProjectMembership.objects.filter(scope).select_for_update()
+        changed_memberships = []
+        for membership in memberships:
+            membership_roles = roles.pop((membership.project_id, membership.user_id), 0)
+            if membership.roles != membership_roles:
+                membership.roles = membership_roles
+                changed_memberships.append(membership)
+        ProjectMembership.objects.bulk_update(changed_memberships, ["roles"])
+        ProjectMembership.objects.bulk_create(
+            [
+                ProjectMembership(
+                    project_id=project_id, user_id=user_id, roles=membership_roles
+                )
+                for (project_id, user_id), membership_roles in roles.items()
+            ],
+            ignore_conflicts=True,
+        )
+
+
+def record_project_work(user_id, project_id, worked_at):
+    """
+    Move the last work of a user in a project forward to worked_at
+    """
+    updated = (
+        ProjectMembership.objects.filter(user_id=user_id, project_id=project_id)
+        .filter(Q(last_worked_at__isnull=True) | Q(last_worked_at__lt=worked_at))
+        .update(last_worked_at=worked_at)
+    )
+    if not updated:
+        # The user has no membership in the project or already worked on it
+        # later, the conflict leaves the membership unchanged
+        ProjectMembership.objects.bulk_create(
+            [
+                ProjectMembership(
+                    user_id=user_id, project_id=project_id, last_worked_at=worked_at
+                )
+            ],
+            ignore_conflicts=True,
+        )
+
+
+def record_bulk_project_work(annotations, project_id):
+    """
+    Move the last work of the users of annotations of a project written with
+    bulk_create, which doesn't send post_save, forward
+    """
+    last_works = {}
+    for annotation in annotations:
+        if annotation.updated_at is None:
+            continue
+        last_work = last_works.get(annotation.completed_by_id)
+        if last_work is None or annotation.updated_at > last_work:
+            last_works[annotation.completed_by_id] = annotation.updated_at
+    for user_id, worked_at in last_works.items():
+        record_project_work(user_id, project_id, worked_at)
+
+
+def get_member_project_ids(user, roles):
+    """
+    Subquery of the IDs of the projects in which the user has any of the roles
+    """
+    return ProjectMembership.objects.filter(
+        user=user, roles__in=get_role_values(roles)
+    ).values("project_id")
+
+
+def order_by_last_worked(projects, user):
+    """
+    Sort projects by the last work of the user in them, the projects the user
+    hasn't worked on last, by their publication date
+    """
+    return projects.annotate(
+        last_worked_at=Subquery(
+            ProjectMembership.objects.filter(user=user, project=OuterRef("pk")).values(
+                "last_worked_at"
+            )[:1]
+        )
+    ).order_by(
+        F("last_worked_at").desc(nulls_last=True),
+        F("published_at").desc(nulls_last=True),
+    )
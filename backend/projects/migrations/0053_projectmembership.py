@@ -0,0 +1,117 @@
+# Generated by Django 3.2.14 on 2026-10-18 20:05
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+# Project member fields of every role of ProjectMembership.roles
+ROLE_FIELDS = {
+    1: "annotators",
+    2: "annotation_reviewers",
+    4: "review_supercheckers",
+}
+
+
+def create_memberships(apps, schema_editor):
+    Project = apps.get_model("projects", "Project")
+    ProjectMembership = apps.get_model("projects", "ProjectMembership")
+    Annotation = apps.get_model("tasks", "Annotation")
+
+    memberships = {}
+    for role, field in ROLE_FIELDS.items():
+        members = Project._meta.get_field(field).remote_field.through.objects
+        for project_id, user_id in members.values_list("project_id", "user_id"):
+            membership = memberships.setdefault(
+                (project_id, user_id),
+                ProjectMembership(project_id=project_id, user_id=user_id),
+            )
+            membership.roles |= role
+
+    last_works = (
+        Annotation.objects.values("task__project_id", "completed_by_id")
+        .annotate(last_worked_at=models.Max("updated_at"))
+        .values_list("task__project_id", "completed_by_id", "last_worked_at")
+    )
+    for project_id, user_id, last_worked_at in last_works.iterator():
+        membership = memberships.setdefault(
+            (project_id, user_id),
+            ProjectMembership(project_id=project_id, user_id=user_id),
+        )
+        membership.last_worked_at = last_worked_at
+
+    ProjectMembership.objects.bulk_create(memberships.values(), batch_size=5000)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ("projects", "0052_alter_project_project_type"),
+        ("tasks", "0052_asyncjob"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ProjectMembership",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "roles",
+                    models.PositiveSmallIntegerField(
+                        default=0,
+                        help_text="Bitmask of the roles of the user in the project, 0 if the user only has annotations in it",
+                    ),
+                ),
+                (
+                    "last_worked_at",
+                    models.DateTimeField(
+                        blank=True,
+                        help_text="Last update of an annotation of the user in the project",
+                        null=True,
+                    ),
+                ),
+                (
+                    "project",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="memberships",
+                        to="projects.project",
+                        verbose_name="membership_project",
+                    ),
+                ),
+                (
+                    "user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="project_memberships",
+                        to=settings.AUTH_USER_MODEL,
+                        verbose_name="membership_user",
+                    ),
+                ),
+            ],
+            options={
+                "unique_together": {("user", "project")},
+            },
+        ),
+        migrations.AddIndex(
+            model_name="projectmembership",
+            index=models.Index(
+                fields=["user", "roles", "project"], name="project_membership_role_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="projectmembership",
+            index=models.Index(
+                fields=["user", "-last_worked_at"],
+                name="project_membership_recent_idx",
+            ),
+        ),
+        migrations.RunPython(create_memberships, migrations.RunPython.noop),
+    ]
@@ -1,5 +1,7 @@
 from django.conf import settings
 from django.db import models
+from django.db.models.signals import m2m_changed
+from django.dispatch import receiver
 from users.models import User
 from organizations.models import Organization
 from workspaces.models import Workspace
@@ -348,3 +350,76 @@ class ProjectTaskRequestLock(models.Model):
         verbose_name="lock_context",
     )
     expires_at = models.DateTimeField("expires_at")
+
+
+# Roles of a user in a project, combined as a bitmask in ProjectMembership.roles
+ANNOTATOR_ROLE = 1
+REVIEWER_ROLE = 2
+SUPER_CHECKER_ROLE = 4
+
+# Project member fields of every role
+ROLE_FIELDS = {
+    ANNOTATOR_ROLE: "annotators",
+    REVIEWER_ROLE: "annotation_reviewers",
+    SUPER_CHECKER_ROLE: "review_supercheckers",
+}
+
+
+class ProjectMembership(models.Model):
+    """
+    Roles of a user in a project and the last time the user worked on it,
+    kept by projects.memberships for the project listings
+    """
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name="project_memberships",
+        verbose_name="membership_user",
+    )
+    project = models.ForeignKey(
+        Project,
+        on_delete=models.CASCADE,
+        related_name="memberships",
+        verbose_name="membership_project",
+    )
+    roles = models.PositiveSmallIntegerField(
+        default=0,
+        help_text=(
+            "Bitmask of the roles of the user in the project, 0 if the user only has annotations in it"
+        ),
+    )
+    last_worked_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        help_text=("Last update of an annotation of the user in the project"),
+    )
+
+    def __str__(self):
+        return f"{self.user_id} - {self.project_id} - {self.roles}"
+
+    class Meta:
+        unique_together = ("user", "project")
+        indexes = [
+            models.Index(
+                fields=["user", "roles", "project"], name="project_membership_role_idx"
+            ),
+            models.Index(
+                fields=["user", "-last_worked_at"],
+                name="project_membership_recent_idx",
+            ),
+        ]
+
+
+@receiver(m2m_changed, sender=Project.annotators.through)
+@receiver(m2m_changed, sender=Project.annotation_reviewers.through)
+@receiver(m2m_changed, sender=Project.review_supercheckers.through)
+def update_membership_roles(sender, instance, action, reverse, pk_set, **kwargs):
+    from projects.memberships import refresh_membership_roles
+
+    if action not in ("post_add", "post_remove", "post_clear"):
+        return
+    if reverse:
+        refresh_membership_roles(user_ids=[instance.pk], project_ids=pk_set)
+    else:
+        refresh_membership_roles(project_ids=[instance.pk], user_ids=pk_set)
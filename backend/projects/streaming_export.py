@@ -0,0 +1,250 @@
+import csv
+import json
+from datetime import datetime
+
+from dataset import models as dataset_models
+from .utils import (
+    get_audio_project_types,
+    process_conversation_tasks,
+    process_speech_tasks,
+    process_ocr_tasks,
+    process_task,
+)
+
+"""
+Streaming project export
+
+Tasks are read in keyset paginated chunks and converted into rows one at a
+time, so the memory used by an export doesn't depend on the size of the
+project. The rows follow the layout of the files generated by
+DataExport.generate_export_file: the task data, the id of the task and one
+column for each annotated field of the correct annotation.
+"""
+
+DEFAULT_EXPORT_CHUNK_SIZE = 1000
+
+STREAMING_EXPORT_TYPES = ("CSV", "TSV", "JSON", "JSONL")
+
+EXPORT_CONTENT_TYPES = {
+    "CSV": "text/csv",
+    "TSV": "text/tsv",
+    "JSON": "application/json",
+    "JSONL": "application/jsonl",
+}
+
+
+class Echo(object):
+    def write(self, value):
+        return value
+
+
+def serialize_datetime(obj):
+    if isinstance(obj, datetime):
+        return obj.isoformat()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def iter_task_chunks(tasks, chunk_size=DEFAULT_EXPORT_CHUNK_SIZE):
+    """
+    Yield the tasks of a queryset in chunks ordered by id, each chunk is read
+    with one query which starts after the last id of the previous chunk
+    """
+    # process_task reads the annotation users of every task through
+    # model_to_dict
+    tasks = (
+        tasks.select_related("correct_annotation", "correct_annotation__completed_by")
+        .prefetch_related("annotation_users")
+        .order_by("id")
+    )
+    last_id = 0
+    while True:
+        chunk = list(tasks.filter(id__gt=last_id)[:chunk_size])
+        if not chunk:
+            return
+        yield chunk
+        last_id = chunk[-1].id
+
+
+def iter_processed_tasks(
+    project,
+    tasks,
+    export_type,
+    include_input_data_metadata_json=False,
+    chunk_size=DEFAULT_EXPORT_CHUNK_SIZE,
+):
+    """
+    Yield the tasks of a project as the dictionaries used for the export
+    """
+    project_type = project.project_type
+    dataset_type = project.dataset_id.all()[0].dataset_type
+    dataset_model = getattr(dataset_models, dataset_type)
+    is_audio_project_type = project_type in get_audio_project_types()
+    is_ConversationTranslation = project_type == "ConversationTranslation"
+    is_ConversationTranslationEditing = project_type == "ConversationTranslationEditing"
+    is_ConversationVerification = project_type == "ConversationVerification"
+    is_AudioSegmentation = project_type == "AudioSegmentation"
+    is_OCRSegmentCategorizationEditing = (
+        project_type == "OCRSegmentCategorizationEditing"
+    )
+    is_OCRSegmentCategorization = project_type == "OCRSegmentCategorization"
+
+    for chunk in iter_task_chunks(tasks, chunk_size):
+        metadata_json = {}
+        if include_input_data_metadata_json:
+            metadata_json = dict(
+                dataset_model.objects.filter(
+                    pk__in=[task.input_data_id for task in chunk]
+                ).values_list("pk", "metadata_json")
+            )
+        for task in chunk:
+            curr_task = process_task(
+                task,
+                "JSON" if export_type == "JSONL" else export_type,
+                False,
+                None,
+                is_audio_project_type,
+            )
+            if include_input_data_metadata_json:
+                curr_task["data"]["input_data_metadata_json"] = metadata_json.get(
+                    task.input_data_id
+                )
+            if (
+                is_ConversationTranslation
+                or is_ConversationTranslationEditing
+                or is_ConversationVerification
+            ):
+                process_conversation_tasks(
+                    curr_task,
+                    is_ConversationTranslation,
+                    is_ConversationVerification,
+                )
+            elif dataset_type in ["SpeechConversation", "OCRDocument"]:
+                if dataset_type == "SpeechConversation":
+                    process_speech_tasks(curr_task, is_AudioSegmentation, project_type)
+                else:
+                    process_ocr_tasks(
+                        curr_task,
+                        is_OCRSegmentCategorization,
+                        is_OCRSegmentCategorizationEditing,
+                    )
+            yield curr_task
+
+
+def prettify_result_value(values):
+    """
+    Single choice and single text values are exported as plain strings, like
+    the label studio converter does
+    """
+    out = []
+    tag_type = None
+    for value in values:
+        value = dict(value)
+        tag_type = value.pop("type", None)
+        if tag_type == "choices" and len(value.get("choices", [])) == 1:
+            out.append(value["choices"][0])
+        elif tag_type == "textarea" and len(value.get("text", [])) == 1:
+            out.append(value["text"][0])
+        else:
+            out.append(value)
+    if tag_type in ("choices", "textarea") and len(out) == 1:
+        return out[0]
+    return out
+
+
+def task_to_record(task):
+    """
+    Flatten an export task dictionary into a CSV/TSV row
+    """
+    record = {
+        key: "" if value is None else str(value) for key, value in task["data"].items()
+    }
+    record["id"] = task["id"]
+    annotation = task["annotations"][0]
+    result = annotation.get("result") or []
+    if isinstance(result, str):
+        result = json.loads(result)
+    outputs = {}
+    for item in result if isinstance(result, list) else []:
+        if isinstance(item, str):
+            item = json.loads(item)
+        if "from_name" not in item or "value" not in item:
+            continue
+        outputs.setdefault(item["from_name"], []).append(
+            {**item["value"], "type": item.get("type")}
+        )
+    for name, values in outputs.items():
+        pretty_value = prettify_result_value(values)
+        record[name] = (
+            pretty_value
+            if isinstance(pretty_value, str)
+            else json.dumps(pretty_value, ensure_ascii=False)
+        )
+    record["annotator"] = annotation.get("completed_by", "")
+    record["annotation_id"] = annotation.get("id", "")
+    record["created_at"] = annotation.get("created_at", "")
+    record["updated_at"] = annotation.get("updated_at", "")
+    record["lead_time"] = annotation.get("lead_time", "")
+    return record
+
+
+def stream_export_rows(
+    tasks, export_type, header_sample_size=DEFAULT_EXPORT_CHUNK_SIZE
+):
+    """
+    Serialize export task dictionaries one at a time.
+
+    For CSV and TSV, the header is the union of the columns of the first
+    header_sample_size rows, columns which only show up after them are dropped.
+    """
+    if export_type == "JSONL":
+        for task in tasks:
+            yield json.dumps(
+                task, default=serialize_datetime, ensure_ascii=False
+            ) + "\n"
+        return
+    if export_type == "JSON":
+        yield "["
+        for idx, task in enumerate(tasks):
+            yield ("," if idx else "") + json.dumps(
+                task, default=serialize_datetime, ensure_ascii=False
+            )
+        yield "]"
+        return
+
+    tasks = iter(tasks)
+    sample = []
+    for task in tasks:
+        sample.append(task_to_record(task))
+        if len(sample) >= header_sample_size:
+            break
+    if not sample:
+        return
+    fieldnames = list(dict.fromkeys(key for record in sample for key in record))
+    writer = csv.DictWriter(
+        Echo(),
+        fieldnames=fieldnames,
+        delimiter="\t" if export_type == "TSV" else ",",
+        restval="",
+        extrasaction="ignore",
+    )
+    yield writer.writerow(dict(zip(fieldnames, fieldnames)))
+    for record in sample:
+        yield writer.writerow(record)
+    for task in tasks:
+        yield writer.writerow(task_to_record(task))
+
+
+def stream_project_export(
+    project,
+    tasks,
+    export_type,
+    include_input_data_metadata_json=False,
+    chunk_size=DEFAULT_EXPORT_CHUNK_SIZE,
+):
+    """
+    Generator of the export file of a project, for a StreamingHttpResponse
+    """
+    processed_tasks = iter_processed_tasks(
+        project, tasks, export_type, include_input_data_metadata_json, chunk_size
+    )
+    return stream_export_rows(processed_tasks, export_type, chunk_size)
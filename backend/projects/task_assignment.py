@@ -0,0 +1,291 @@
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Subquery
+
+from tasks.annotation_stats import schedule_bulk_annotation_stats_refresh
+from tasks.models import (
+    Task,
+    Annotation,
+    INCOMPLETE,
+    UNLABELED,
+    ANNOTATED,
+    REVIEWED,
+    UNREVIEWED,
+    UNVALIDATED,
+    ANNOTATOR_ANNOTATION,
+    REVIEWER_ANNOTATION,
+    SUPER_CHECKER_ANNOTATION,
+)
+from .memberships import record_bulk_project_work
+from .task_queue import (
+    ANNOTATION_MODE,
+    REVIEW_MODE,
+    SUPERCHECK_MODE,
+    invalidate_queue,
+)
+
+"""
+Task assignment for the task pull endpoints
+
+Tasks are claimed with SELECT ... FOR UPDATE SKIP LOCKED instead of a project
+wide lock, so users pulling tasks from the same project at the same time get
+disjoint batches without waiting on each other. Everything that is written for
+a claimed batch (assignment, base annotations) is written with bulk queries,
+the annotation rollups and the project memberships are updated explicitly
+for the base annotations.
+"""
+
+
+def get_latest_annotations(task_ids, annotation_type):
+    """
+    Map of task id to the most recently updated annotation of the given type
+    """
+    annotations = (
+        Annotation.objects.filter(task_id__in=task_ids, annotation_type=annotation_type)
+        .order_by("task_id", "-updated_at")
+        .distinct("task_id")
+    )
+    return {annotation.task_id: annotation for annotation in annotations}
+
+
+def get_latest_annotation_time_subquery(annotation_type):
+    return Subquery(
+        Annotation.objects.filter(task=OuterRef("pk"), annotation_type=annotation_type)
+        .order_by("-updated_at")
+        .values("updated_at")[:1]
+    )
+
+
+def assign_annotation_tasks(project, user, count, prediction_converter=None):
+    """
+    Claim up to count unassigned tasks of the project for an annotator and
+    create their base annotations.
+
+    prediction_converter, if given, is called with each claimed task and
+    returns the result of its base annotation. Tasks whose prediction can't be
+    converted are deleted, as they can never be annotated.
+
+    Returns the number of tasks assigned.
+    """
+    if count <= 0:
+        return 0
+    required_annotators = project.required_annotators_per_task
+    eligible_tasks = (
+        Task.objects.filter(project_id=project.id)
+        .filter(task_status__in=[INCOMPLETE, UNLABELED])
+        .exclude(annotation_users=user.id)
+        .annotate(annotator_count=Count("annotation_users"))
+        .filter(annotator_count__lt=required_annotators)
+        .values("id")
+    )
+    with transaction.atomic():
+        claimed_tasks = list(
+            Task.objects.select_for_update(skip_locked=True, of=("self",))
+            .select_related("input_data")
+            .filter(id__in=Subquery(eligible_tasks))
+            .order_by("id")[:count]
+        )
+        if not claimed_tasks:
+            return 0
+        claimed_ids = [task.id for task in claimed_tasks]
+
+        # Recheck the claimed tasks now that they are locked, another pull may
+        # have assigned them between our snapshot and taking the row locks
+        annotator_counts = dict(
+            Task.annotation_users.through.objects.filter(task_id__in=claimed_ids)
+            .values("task_id")
+            .annotate(users=Count("user_id"))
+            .values_list("task_id", "users")
+        )
+        annotation_counts = dict(
+            Annotation.objects.filter(
+                task_id__in=claimed_ids, annotation_type=ANNOTATOR_ANNOTATION
+            )
+            .values("task_id")
+            .annotate(annotations=Count("id"))
+            .values_list("task_id", "annotations")
+        )
+        user_annotated_task_ids = set(
+            Annotation.objects.filter(
+                task_id__in=claimed_ids,
+                annotation_type=ANNOTATOR_ANNOTATION,
+                completed_by=user,
+            ).values_list("task_id", flat=True)
+        )
+
+        corrupt_task_ids = []
+        assignments = []
+        base_annotations = []
+        for task in claimed_tasks:
+            if annotator_counts.get(task.id, 0) >= required_annotators:
+                continue
+            if task.id in user_annotated_task_ids:
+                assignments.append(task)
+                continue
+            if annotation_counts.get(task.id, 0) >= required_annotators:
+                continue
+            result = []
+            if prediction_converter is not None:
+                try:
+                    result = prediction_converter(task)
+                except Exception as e:
+                    print(
+                        f"The prediction json of the data item-{task.input_data_id} is corrupt."
+                    )
+                    corrupt_task_ids.append(task.id)
+                    continue
+            assignments.append(task)
+            base_annotations.append(
+                Annotation(result=result, task=task, completed_by=user)
+            )
+
+        if corrupt_task_ids:
+            Task.objects.filter(id__in=corrupt_task_ids).delete()
+        Task.annotation_users.through.objects.bulk_create(
+            [
+                Task.annotation_users.through(task_id=task.id, user_id=user.id)
+                for task in assignments
+            ],
+            ignore_conflicts=True,
+        )
+        Annotation.objects.bulk_create(base_annotations, ignore_conflicts=True)
+        schedule_bulk_annotation_stats_refresh(base_annotations)
+        record_bulk_project_work(base_annotations, project.id)
+
+    invalidate_queue(project.id, user.id, ANNOTATION_MODE)
+    return len(assignments)
+
+
+def assign_review_tasks(project, user, count):
+    """
+    Claim up to count annotated tasks of the project for a reviewer and create
+    their base review annotations, most recently annotated tasks first.
+
+    Returns the number of tasks assigned.
+    """
+    eligible_tasks = (
+        Task.objects.filter(project_id=project.id)
+        .filter(task_status=ANNOTATED)
+        .filter(review_user__isnull=True)
+        .exclude(annotation_users=user.id)
+        .values("id")
+    )
+    return _assign_parent_annotation_tasks(
+        project,
+        user,
+        count,
+        eligible_tasks,
+        user_field="review_user",
+        parent_annotation_type=ANNOTATOR_ANNOTATION,
+        annotation_type=REVIEWER_ANNOTATION,
+        annotation_status=UNREVIEWED,
+        queue_mode=REVIEW_MODE,
+    )
+
+
+def assign_supercheck_tasks(project, user, count):
+    """
+    Claim up to count reviewed tasks of the project for a superchecker and
+    create their base supercheck annotations, most recently reviewed tasks
+    first.
+
+    Returns the number of tasks assigned.
+    """
+    eligible_tasks = (
+        Task.objects.filter(project_id=project.id)
+        .filter(task_status=REVIEWED)
+        .filter(super_check_user__isnull=True)
+        .exclude(annotation_users=user.id)
+        .exclude(review_user=user.id)
+        .values("id")
+    )
+    return _assign_parent_annotation_tasks(
+        project,
+        user,
+        count,
+        eligible_tasks,
+        user_field="super_check_user",
+        parent_annotation_type=REVIEWER_ANNOTATION,
+        annotation_type=SUPER_CHECKER_ANNOTATION,
+        annotation_status=UNVALIDATED,
+        queue_mode=SUPERCHECK_MODE,
+    )
+
+
+def _assign_parent_annotation_tasks(
+    project,
+    user,
+    count,
+    eligible_tasks,
+    user_field,
+    parent_annotation_type,
+    annotation_type,
+    annotation_status,
+    queue_mode,
+):
+    if count <= 0:
+        return 0
+    with transaction.atomic():
+        claimed_ids = list(
+            Task.objects.select_for_update(skip_locked=True, of=("self",))
+            .filter(id__in=Subquery(eligible_tasks))
+            .annotate(
+                last_parent_update=get_latest_annotation_time_subquery(
+                    parent_annotation_type
+                )
+            )
+            # Tasks without an annotation of the parent type have nothing to
+            # review, and their NULL times would sort first
+            .filter(last_parent_update__isnull=False)
+            .order_by(F("last_parent_update").desc(nulls_last=True), "id")
+            .values_list("id", flat=True)[:count]
+        )
+        if not claimed_ids:
+            return 0
+        # The row locks make this conditional update a claim, tasks picked up
+        # by a concurrent pull in the meantime no longer match the filter
+        claimed_ids = list(
+            Task.objects.filter(
+                id__in=claimed_ids, **{f"{user_field}__isnull": True}
+            ).values_list("id", flat=True)
+        )
+        Task.objects.filter(id__in=claimed_ids).update(**{user_field: user})
+
+        # Tasks which already have an annotation of this type go back to the
+        # user who made it
+        existing_annotations = dict(
+            Annotation.objects.filter(
+                task_id__in=claimed_ids, annotation_type=annotation_type
+            )
+            .order_by("task_id", "id")
+            .distinct("task_id")
+            .values_list("task_id", "completed_by_id")
+        )
+        reassigned_tasks = [
+            Task(id=task_id, **{f"{user_field}_id": completed_by_id})
+            for task_id, completed_by_id in existing_annotations.items()
+        ]
+        Task.objects.bulk_update(reassigned_tasks, [user_field])
+
+        parent_annotations = get_latest_annotations(
+            [id for id in claimed_ids if id not in existing_annotations],
+            parent_annotation_type,
+        )
+        base_annotations = [
+            Annotation(
+                result=[],
+                task_id=task_id,
+                completed_by=user,
+                annotation_status=annotation_status,
+                parent_annotation=parent_annotation,
+                annotation_type=annotation_type,
+            )
+            for task_id, parent_annotation in parent_annotations.items()
+        ]
+        Annotation.objects.bulk_create(base_annotations, ignore_conflicts=True)
+        schedule_bulk_annotation_stats_refresh(base_annotations)
+        record_bulk_project_work(base_annotations, project.id)
+
+    invalidate_queue(project.id, user.id, queue_mode)
+    for task in reassigned_tasks:
+        invalidate_queue(project.id, getattr(task, f"{user_field}_id"), queue_mode)
+    return len(claimed_ids)
@@ -0,0 +1,159 @@
+import redis
+from django.conf import settings
+from django.db import transaction
+
+from tasks.models import Task, INCOMPLETE, ANNOTATED, REVIEWED
+from utils.redis_connection import get_redis_connection
+
+"""
+Per-user work queues used by ProjectViewSet.next
+
+Every (project, user, mode) pair gets a redis sorted set of task ids with the
+task id as the score, so the next task after the current one is a single
+ZRANGEBYSCORE call instead of a scan over the project's tasks.
+
+The queues are a cache of the database, not the source of truth:
+    - entries are added when a task becomes workable for a user (task
+      assignment, tasks sent back for rework, etc.) through the signal
+      handlers in tasks/models.py, the queues of a project whose tasks are
+      changed with QuerySet.update() are dropped with invalidate_project_queues
+    - stale entries are not removed eagerly, every candidate popped from a
+      queue is checked against the database and dropped if it no longer
+      belongs to it
+    - a missing queue is rebuilt from the database with one indexed query,
+      and every queue expires after settings.TASK_QUEUE_TTL so that updates
+      done through QuerySet.update() are picked up eventually
+"""
+
+ANNOTATION_MODE = "annotation"
+REVIEW_MODE = "review"
+SUPERCHECK_MODE = "supercheck"
+
+QUEUE_MODES = (ANNOTATION_MODE, REVIEW_MODE, SUPERCHECK_MODE)
+
+# Member stored in every queue so that an empty queue still exists in redis
+EMPTY_QUEUE_SENTINEL = "-1"
+
+# Add a task to a queue only if the queue is already built, a partially built
+# queue would hide the tasks that are not in it yet
+ADD_IF_EXISTS_SCRIPT = """
+if redis.call('EXISTS', KEYS[1]) == 1 then
+    return redis.call('ZADD', KEYS[1], ARGV[1], ARGV[1])
+end
+return 0
+"""
+
+
+def get_queue_key(project_id, user_id, mode):
+    return f"task_queue:{project_id}:{user_id}:{mode}"
+
+
+def get_queue_tasks(project_id, user_id, mode):
+    """
+    Tasks of the project which the user still has to work on in the given mode
+    """
+    tasks = Task.objects.filter(project_id=project_id)
+    if mode == ANNOTATION_MODE:
+        return tasks.filter(annotation_users=user_id, task_status=INCOMPLETE)
+    elif mode == REVIEW_MODE:
+        return tasks.filter(review_user=user_id, task_status=ANNOTATED)
+    return tasks.filter(super_check_user=user_id, task_status=REVIEWED)
+
+
+def get_task_queue_entries(task):
+    """
+    (user_id, mode) pairs whose queue the task currently belongs to
+    """
+    if task.task_status == INCOMPLETE:
+        return [
+            (user_id, ANNOTATION_MODE)
+            for user_id in task.annotation_users.values_list("id", flat=True)
+        ]
+    if task.task_status == ANNOTATED and task.review_user_id:
+        return [(task.review_user_id, REVIEW_MODE)]
+    if task.task_status == REVIEWED and task.super_check_user_id:
+        return [(task.super_check_user_id, SUPERCHECK_MODE)]
+    return []
+
+
+def build_queue(connection, project_id, user_id, mode):
+    key = get_queue_key(project_id, user_id, mode)
+    task_ids = get_queue_tasks(project_id, user_id, mode).values_list("id", flat=True)
+    mapping = {EMPTY_QUEUE_SENTINEL: -1}
+    mapping.update({str(task_id): task_id for task_id in task_ids})
+    pipeline = connection.pipeline()
+    pipeline.delete(key)
+    pipeline.zadd(key, mapping)
+    pipeline.expire(key, settings.TASK_QUEUE_TTL)
+    pipeline.execute()
+
+
+def push_task(project_id, user_id, mode, task_id):
+    """
+    Add a task to the queue of a user, if that queue has been built already
+    """
+    try:
+        connection = get_redis_connection()
+        connection.eval(
+            ADD_IF_EXISTS_SCRIPT, 1, get_queue_key(project_id, user_id, mode), task_id
+        )
+    except redis.RedisError as e:
+        print(f"Unable to add task {task_id} to the work queue. Error: {e}")
+
+
+def invalidate_queue(project_id, user_id, mode):
+    """
+    Drop a queue so that it is rebuilt from the database on the next read
+    """
+    try:
+        get_redis_connection().delete(get_queue_key(project_id, user_id, mode))
+    except redis.RedisError as e:
+        print(f"Unable to invalidate the work queue. Error: {e}")
+
+
+def invalidate_project_queues(project_id):
+    """
+    Drop every queue of a project once the current transaction commits, after
+    its tasks were changed by writes which don't send post_save
+    """
+
+    def delete_queues():
+        try:
+            connection = get_redis_connection()
+            keys = list(
+                connection.scan_iter(match=f"task_queue:{project_id}:*", count=1000)
+            )
+            if keys:
+                connection.delete(*keys)
+        except redis.RedisError as e:
+            print(f"Unable to invalidate the work queues. Error: {e}")
+
+    transaction.on_commit(delete_queues)
+
+
+def get_next_task(project_id, user_id, mode, current_task_id=None):
+    """
+    Return the first task in the queue of the user with an id greater than
+    current_task_id, or None if the queue is exhausted
+    """
+    lower_bound = f"({current_task_id}" if current_task_id is not None else "(0"
+    try:
+        connection = get_redis_connection()
+        key = get_queue_key(project_id, user_id, mode)
+        if not connection.exists(key):
+            build_queue(connection, project_id, user_id, mode)
+        while True:
+            candidates = connection.zrangebyscore(key, lower_bound, "+inf", 0, 1)
+            if not candidates:
+                return None
+            task_id = int(candidates[0])
+            task = get_queue_tasks(project_id, user_id, mode).filter(id=task_id).first()
+            if task is not None:
+                return task
+            connection.zrem(key, candidates[0])
+    except redis.RedisError as e:
+        print(f"Work queue is unavailable, reading from the database. Error: {e}")
+        tasks = get_queue_tasks(project_id, user_id, mode).order_by("id")
+        if current_task_id is not None:
+            tasks = tasks.filter(id__gt=current_task_id)
+        return tasks.first()
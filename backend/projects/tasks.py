@@ -14,9 +14,12 @@ from users.models import User
 from tasks.models import Annotation as Annotation_model
 from tasks.models import *
 from tasks.models import Task
-from utils.monolingual.sentence_splitter import split_sentences
+from tasks.annotation_stats import schedule_bulk_annotation_stats_refresh
+from tasks.search import get_task_search_text
+from utils.monolingual.sentence_splitter import split_sentences_by_language
 from dataset.models import DatasetInstance
 from .models import *
+from .memberships import record_bulk_project_work
 from .registry_helper import ProjectRegistry
 from .utils import conversation_wordcount, no_of_words, conversation_sentence_count
 from .annotation_registry import *
@@ -24,6 +27,12 @@ from .annotation_registry import *
 # Celery logger settings
 logger = get_task_logger(__name__)
 
+# Number of tasks exported with each bulk update during the project export
+EXPORT_CHUNK_SIZE = 1000
+
+# Number of data items turned into tasks with each bulk insert
+TASK_CREATION_CHUNK_SIZE = 1000
+
 
 ## Utility functions for the tasks
 def stringify_json(json):
@@ -41,104 +50,124 @@ def create_automatic_annotations(tasks, automatic_annotation_creation_mode):
     project.review_supercheckers.add(user)
     project.is_published = True
     project.save()
-    project_annotation_fields_list = list(
+    project_annotation_fields = set(
         ANNOTATION_REGISTRY_DICT[project.project_type].keys()
     )
-    if automatic_annotation_creation_mode in ["annotation", "review", "supercheck"]:
-        for task in tasks:
-            if task.input_data.draft_data_json != None:
-                draft_data_json_fields_list = list(
-                    task.input_data.draft_data_json.keys()
-                )
-                if set(project_annotation_fields_list).issubset(
-                    set(draft_data_json_fields_list)
-                ):
-                    task.annotation_users.add(user)
-                    task.task_status = ANNOTATED
-                    task.save()
-                    base_annotation_obj = Annotation_model(
-                        result=draft_data_json_to_annotation_result(
-                            task.input_data.draft_data_json,
-                            task.project_id.project_type,
-                            task.input_data.id,
-                        ),
-                        task=task,
-                        completed_by=user,
-                        annotation_status=LABELED,
-                        annotation_type=ANNOTATOR_ANNOTATION,
-                        annotation_source=AUTOMATIC_ANNOTATION,
-                    )
-                    base_annotation_obj.save()
-                    if task.project_id.project_stage == ANNOTATION_STAGE:
-                        task.correct_annotation = base_annotation_obj
-                        task.save()
+    if automatic_annotation_creation_mode not in ["annotation", "review", "supercheck"]:
+        return
+
+    # Only the tasks whose draft data has all the annotation fields of the project
+    tasks = [
+        task
+        for task in tasks
+        if task.input_data.draft_data_json != None
+        and project_annotation_fields.issubset(
+            set(task.input_data.draft_data_json.keys())
+        )
+    ]
+    if not tasks:
+        return
+    registry_helper = ProjectRegistry.get_instance()
+    input_dataset_info = registry_helper.get_input_dataset_and_fields(
+        project.project_type
+    )
+    dataset_items = getattr(
+        dataset_models, input_dataset_info["dataset_type"]
+    ).objects.in_bulk([task.input_data.id for task in tasks])
 
+    # Annotator's annotations
+    annotator_annotations = []
+    for task in tasks:
+        task.task_status = ANNOTATED
+        annotator_annotations.append(
+            Annotation_model(
+                result=draft_data_json_to_annotation_result(
+                    task.input_data.draft_data_json,
+                    project.project_type,
+                    task.input_data.id,
+                    dataset_items.get(task.input_data.id),
+                ),
+                task=task,
+                completed_by=user,
+                annotation_status=LABELED,
+                annotation_type=ANNOTATOR_ANNOTATION,
+                annotation_source=AUTOMATIC_ANNOTATION,
+            )
+        )
+    Annotation_model.objects.bulk_create(annotator_annotations)
+    schedule_bulk_annotation_stats_refresh(annotator_annotations)
+    record_bulk_project_work(annotator_annotations, project.id)
+    Task.annotation_users.through.objects.bulk_create(
+        [
+            Task.annotation_users.through(task_id=task.id, user_id=user.id)
+            for task in tasks
+        ],
+        ignore_conflicts=True,
+    )
+    if project.project_stage == ANNOTATION_STAGE:
+        for task, annotation in zip(tasks, annotator_annotations):
+            task.correct_annotation = annotation
+
+    # Reviewer's annotations, linked to the annotator's annotation of the same task
+    reviewer_annotations = []
     if automatic_annotation_creation_mode in ["review", "supercheck"]:
-        for task in tasks:
-            if task.input_data.draft_data_json != None:
-                ann_type = task.input_data.draft_data_json.get("annotation_type", 3)
-                if ann_type < 2:
-                    continue
-                draft_data_json_fields_list = list(
-                    task.input_data.draft_data_json.keys()
+        for task, annotator_annotation in zip(tasks, annotator_annotations):
+            if task.input_data.draft_data_json.get("annotation_type", 3) < 2:
+                continue
+            task.review_user = user
+            task.task_status = REVIEWED
+            reviewer_annotations.append(
+                Annotation_model(
+                    result=annotator_annotation.result,
+                    task=task,
+                    completed_by=user,
+                    annotation_status=ACCEPTED,
+                    parent_annotation=annotator_annotation,
+                    annotation_type=REVIEWER_ANNOTATION,
+                    annotation_source=AUTOMATIC_ANNOTATION,
                 )
-                if set(project_annotation_fields_list).issubset(
-                    set(draft_data_json_fields_list)
-                ):
-                    task.review_user = user
-                    task.task_status = REVIEWED
-                    task.save()
-                    annotator_anno = Annotation_model.objects.filter(
-                        task=task, annotation_type=ANNOTATOR_ANNOTATION
-                    )[0]
-                    base_annotation_obj = Annotation_model(
-                        result=annotator_anno.result,
-                        task=task,
-                        completed_by=user,
-                        annotation_status=ACCEPTED,
-                        parent_annotation=annotator_anno,
-                        annotation_type=REVIEWER_ANNOTATION,
-                        annotation_source=AUTOMATIC_ANNOTATION,
-                    )
-                    base_annotation_obj.save()
-                    if task.project_id.project_stage == REVIEW_STAGE:
-                        task.correct_annotation = base_annotation_obj
-                        task.save()
-
+            )
+        Annotation_model.objects.bulk_create(reviewer_annotations)
+        schedule_bulk_annotation_stats_refresh(reviewer_annotations)
+        record_bulk_project_work(reviewer_annotations, project.id)
+        if project.project_stage == REVIEW_STAGE:
+            for annotation in reviewer_annotations:
+                annotation.task.correct_annotation = annotation
+
+    # Super checker's annotations, linked to the reviewer's annotation of the same task
     if automatic_annotation_creation_mode in ["supercheck"]:
-        for task in tasks:
-            if task.input_data.draft_data_json != None:
-                ann_type = task.input_data.draft_data_json.get("annotation_type", 3)
-                if ann_type < 3:
-                    continue
-                draft_data_json_fields_list = list(
-                    task.input_data.draft_data_json.keys()
+        super_checker_annotations = []
+        for reviewer_annotation in reviewer_annotations:
+            task = reviewer_annotation.task
+            if task.input_data.draft_data_json.get("annotation_type", 3) < 3:
+                continue
+            task.super_check_user = user
+            task.task_status = SUPER_CHECKED
+            super_checker_annotations.append(
+                Annotation_model(
+                    result=reviewer_annotation.result,
+                    task=task,
+                    completed_by=user,
+                    annotation_status=VALIDATED,
+                    parent_annotation=reviewer_annotation,
+                    annotation_type=SUPER_CHECKER_ANNOTATION,
+                    annotation_source=AUTOMATIC_ANNOTATION,
                 )
-                if set(project_annotation_fields_list).issubset(
-                    set(draft_data_json_fields_list)
-                ):
-                    task.super_check_user = user
-                    task.task_status = SUPER_CHECKED
-                    task.save()
-                    reviewer_anno = Annotation_model.objects.filter(
-                        task=task, annotation_type=REVIEWER_ANNOTATION
-                    )[0]
-                    base_annotation_obj = Annotation_model(
-                        result=reviewer_anno.result,
-                        task=task,
-                        completed_by=user,
-                        annotation_status=VALIDATED,
-                        parent_annotation=reviewer_anno,
-                        annotation_type=SUPER_CHECKER_ANNOTATION,
-                        annotation_source=AUTOMATIC_ANNOTATION,
-                    )
-                    base_annotation_obj.save()
-                    if task.project_id.project_stage == SUPERCHECK_STAGE:
-                        task.correct_annotation = base_annotation_obj
-                        task.save()
+            )
+        Annotation_model.objects.bulk_create(super_checker_annotations)
+        schedule_bulk_annotation_stats_refresh(super_checker_annotations)
+        record_bulk_project_work(super_checker_annotations, project.id)
+        if project.project_stage == SUPERCHECK_STAGE:
+            for annotation in super_checker_annotations:
+                annotation.task.correct_annotation = annotation
+
+    Task.objects.bulk_update(
+        tasks,
+        ["task_status", "review_user", "super_check_user", "correct_annotation"],
+    )
 
 
-def create_tasks_from_dataitems(items, project):
+def create_tasks_from_dataitems(items, project, chunk_size=TASK_CREATION_CHUNK_SIZE):
     project_type = project.project_type
     registry_helper = ProjectRegistry.get_instance()
     input_dataset_info = registry_helper.get_input_dataset_and_fields(project_type)
@@ -156,111 +185,139 @@ def create_tasks_from_dataitems(items, project):
     dsi = DatasetInstance.objects.filter(instance_id=insta_id)
     dataset_type1 = dsi[0].dataset_type
 
-    # Create task objects
+    prediction_user = None
+    if input_dataset_info["prediction"] is not None:
+        prediction_user = User.objects.get(email="prediction@ai4bharat.org")
+
     tasks = []
-    for item in items:
-        data_id = item["id"]
-        if "variable_parameters" in output_dataset_info["fields"]:
-            for var_param in output_dataset_info["fields"]["variable_parameters"]:
-                item[var_param] = variable_parameters[var_param]
-        if "copy_from_input" in output_dataset_info["fields"]:
-            for input_field, output_field in output_dataset_info["fields"][
-                "copy_from_input"
-            ].items():
-                if output_field == input_field:
-                    continue
-                item[output_field] = item[input_field]
-                del item[input_field]
+    for start in range(0, len(items), chunk_size):
+        chunk_items = items[start : start + chunk_size]
+
+        # Fetch the data items, parent data items and the data items which
+        # already have a task in batch mode for the whole chunk at once
+        data_objects = dataset_models.DatasetBase.objects.in_bulk(
+            [item["id"] for item in chunk_items]
+        )
+        parent_objects = {}
         if "copy_from_parent" in input_dataset_info:
-            if not item.get("parent_data"):
-                raise Exception("Item does not have a parent")
-            try:
-                # get the parent class from the registry and get the parent object
-                parent_class = input_dataset_info["parent_class"]
-                parent_data = model_to_dict(
-                    getattr(dataset_models, parent_class).objects.get(
-                        id=item["parent_data"]
-                    )
-                )
+            parent_class = input_dataset_info["parent_class"]
+            parent_objects = getattr(dataset_models, parent_class).objects.in_bulk(
+                [item["parent_data"] for item in chunk_items if item.get("parent_data")]
+            )
+        batch_tasked_ids = set()
+        if project.sampling_mode == BATCH:
+            batch_tasked_ids = set(
+                Task.objects.filter(
+                    input_data_id__in=list(data_objects.keys()),
+                    project_id__project_type=project.project_type,
+                    project_id__sampling_mode=BATCH,
+                ).values_list("input_data_id", flat=True)
+            )
+
+        # Create task objects
+        chunk_tasks = []
+        for item in chunk_items:
+            data_id = item["id"]
+            if "variable_parameters" in output_dataset_info["fields"]:
+                for var_param in output_dataset_info["fields"]["variable_parameters"]:
+                    item[var_param] = variable_parameters[var_param]
+            if "copy_from_input" in output_dataset_info["fields"]:
+                for input_field, output_field in output_dataset_info["fields"][
+                    "copy_from_input"
+                ].items():
+                    if output_field == input_field:
+                        continue
+                    item[output_field] = item[input_field]
+                    del item[input_field]
+            if "copy_from_parent" in input_dataset_info:
+                if not item.get("parent_data"):
+                    raise Exception("Item does not have a parent")
+                if item["parent_data"] not in parent_objects:
+                    raise Exception("Parent data not found")
+                parent_data = model_to_dict(parent_objects[item["parent_data"]])
                 for input_field, output_field in input_dataset_info[
                     "copy_from_parent"
                 ].items():
                     item[output_field] = parent_data[input_field]
-            except dataset_models.DatasetBase.DoesNotExist:
-                raise Exception("Parent data not found")
-        data = dataset_models.DatasetBase.objects.get(pk=data_id)
-
-        # Remove data id because it's not needed in task.data
-        del item["id"]
-        task = Task(data=item, project_id=project, input_data=data)
-        if is_translation_project or dataset_type1 == "TranslationPair":
-            if is_conversation_project:
-                field_name = (
-                    "source_conversation_json"
-                    if is_editing_project
-                    else "conversation_json"
+            if data_id not in data_objects:
+                raise dataset_models.DatasetBase.DoesNotExist(
+                    f"Data item {data_id} does not exist"
                 )
-                task.data["word_count"] = conversation_wordcount(task.data[field_name])
-                task.data["sentence_count"] = conversation_sentence_count(
-                    task.data[field_name]
-                )
-            else:
-                task.data["word_count"] = no_of_words(task.data["input_text"])
-        if is_audio_project:
-            indx = 0
-            for speaker in task.data["speakers_json"]:
-                field_name = "speaker_" + str(indx) + "_details"
-                task.data[field_name] = stringify_json(task.data["speakers_json"][indx])
-                indx += 1
-        # checking if a task for the data item already exists for batch mode
-        if project.sampling_mode == BATCH:
-            existing_task = Task.objects.filter(
-                input_data=data,
-                project_id__project_type=project.project_type,
-                project_id__sampling_mode=BATCH,
-            )
-            if existing_task:
+            data = data_objects[data_id]
+
+            # Remove data id because it's not needed in task.data
+            del item["id"]
+            task = Task(data=item, project_id=project, input_data=data)
+            if is_translation_project or dataset_type1 == "TranslationPair":
+                if is_conversation_project:
+                    field_name = (
+                        "source_conversation_json"
+                        if is_editing_project
+                        else "conversation_json"
+                    )
+                    task.data["word_count"] = conversation_wordcount(
+                        task.data[field_name]
+                    )
+                    task.data["sentence_count"] = conversation_sentence_count(
+                        task.data[field_name]
+                    )
+                else:
+                    task.data["word_count"] = no_of_words(task.data["input_text"])
+            if is_audio_project:
+                indx = 0
+                for speaker in task.data["speakers_json"]:
+                    field_name = "speaker_" + str(indx) + "_details"
+                    task.data[field_name] = stringify_json(
+                        task.data["speakers_json"][indx]
+                    )
+                    indx += 1
+            # checking if a task for the data item already exists for batch mode
+            if data_id in batch_tasked_ids:
                 continue
-        tasks.append(task)
-    # Bulk create the tasks
-    Task.objects.bulk_create(tasks)
-
-    if (
-        project.metadata_json is not None
-        and "automatic_annotation_creation_mode" in project.metadata_json
-    ):
-        create_automatic_annotations(
-            tasks, project.metadata_json["automatic_annotation_creation_mode"]
-        )
-    if input_dataset_info["prediction"] is not None:
-        user_object = User.objects.get(email="prediction@ai4bharat.org")
-
-        predictions = []
-        prediction_field = input_dataset_info["prediction"]
-        for task, item in zip(tasks, items):
+            task.search_text = get_task_search_text(task.data, project_type)
+            chunk_tasks.append(task)
+        # Bulk create the tasks
+        Task.objects.bulk_create(chunk_tasks)
+
+        if (
+            chunk_tasks
+            and project.metadata_json is not None
+            and "automatic_annotation_creation_mode" in project.metadata_json
+        ):
+            create_automatic_annotations(
+                chunk_tasks, project.metadata_json["automatic_annotation_creation_mode"]
+            )
+        if prediction_user is not None:
+            predictions = []
+            prediction_field = input_dataset_info["prediction"]
+            chunk_sentences = [None] * len(chunk_items)
             if project_type == "SentenceSplitting":
-                item[prediction_field] = [
-                    {
-                        "value": {
-                            "text": [
-                                "\n".join(
-                                    split_sentences(item["text"], item["language"])
-                                )
-                            ]
-                        },
-                        "id": "0",
-                        "from_name": "splitted_text",
-                        "to_name": "text",
-                        "type": "textarea",
-                    }
-                ]
-                prediction = Annotation_model(
-                    result=item[prediction_field], task=task, completed_by=user_object
+                # Split the paragraphs of the chunk in one batch per language
+                chunk_sentences = split_sentences_by_language(
+                    [item["text"] for item in chunk_items],
+                    [item["language"] for item in chunk_items],
                 )
-                predictions.append(prediction)
-        #
-        # Prediction.objects.bulk_create(predictions)
-        Annotation_model.objects.bulk_create(predictions)
+            for task, item, sentences in zip(chunk_tasks, chunk_items, chunk_sentences):
+                if project_type == "SentenceSplitting":
+                    item[prediction_field] = [
+                        {
+                            "value": {"text": ["\n".join(sentences)]},
+                            "id": "0",
+                            "from_name": "splitted_text",
+                            "to_name": "text",
+                            "type": "textarea",
+                        }
+                    ]
+                    prediction = Annotation_model(
+                        result=item[prediction_field],
+                        task=task,
+                        completed_by=prediction_user,
+                    )
+                    predictions.append(prediction)
+            Annotation_model.objects.bulk_create(predictions)
+            schedule_bulk_annotation_stats_refresh(predictions)
+            record_bulk_project_work(predictions, project.id)
+        tasks += chunk_tasks
     return tasks
 
 
@@ -379,9 +436,9 @@ def create_parameters_for_task_creation(
     tasks = create_tasks_from_dataitems(sampled_items, project)
 
 
-@shared_task
+@shared_task(bind=True)
 def export_project_in_place(
-    annotation_fields, project_id, project_type, get_request_data
+    self, annotation_fields, project_id, project_type, get_request_data
 ) -> None:
     """Function to export the output texts for a task into the dataset instance
 
@@ -415,25 +472,100 @@ def export_project_in_place(
             project_id__exact=project, task_status__in=[ANNOTATED]
         )
 
+    export_excluded_task_ids = []
+    exported_items_count = 0
+
+    # Tasks without a correct annotation have nothing to export
+    annotated_tasks_queryset = (
+        tasks.filter(correct_annotation__isnull=False)
+        .select_related("correct_annotation")
+        .prefetch_related("annotation_users")
+        .order_by("id")
+    )
+    total_tasks_count = annotated_tasks_queryset.count()
+    last_task_id = 0
+    while True:
+        # Tasks are exported in chunks, each chunk is written back with one
+        # bulk update for the dataset items and one for the tasks
+        annotated_tasks = list(
+            annotated_tasks_queryset.filter(id__gt=last_task_id)[:EXPORT_CHUNK_SIZE]
+        )
+        if not annotated_tasks:
+            break
+        last_task_id = annotated_tasks[-1].id
+        (
+            data_items,
+            exported_tasks,
+            excluded_task_ids,
+            chunk_annotation_fields,
+        ) = export_tasks_chunk_in_place(
+            annotated_tasks,
+            annotation_fields,
+            project,
+            project_type,
+            output_dataset_info,
+            dataset_model,
+            get_request_data,
+        )
+        export_excluded_task_ids += excluded_task_ids
+        dataset_model.objects.bulk_update(
+            data_items, annotation_fields + list(chunk_annotation_fields)
+        )
+        Task.objects.bulk_update(exported_tasks, ["output_data", "task_status"])
+        exported_items_count += len(data_items)
+        self.update_state(
+            state="PROGRESS",
+            meta={
+                "exported": exported_items_count,
+                "excluded": len(export_excluded_task_ids),
+                "total": total_tasks_count,
+            },
+        )
+
+    # Tasks without a correct annotation are marked as exported as well
+    tasks.filter(correct_annotation__isnull=True).exclude(
+        id__in=export_excluded_task_ids
+    ).update(task_status=EXPORTED)
+
+    return f"Exported {exported_items_count} items."
+
+
+def export_tasks_chunk_in_place(
+    annotated_tasks,
+    annotation_fields,
+    project,
+    project_type,
+    output_dataset_info,
+    dataset_model,
+    get_request_data,
+):
+    """Transform a chunk of annotated tasks into the dataset items they are exported to.
+
+    Args:
+        annotated_tasks (list): Tasks with a correct annotation
+        annotation_fields (list): List of annotated fields to be exported
+        project (Project): Project to which the tasks belong
+        project_type (str): Type of project
+        output_dataset_info (dict): Output dataset info from the project registry
+        dataset_model (Model): Model of the output dataset
+        get_request_data (dict): Dictionary of the GET request data
+
+    Returns:
+        list: Updated dataset items
+        list: Tasks marked as exported
+        list: IDs of the tasks which could not be exported
+        set: Fields other than annotation_fields set on the dataset items
+    """
     data_items = []
+    exported_tasks = []
+    extra_annotation_fields = set()
 
     # List for storing tasks fetched with modified data to the task_dict
     tasks_list = []
-
-    # List for storing the annotated tasks that have been accepted as correct annotation
-    annotated_tasks = []
-    for task in tasks:
+    for task in annotated_tasks:
         task_dict = model_to_dict(task)
-        # Rename keys to match label studio converter
-        # task_dict['id'] = task_dict['task_id']
-        # del task_dict['task_id']
-        if task.correct_annotation is not None:
-            annotated_tasks.append(task)
-            annotation_dict = model_to_dict(task.correct_annotation)
-            # annotation_dict['result'] = annotation_dict['result_json']
-            # del annotation_dict['result_json']
-            task_dict["annotations"] = [OrderedDict(annotation_dict)]
-
+        annotation_dict = model_to_dict(task.correct_annotation)
+        task_dict["annotations"] = [OrderedDict(annotation_dict)]
         del task_dict["annotation_users"]
         del task_dict["review_user"]
         tasks_list.append(OrderedDict(task_dict))
@@ -446,6 +578,11 @@ def export_project_in_place(
         )
         tasks_annotations = json.loads(tasks_df.to_json(orient="records"))
 
+    # Load all the dataset items of the chunk at once
+    dataset_items = dataset_model.objects.in_bulk(
+        [task.input_data_id for task in annotated_tasks]
+    )
+
     export_excluded_task_ids = []
 
     is_SpeechConversation = output_dataset_info["dataset_type"] == "SpeechConversation"
@@ -498,9 +635,10 @@ def export_project_in_place(
                     export_excluded_task_ids.append(task.id)
                     continue
 
-        task.output_data = task.input_data
-        task.save()
-        data_item = dataset_model.objects.get(id__exact=tl["input_data"])
+        data_item = dataset_items.get(tl["input_data"])
+        if data_item is None:
+            export_excluded_task_ids.append(task.id)
+            continue
         try:
             for field in annotation_fields:
                 # Check being done for rating as Label studio stores all the data in string format
@@ -661,19 +799,18 @@ def export_project_in_place(
                 else:
                     setattr(data_item, field, ta[field])
             data_items.append(data_item)
+            task.output_data_id = task.input_data_id
+            task.task_status = EXPORTED
+            exported_tasks.append(task)
         except Exception as e:
             export_excluded_task_ids.append(task.id)
     # Write json to dataset columns
     if bboxes_relation_json:
-        annotation_fields.append("bboxes_relation_json")
+        extra_annotation_fields.add("bboxes_relation_json")
     if annotated_document_details_json:
-        annotation_fields.append("annotated_document_details_json")
-    dataset_model.objects.bulk_update(data_items, annotation_fields)
-
-    tasks = tasks.exclude(id__in=export_excluded_task_ids)
-    tasks.update(task_status=EXPORTED)
+        extra_annotation_fields.add("annotated_document_details_json")
 
-    return f"Exported {len(data_items)} items."
+    return data_items, exported_tasks, export_excluded_task_ids, extra_annotation_fields
 
 
 @shared_task
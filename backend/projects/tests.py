@@ -1,3 +1,347 @@
-from django.test import TestCase
+import datetime
+import threading
+from unittest import mock
 
-# Create your tests here.
+from django.db import connection, transaction
+from django.test import SimpleTestCase, TestCase, TransactionTestCase
+from django.utils import timezone
+
+from projects.memberships import get_member_project_ids, order_by_last_worked
+from projects.models import (
+    Project,
+    ProjectMembership,
+    ANNOTATOR_ROLE,
+    REVIEWER_ROLE,
+)
+from projects.task_assignment import assign_review_tasks
+from projects.task_queue import ANNOTATION_MODE, REVIEW_MODE
+from projects.utils import get_not_null_audio_transcription_duration
+from tasks.models import (
+    Annotation,
+    Task,
+    ANNOTATED,
+    ANNOTATOR_ANNOTATION,
+    INCOMPLETE,
+    REVIEWER_ANNOTATION,
+)
+from users.models import User
+
+
+class ReviewTaskAssignmentTests(TransactionTestCase):
+    """
+    assign_review_tasks claims rows with SKIP LOCKED, which needs separate
+    connections and committed rows, hence TransactionTestCase
+    """
+
+    def setUp(self):
+        self.annotator = User.objects.create_user(
+            email="annotator@shoonya.org", username="annotator"
+        )
+        self.reviewers = [
+            User.objects.create_user(
+                email=f"reviewer{i}@shoonya.org", username=f"reviewer{i}"
+            )
+            for i in range(2)
+        ]
+        self.project = Project.objects.create(
+            title="Review assignment",
+            project_type="ContextualTranslationEditing",
+            project_mode="Annotation",
+        )
+        self.tasks = [
+            Task.objects.create(project_id=self.project, task_status=ANNOTATED)
+            for _ in range(4)
+        ]
+        # Oldest annotation first, so the ordering by recency is the reverse of
+        # the ids
+        Annotation.objects.bulk_create(
+            [
+                Annotation(
+                    result=[],
+                    task=task,
+                    completed_by=self.annotator,
+                    annotation_type=ANNOTATOR_ANNOTATION,
+                )
+                for task in self.tasks
+            ]
+        )
+        now = timezone.now()
+        for i, task in enumerate(self.tasks):
+            Annotation.objects.filter(task=task).update(
+                updated_at=now - datetime.timedelta(hours=len(self.tasks) - i)
+            )
+
+    def get_review_user_ids(self):
+        return dict(
+            Task.objects.filter(project_id=self.project).values_list(
+                "id", "review_user_id"
+            )
+        )
+
+    def test_most_recently_annotated_tasks_are_claimed_first(self):
+        assigned = assign_review_tasks(self.project, self.reviewers[0], 2)
+
+        self.assertEqual(assigned, 2)
+        review_user_ids = self.get_review_user_ids()
+        self.assertEqual(
+            {id for id, user_id in review_user_ids.items() if user_id is not None},
+            {self.tasks[3].id, self.tasks[2].id},
+        )
+
+    def test_tasks_without_annotator_annotation_are_not_claimed(self):
+        unannotated_task = Task.objects.create(
+            project_id=self.project, task_status=ANNOTATED
+        )
+
+        assigned = assign_review_tasks(self.project, self.reviewers[0], 10)
+
+        self.assertEqual(assigned, len(self.tasks))
+        unannotated_task.refresh_from_db()
+        self.assertIsNone(unannotated_task.review_user_id)
+        self.assertFalse(unannotated_task.annotations.exists())
+        self.assertEqual(
+            Annotation.objects.filter(
+                task__in=self.tasks, annotation_type=REVIEWER_ANNOTATION
+            ).count(),
+            len(self.tasks),
+        )
+
+    def test_locked_tasks_are_skipped(self):
+        locked = threading.Event()
+        release = threading.Event()
+
+        def hold_lock():
+            try:
+                with transaction.atomic():
+                    Task.objects.select_for_update().get(id=self.tasks[3].id)
+                    locked.set()
+                    release.wait(10)
+            finally:
+                connection.close()
+
+        thread = threading.Thread(target=hold_lock)
+        thread.start()
+        try:
+            self.assertTrue(locked.wait(10))
+            assigned = assign_review_tasks(self.project, self.reviewers[0], 1)
+        finally:
+            release.set()
+            thread.join()
+
+        self.assertEqual(assigned, 1)
+        review_user_ids = self.get_review_user_ids()
+        self.assertIsNone(review_user_ids[self.tasks[3].id])
+        self.assertEqual(review_user_ids[self.tasks[2].id], self.reviewers[0].id)
+
+    def test_concurrent_claims_are_disjoint(self):
+        barrier = threading.Barrier(len(self.reviewers))
+        assigned = {}
+
+        def pull(reviewer):
+            try:
+                barrier.wait(10)
+                assigned[reviewer.id] = assign_review_tasks(
+                    self.project, reviewer, len(self.tasks)
+                )
+            finally:
+                connection.close()
+
+        threads = [
+            threading.Thread(target=pull, args=(reviewer,))
+            for reviewer in self.reviewers
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        review_user_ids = self.get_review_user_ids()
+        self.assertEqual(sum(assigned.values()), len(self.tasks))
+        for reviewer in self.reviewers:
+            self.assertEqual(
+                list(review_user_ids.values()).count(reviewer.id),
+                assigned[reviewer.id],
+            )
+        for task in self.tasks:
+            self.assertEqual(
+                Annotation.objects.filter(
+                    task=task, annotation_type=REVIEWER_ANNOTATION
+                ).count(),
+                1,
+            )
+
+
+class ProjectMembershipTests(TestCase):
+    def setUp(self):
+        # The stats rollups of the saved annotations aren't under test
+        patcher = mock.patch("tasks.annotation_stats.schedule_annotation_stats_refresh")
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.user = User.objects.create_user(
+            email="member@shoonya.org", username="member"
+        )
+        self.projects = [
+            Project.objects.create(
+                title=f"Membership {i}",
+                project_type="ContextualTranslationEditing",
+                project_mode="Annotation",
+            )
+            for i in range(3)
+        ]
+
+    def get_roles(self, project):
+        return (
+            ProjectMembership.objects.filter(user=self.user, project=project)
+            .values_list("roles", flat=True)
+            .first()
+        )
+
+    def annotate(self, project):
+        task = Task.objects.create(project_id=project)
+        return Annotation.objects.create(result=[], task=task, completed_by=self.user)
+
+    def test_member_changes_refresh_the_roles(self):
+        project = self.projects[0]
+
+        project.annotators.add(self.user)
+        self.assertEqual(self.get_roles(project), ANNOTATOR_ROLE)
+        project.annotation_reviewers.add(self.user)
+        self.assertEqual(self.get_roles(project), ANNOTATOR_ROLE | REVIEWER_ROLE)
+        project.annotators.remove(self.user)
+        self.assertEqual(self.get_roles(project), REVIEWER_ROLE)
+        project.annotation_reviewers.clear()
+        self.assertEqual(self.get_roles(project), 0)
+
+    def test_reverse_member_changes_refresh_the_roles(self):
+        self.user.project_users.add(*self.projects[:2])
+        self.assertEqual(
+            set(
+                get_member_project_ids(self.user, ANNOTATOR_ROLE).values_list(
+                    "project_id", flat=True
+                )
+            ),
+            {project.id for project in self.projects[:2]},
+        )
+
+        self.user.project_users.clear()
+        self.assertEqual(self.get_roles(self.projects[0]), 0)
+        self.assertEqual(self.get_roles(self.projects[1]), 0)
+
+    def test_projects_are_ordered_by_the_last_work(self):
+        first, second, never_worked = self.projects
+        first_annotation = self.annotate(first)
+        self.annotate(second)
+
+        projects = Project.objects.filter(id__in=[p.id for p in self.projects])
+        self.assertEqual(
+            list(order_by_last_worked(projects, self.user)),
+            [second, first, never_worked],
+        )
+
+        first_annotation.save()
+        self.assertEqual(
+            list(order_by_last_worked(projects, self.user)),
+            [first, second, never_worked],
+        )
+
+    def test_saves_without_updated_at_keep_the_last_work(self):
+        annotation = self.annotate(self.projects[0])
+        last_worked_at = ProjectMembership.objects.get(
+            user=self.user, project=self.projects[0]
+        ).last_worked_at
+
+        # The update only, the task isn't read
+        with self.assertNumQueries(1):
+            annotation.save(update_fields=["lead_time"])
+        self.assertEqual(
+            ProjectMembership.objects.get(
+                user=self.user, project=self.projects[0]
+            ).last_worked_at,
+            last_worked_at,
+        )
+
+
+@mock.patch("projects.task_queue.push_task")
+class TaskWorkQueueTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email="annotator@shoonya.org", username="annotator"
+        )
+        self.project = Project.objects.create(
+            title="Work queues",
+            project_type="ContextualTranslationEditing",
+            project_mode="Annotation",
+        )
+        task = Task.objects.create(project_id=self.project, task_status=INCOMPLETE)
+        task.annotation_users.add(self.user)
+        self.task = Task.objects.get(id=task.id)
+
+    def test_saves_without_queue_changes_dont_push(self, push_task):
+        self.task.metadata_json = {"note": "edited"}
+
+        # The update only, the annotators aren't read
+        with self.assertNumQueries(1):
+            self.task.save()
+        with self.assertNumQueries(1):
+            self.task.save(update_fields=["metadata_json"])
+        push_task.assert_not_called()
+
+    def test_status_changes_push_the_task(self, push_task):
+        self.task.task_status = ANNOTATED
+        self.task.review_user = self.user
+        self.task.save()
+
+        push_task.assert_called_once_with(
+            self.project.id, self.user.id, REVIEW_MODE, self.task.id
+        )
+
+    def test_tasks_sent_back_are_pushed_to_their_annotators(self, push_task):
+        self.task.task_status = ANNOTATED
+        self.task.save()
+        push_task.reset_mock()
+
+        self.task.task_status = INCOMPLETE
+        self.task.save(update_fields=["task_status"])
+
+        push_task.assert_called_once_with(
+            self.project.id, self.user.id, ANNOTATION_MODE, self.task.id
+        )
+
+
+def speech_region(segment_id, from_name, start, end, text=None):
+    if from_name == "labels":
+        return {
+            "id": segment_id,
+            "type": "labels",
+            "from_name": from_name,
+            "value": {"start": start, "end": end, "labels": ["Speaker 0"]},
+        }
+    return {
+        "id": segment_id,
+        "type": "textarea",
+        "from_name": from_name,
+        "value": {"start": start, "end": end, "text": [text]},
+    }
+
+
+class AudioTranscriptionDurationTests(SimpleTestCase):
+    def test_segments_with_a_label_and_a_text_are_counted(self):
+        result = [
+            speech_region("a", "labels", 0, 2),
+            speech_region("a", "verbatim_transcribed_json", 0, 2, "hello"),
+            # Text of one character
+            speech_region("b", "labels", 2, 5),
+            speech_region("b", "verbatim_transcribed_json", 2, 5, "a"),
+            # No label
+            speech_region("c", "verbatim_transcribed_json", 5, 6, "no label"),
+            # Acoustic text of one character
+            speech_region("d", "labels", 6, 10),
+            speech_region("d", "verbatim_transcribed_json", 6, 10, "ok"),
+            speech_region("d", "acoustic_normalised_transcribed_json", 6, 10, "x"),
+            speech_region("e", "labels", 10, 11.5),
+            speech_region("e", "verbatim_transcribed_json", 10, 11.5, "fine"),
+            speech_region("e", "acoustic_normalised_transcribed_json", 10, 11.5, "ok"),
+            speech_region("s", "standardised_transcription", 0, 0, "hello fine"),
+        ]
+
+        self.assertEqual(get_not_null_audio_transcription_duration(result, 1), 3.5)
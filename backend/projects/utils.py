@@ -26,8 +26,8 @@ import yaml
 from yaml.loader import SafeLoader
 from jiwer import wer
 
-from utils.convert_result_to_chitralekha_format import create_memory
-
+from utils.annotation_result import group_result_by_id
+from utils.sentence_scores import normalized_edit_distance
 
 nltk.download("punkt")
 
@@ -123,10 +123,6 @@ def conversation_sentence_count(conversations: list) -> int:
 
 
 def minor_major_accepted_task(annotation_objs):
-    from tasks.views import SentenceOperationViewSet
-
-    sentence_operation = SentenceOperationViewSet()
-
     minor, major = [], []
     for annot in annotation_objs:
         try:
@@ -139,16 +135,9 @@ def minor_major_accepted_task(annotation_objs):
 
             str1 = annotator_obj.result[0]["value"]["text"]
             str2 = reviewer_obj[0].result[0]["value"]["text"]
-            data = {"sentence1": str1[0], "sentence2": str2[0]}
-
-            char_level_distance = (
-                sentence_operation.calculate_normalized_character_level_edit_distance(
-                    data
-                )
-            )
-            char_score = char_level_distance.data[
-                "normalized_character_level_edit_distance"
-            ]
+            char_score = normalized_edit_distance(str1[0], str2[0])
+            if char_score is None:
+                continue
             if char_score > 0.3:
                 major.append(annot)
             else:
@@ -172,21 +161,21 @@ def get_audio_transcription_duration(annotation_result):
 
 def get_not_null_audio_transcription_duration(annotation_result, ann_id):
     audio_duration = 0
-    memory = create_memory(annotation_result)
-    for key, indexes in memory.items():
-        if indexes["labels_dict_idx"] != -1 and indexes["text_dict_idx"] != -1:
-            text_dict = annotation_result[indexes["text_dict_idx"]]
-            label_dict = annotation_result[indexes["labels_dict_idx"]]
-            if indexes["acoustic_text_dict_idx"] != -1:
-                acoustic_dict = annotation_result[indexes["acoustic_text_dict_idx"]]
-                if (
-                    acoustic_dict["value"]["text"]
-                    and len(acoustic_dict["value"]["text"][0]) <= 1
-                ):
-                    continue
-            if text_dict["value"]["text"] and len(text_dict["value"]["text"][0]) <= 1:
+    segments, _ = group_result_by_id(annotation_result)
+    for segment in segments:
+        if segment["labels"] is None or segment["text"] is None:
+            continue
+        text_dict = segment["text"]
+        acoustic_dict = segment["acoustic_text"]
+        if acoustic_dict is not None:
+            if (
+                acoustic_dict["value"]["text"]
+                and len(acoustic_dict["value"]["text"][0]) <= 1
+            ):
                 continue
-            audio_duration += get_audio_transcription_duration([label_dict])
+        if text_dict["value"]["text"] and len(text_dict["value"]["text"][0]) <= 1:
+            continue
+        audio_duration += get_audio_transcription_duration([segment["labels"]])
     return audio_duration
 
 
@@ -212,30 +201,29 @@ def audio_word_count(annotation_result):
     return word_count
 
 
-def calculate_word_error_rate_between_two_audio_transcription_annotation(
-    annotation_result1, annotation_result2
-):
-    annotation_result1 = sorted(annotation_result1, key=lambda i: (i["value"]["end"]))
-    annotation_result2 = sorted(annotation_result2, key=lambda i: (i["value"]["end"]))
-
-    annotation_result1_text = ""
-    annotation_result2_text = ""
+def get_audio_transcription_text(annotation_result):
+    """
+    Text of all the transcriptions of an audio annotation, ordered by their end time
+    """
+    annotation_result = sorted(annotation_result, key=lambda i: (i["value"]["end"]))
 
-    for result in annotation_result1:
+    annotation_result_text = ""
+    for result in annotation_result:
         if result["from_name"] in ["transcribed_json", "verbatim_transcribed_json"]:
             try:
                 for s in result["value"]["text"]:
-                    annotation_result1_text += s
+                    annotation_result_text += s
             except:
                 pass
+    return annotation_result_text
+
+
+def calculate_word_error_rate_between_two_audio_transcription_annotation(
+    annotation_result1, annotation_result2
+):
+    annotation_result1_text = get_audio_transcription_text(annotation_result1)
+    annotation_result2_text = get_audio_transcription_text(annotation_result2)
 
-    for result in annotation_result2:
-        if result["from_name"] in ["transcribed_json", "verbatim_transcribed_json"]:
-            try:
-                for s in result["value"]["text"]:
-                    annotation_result2_text += s
-            except:
-                pass
     if len(annotation_result1_text) == 0 or len(annotation_result2_text) == 0:
         return 0
     return wer(annotation_result1_text, annotation_result2_text)
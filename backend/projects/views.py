@@ -8,7 +8,7 @@ import csv
 import math
 
 from django.core.files import File
-from django.db.models import Count, Q, F, Case, When
+from django.db.models import Count, Q, F
 from django.forms.models import model_to_dict
 from django.db import IntegrityError
 
@@ -26,7 +26,7 @@ from .utils import (
     process_ocr_tasks,
     process_task,
 )
-from django.http import HttpResponse, JsonResponse
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
 from rest_framework import status, viewsets
 from rest_framework.decorators import action
 from rest_framework.permissions import IsAuthenticated
@@ -34,8 +34,17 @@ from rest_framework.response import Response
 from users.models import LANG_CHOICES
 from users.serializers import UserEmailSerializer
 from dataset.serializers import TaskResultSerializer
-from utils.search import process_search_query
-from django_celery_results.models import TaskResult
+from tasks.search import get_task_search_text, process_task_search_query
+from utils.search import extract_search_params
+from utils.annotation_result import format_speech_result
+from .memberships import get_member_project_ids, order_by_last_worked
+from tasks.async_jobs import (
+    get_job_result,
+    get_job_status_date_time,
+    get_jobs,
+    get_latest_job,
+    get_task_results,
+)
 from drf_yasg import openapi
 from drf_yasg.utils import swagger_auto_schema
 from users.models import User
@@ -53,6 +62,17 @@ from tasks.models import Task
 from tasks.serializers import TaskSerializer
 from .models import *
 from .registry_helper import ProjectRegistry
+from .task_queue import QUEUE_MODES, get_next_task, invalidate_project_queues
+from .streaming_export import (
+    STREAMING_EXPORT_TYPES,
+    EXPORT_CONTENT_TYPES,
+    stream_project_export,
+)
+from .task_assignment import (
+    assign_annotation_tasks,
+    assign_review_tasks,
+    assign_supercheck_tasks,
+)
 from dataset import models as dataset_models
 
 from dataset.models import (
@@ -666,32 +686,6 @@ def get_supercheck_reports(proj_id, userid, start_date, end_date):
     return result
 
 
-def extract_latest_status_date_time_from_taskresult_queryset(taskresult_queryset):
-    """Function to extract the latest status and date time from the celery task results.
-
-    Args:
-        taskresult_queryset (Django Queryset): Celery task results queryset
-
-    Returns:
-        str: Complettion state of the latest celery task
-        str: Complettion date of the latest celery task
-        str: Complettion time of the latest celery task
-    """
-
-    # Sort the tasks by newest items first by date
-    taskresult_queryset = taskresult_queryset.order_by("-date_done")
-
-    # Get the export task status and last update date
-    task_status = taskresult_queryset.first().as_dict()["status"]
-    task_datetime = taskresult_queryset.first().as_dict()["date_done"]
-
-    # Extract date and time from the datetime object
-    task_date = task_datetime.date()
-    task_time = f"{str(task_datetime.time().replace(microsecond=0))} UTC"
-
-    return task_status, task_date, task_time
-
-
 def get_project_pull_status(pk):
     """Function to return status of the last pull data items task.
 
@@ -703,30 +697,18 @@ def get_project_pull_status(pk):
         str: Date when the last time project was exported
     """
 
-    # Create the keyword argument for project ID
-    project_id_keyword_arg = "'project_id': " + "'" + str(pk) + "'"
-
-    # Check the celery project export status
-    taskresult_queryset = TaskResult.objects.filter(
-        task_name="projects.tasks.add_new_data_items_into_project",
-        task_kwargs__contains=project_id_keyword_arg,
+    # Check the celery project pull status
+    job = get_latest_job(
+        ["projects.tasks.add_new_data_items_into_project"], project_id=pk
     )
 
-    # If the celery TaskResults table returns
-    if taskresult_queryset:
-        # Sort the tasks by newest items first by date
-        taskresult_queryset = taskresult_queryset.order_by("-date_done")
-
-        # Get the export task status and last update date
-        task_status = taskresult_queryset.first().as_dict()["status"]
-        task_datetime = taskresult_queryset.first().as_dict()["date_done"]
-        task_result = taskresult_queryset.first().as_dict()["result"]
+    # If data items have been pulled into the project
+    if job is not None:
+        task_status, task_date, task_time = get_job_status_date_time(job)
+        task_result = get_job_result(job) or "No result."
 
         if '"' in task_result:
             task_result = task_result.strip('"')
-        # Extract date and time from the datetime object
-        task_date = task_datetime.date()
-        task_time = f"{str(task_datetime.time().replace(microsecond=0))} UTC"
 
         return task_status, task_date, task_time, task_result
     return (
@@ -748,23 +730,18 @@ def get_project_export_status(pk):
         str: Date when the last time project was exported
     """
 
-    # Create the keyword argument for project ID
-    project_id_keyword_arg = "'project_id': " + "'" + str(pk) + "'" + ","
-
     # Check the celery project export status
-    taskresult_queryset = TaskResult.objects.filter(
-        task_name__in=[
+    job = get_latest_job(
+        [
             "projects.tasks.export_project_in_place",
             "projects.tasks.export_project_new_record",
         ],
-        task_kwargs__contains=project_id_keyword_arg,
+        project_id=pk,
     )
 
-    # If the celery TaskResults table returns
-    if taskresult_queryset:
-        return extract_latest_status_date_time_from_taskresult_queryset(
-            taskresult_queryset
-        )
+    # If the project has been exported
+    if job is not None:
+        return get_job_status_date_time(job)
     return (
         "Success",
         "Synchronously Completed. No Date.",
@@ -780,10 +757,8 @@ def get_task_creation_status(pk) -> str:
         str: Task Status
     """
     # Check the celery task creation status
-    project_id_keyword_arg = "'project_id': " + str(pk)
-    taskresult_queryset = TaskResult.objects.filter(
-        task_name="projects.tasks.create_parameters_for_task_creation",
-        task_kwargs__contains=project_id_keyword_arg,
+    job = get_latest_job(
+        ["projects.tasks.create_parameters_for_task_creation"], project_id=pk
     )
     task_creation_status_modified = {
         "PENDING": "Task Creation Process Pending",
@@ -794,10 +769,9 @@ def get_task_creation_status(pk) -> str:
         "RETRY": "Task Creation Process Retried",
         "REVOKED": "Task Creation Process Revoked",
     }
-    # If the celery TaskResults table returns
-    if taskresult_queryset:
-        task_creation_status = taskresult_queryset.first().as_dict()["status"]
-        return task_creation_status_modified[task_creation_status]
+    # If the tasks have been created by a celery task
+    if job is not None:
+        return task_creation_status_modified[job.status]
     return ""
 
 
@@ -815,23 +789,17 @@ def get_project_creation_status(pk) -> str:
     # Get the project object
     project = Project.objects.get(pk=pk)
 
-    # Create the keyword argument for project ID
-    project_id_keyword_arg = "'project_id': " + str(pk) + "}"
-
     # Check the celery task creation status
-    taskresult_queryset = TaskResult.objects.filter(
-        task_name="projects.tasks.create_parameters_for_task_creation",
-        task_kwargs__contains=project_id_keyword_arg,
+    job = get_latest_job(
+        ["projects.tasks.create_parameters_for_task_creation"], project_id=pk
     )
 
-    # If the celery TaskResults table returns
-    if taskresult_queryset:
-        task_creation_status = taskresult_queryset.first().as_dict()["status"]
-
+    # If the tasks have been created by a celery task
+    if job is not None:
         # Check if the task has failed
-        if task_creation_status == "FAILURE":
+        if job.status == "FAILURE":
             return "Task Creation Process Failed!"
-        if task_creation_status != "SUCCESS":
+        if job.status != "SUCCESS":
             return "Creating Annotation Tasks."
     # If the background task function has already run, check the status of the project
     if project.is_archived:
@@ -1001,89 +969,11 @@ def convert_annotation_result_to_formatted_json(
     standardised_transcription = ""
     transcribed_json_modified, acoustic_transcribed_json_modified = [], []
     if is_SpeechConversation:
-        ids_formatted = {}
-        for idx1 in range(len(annotation_result)):
-            formatted_result_dict = {}
-            labels_dict = {}
-            text_dict = {}
-            acoustic_text_dict = {}
-            if isinstance(annotation_result[idx1], str):
-                annotation_result[idx1] = json.loads(annotation_result[idx1])
-            if annotation_result[idx1]["from_name"] == "labels":
-                labels_dict = annotation_result[idx1]
-            elif (
-                annotation_result[idx1]["from_name"]
-                == "acoustic_normalised_transcribed_json"
-            ):
-                acoustic_text_dict = json.dumps(
-                    annotation_result[idx1], ensure_ascii=False
-                )
-                acoustic_text_dict = annotation_result[idx1]
-            elif annotation_result[idx1]["from_name"] == "standardised_transcription":
-                standardised_transcription = annotation_result[idx1]["value"]["text"][0]
-                continue
-            else:
-                text_dict = json.dumps(annotation_result[idx1], ensure_ascii=False)
-                text_dict = annotation_result[idx1]
-            for idx2 in range(idx1 + 1, len(annotation_result)):
-                if annotation_result[idx1]["id"] == annotation_result[idx2]["id"]:
-                    if annotation_result[idx2]["from_name"] == "labels":
-                        labels_dict = annotation_result[idx2]
-                    elif (
-                        annotation_result[idx2]["from_name"]
-                        == "acoustic_normalised_transcribed_json"
-                    ):
-                        acoustic_text_dict = json.dumps(
-                            annotation_result[idx2], ensure_ascii=False
-                        )
-                    else:
-                        text_dict = json.dumps(
-                            annotation_result[idx2], ensure_ascii=False
-                        )
-                    if not is_acoustic or (
-                        labels_dict and acoustic_text_dict and text_dict
-                    ):
-                        break
-
-            if annotation_result[idx1]["id"] not in ids_formatted:
-                ids_formatted[annotation_result[idx1]["id"]] = "formatted"
-                if not labels_dict:
-                    formatted_result_dict["speaker_id"] = None
-                else:
-                    try:
-                        formatted_result_dict["speaker_id"] = next(
-                            speaker
-                            for speaker in speakers_json
-                            if speaker["name"] == labels_dict["value"]["labels"][0]
-                        )["speaker_id"]
-                    except (KeyError, StopIteration):
-                        formatted_result_dict["speaker_id"] = None
-                    formatted_result_dict["start"] = labels_dict["value"]["start"]
-                    formatted_result_dict["end"] = labels_dict["value"]["end"]
-
-                if not text_dict:
-                    formatted_result_dict["text"] = ""
-                else:
-                    text_dict_json = json.loads(text_dict)
-                    formatted_result_dict["text"] = text_dict_json["value"]["text"][0]
-                    formatted_result_dict["start"] = text_dict_json["value"]["start"]
-                    formatted_result_dict["end"] = text_dict_json["value"]["end"]
-
-                transcribed_json.append(formatted_result_dict)
-
-                if is_acoustic:
-                    acoustic_formatted_result_dict = deepcopy(formatted_result_dict)
-                    acoustic_dict_json = (
-                        json.loads(acoustic_text_dict)
-                        if isinstance(acoustic_text_dict, str)
-                        else acoustic_text_dict
-                    )
-                    acoustic_formatted_result_dict["text"] = (
-                        acoustic_dict_json["value"]["text"][0]
-                        if acoustic_dict_json
-                        else ""
-                    )
-                    acoustic_transcribed_json.append(acoustic_formatted_result_dict)
+        (
+            transcribed_json,
+            acoustic_transcribed_json,
+            standardised_transcription,
+        ) = format_speech_result(annotation_result, speakers_json, is_acoustic)
         if acoustic_transcribed_json:
             acoustic_transcribed_json_modified = json.dumps(
                 acoustic_transcribed_json, ensure_ascii=False
@@ -1247,57 +1137,43 @@ class ProjectViewSet(viewsets.ModelViewSet):
                     organization_id=request.user.organization
                 )
             elif request.user.role == User.WORKSPACE_MANAGER:
-                projects = (
-                    self.queryset.filter(
+                projects = self.queryset.filter(
+                    Q(
                         workspace_id__in=Workspace.objects.filter(
                             managers=request.user
                         ).values_list("id", flat=True)
                     )
-                    | self.queryset.filter(annotators=request.user)
-                    | self.queryset.filter(annotation_reviewers=request.user)
+                    | Q(
+                        pk__in=get_member_project_ids(
+                            request.user, ANNOTATOR_ROLE | REVIEWER_ROLE
+                        )
+                    )
                 )
             elif request.user.role == User.SUPER_CHECKER:
-                projects = (
-                    self.queryset.filter(annotators=request.user)
-                    | self.queryset.filter(annotation_reviewers=request.user)
-                    | self.queryset.filter(review_supercheckers=request.user)
+                projects = self.queryset.filter(
+                    pk__in=get_member_project_ids(
+                        request.user,
+                        ANNOTATOR_ROLE | REVIEWER_ROLE | SUPER_CHECKER_ROLE,
+                    )
                 )
             elif request.user.role == User.REVIEWER:
                 projects = self.queryset.filter(
-                    annotators=request.user
-                ) | self.queryset.filter(annotation_reviewers=request.user)
+                    pk__in=get_member_project_ids(
+                        request.user, ANNOTATOR_ROLE | REVIEWER_ROLE
+                    )
+                )
             elif request.user.role == User.ANNOTATOR:
-                projects = self.queryset.filter(annotators=request.user)
+                projects = self.queryset.filter(
+                    pk__in=get_member_project_ids(request.user, ANNOTATOR_ROLE)
+                )
 
             projects = projects.filter(is_published=True).filter(is_archived=False)
 
-            projects = projects.distinct()
-
             if (
                 "sort_type" in request.query_params
                 and request.query_params["sort_type"] == "most_recent_worked_projects"
             ):
-                annotations = Annotation_model.objects.filter(completed_by=request.user)
-                annotations = annotations.order_by("-updated_at")
-                project_ids = []
-                project_ids_set = set()
-                for annotation in annotations:
-                    project_id = annotation.task.project_id.id
-                    if project_id not in project_ids_set:
-                        project_ids.append(project_id)
-                        project_ids_set.add(project_id)
-                unannotated_projects = projects.exclude(pk__in=project_ids)
-                unannotated_projects = unannotated_projects.order_by(
-                    F("published_at").desc(nulls_last=True)
-                )
-                for project in unannotated_projects:
-                    project_ids.append(project.id)
-                preserved = Case(
-                    *[When(pk=pk, then=pos) for pos, pk in enumerate(project_ids)]
-                )
-                projects = Project.objects.filter(pk__in=project_ids).order_by(
-                    preserved
-                )
+                projects = order_by_last_worked(projects, request.user)
             else:
                 projects = projects.order_by(F("published_at").desc(nulls_last=True))
 
@@ -1372,37 +1248,49 @@ class ProjectViewSet(viewsets.ModelViewSet):
                     organization_id=request.user.organization
                 )
             elif request.user.role == User.WORKSPACE_MANAGER:
-                projects = (
-                    self.queryset.filter(
+                projects = self.queryset.filter(
+                    Q(
                         workspace_id__in=Workspace.objects.filter(
                             managers=request.user
                         ).values_list("id", flat=True)
                     )
-                    | self.queryset.filter(annotators=request.user)
-                    | self.queryset.filter(annotation_reviewers=request.user)
+                    | Q(
+                        pk__in=get_member_project_ids(
+                            request.user, ANNOTATOR_ROLE | REVIEWER_ROLE
+                        )
+                    )
                 )
             elif request.user.role == User.SUPER_CHECKER:
-                projects = (
-                    self.queryset.filter(annotators=request.user)
-                    | self.queryset.filter(annotation_reviewers=request.user)
-                    | self.queryset.filter(review_supercheckers=request.user)
+                projects = self.queryset.filter(
+                    pk__in=get_member_project_ids(
+                        request.user,
+                        ANNOTATOR_ROLE | REVIEWER_ROLE | SUPER_CHECKER_ROLE,
+                    )
                 )
                 projects = projects.filter(is_published=True).filter(is_archived=False)
             elif request.user.role == User.REVIEWER:
                 projects = self.queryset.filter(
-                    annotators=request.user
-                ) | self.queryset.filter(annotation_reviewers=request.user)
+                    pk__in=get_member_project_ids(
+                        request.user, ANNOTATOR_ROLE | REVIEWER_ROLE
+                    )
+                )
                 projects = projects.filter(is_published=True).filter(is_archived=False)
             elif request.user.role == User.ANNOTATOR:
-                projects = self.queryset.filter(annotators=request.user)
+                projects = self.queryset.filter(
+                    pk__in=get_member_project_ids(request.user, ANNOTATOR_ROLE)
+                )
                 projects = projects.filter(is_published=True).filter(is_archived=False)
 
             if "project_user_type" in request.query_params:
                 project_user_type = request.query_params["project_user_type"]
                 if project_user_type == "annotator":
-                    projects = projects.filter(annotators=request.user)
+                    projects = projects.filter(
+                        pk__in=get_member_project_ids(request.user, ANNOTATOR_ROLE)
+                    )
                 elif project_user_type == "reviewer":
-                    projects = projects.filter(annotation_reviewers=request.user)
+                    projects = projects.filter(
+                        pk__in=get_member_project_ids(request.user, REVIEWER_ROLE)
+                    )
 
             if "project_type" in request.query_params:
                 project_type = request.query_params["project_type"]
@@ -1413,33 +1301,11 @@ class ProjectViewSet(viewsets.ModelViewSet):
                 archived_projects = True if archived_projects == "true" else False
                 projects = projects.filter(is_archived=archived_projects)
 
-            projects = projects.distinct()
-
             if (
                 "sort_type" in request.query_params
                 and request.query_params["sort_type"] == "most_recent_worked_projects"
             ):
-                annotations = Annotation_model.objects.filter(completed_by=request.user)
-                annotations = annotations.order_by("-updated_at")
-                project_ids = []
-                project_ids_set = set()
-                for annotation in annotations:
-                    project_id = annotation.task.project_id.id
-                    if project_id not in project_ids_set:
-                        project_ids.append(project_id)
-                        project_ids_set.add(project_id)
-                unannotated_projects = projects.exclude(pk__in=project_ids)
-                unannotated_projects = unannotated_projects.order_by(
-                    F("published_at").desc(nulls_last=True)
-                )
-                for project in unannotated_projects:
-                    project_ids.append(project.id)
-                preserved = Case(
-                    *[When(pk=pk, then=pos) for pos, pk in enumerate(project_ids)]
-                )
-                projects = Project.objects.filter(pk__in=project_ids).order_by(
-                    preserved
-                )
+                projects = order_by_last_worked(projects, request.user)
             else:
                 projects = projects.order_by(F("published_at").desc(nulls_last=True))
 
@@ -1511,6 +1377,7 @@ class ProjectViewSet(viewsets.ModelViewSet):
                     }
                     task.save()
                 tasks.update(task_status="incomplete")  # unassign user from tasks
+                invalidate_project_queues(project.id)
                 # project.annotators.remove(user)
                 if freeze_user == True:
                     project.frozen_users.add(user)
@@ -1888,6 +1755,12 @@ class ProjectViewSet(viewsets.ModelViewSet):
         mode = request.data.get("mode")
         annotation_status = request.data.get("annotation_status")
         current_task_id = request.data.get("current_task_id")
+        is_project_member = (
+            project.annotation_reviewers.filter(pk=request.user.pk).exists()
+            or project.annotators.filter(pk=request.user.pk).exists()
+            or project.review_supercheckers.filter(pk=request.user.pk).exists()
+        )
+        search_params = extract_search_params(request.GET)
 
         # Check if the endpoint is being accessed in review mode
 
@@ -1907,11 +1780,7 @@ class ProjectViewSet(viewsets.ModelViewSet):
                 return Response(resp_dict, status=status.HTTP_403_FORBIDDEN)
 
         if annotation_status != None:
-            if (
-                request.user in project.annotation_reviewers.all()
-                or request.user in project.annotators.all()
-                or request.user in project.review_supercheckers.all()
-            ):
+            if is_project_member:
                 if mode == "review":
                     annotations = Annotation_model.objects.filter(
                         task__project_id=pk,
@@ -1955,11 +1824,9 @@ class ProjectViewSet(viewsets.ModelViewSet):
 
             tasks = Task.objects.filter(annotations__in=annotations)
             tasks = tasks.distinct()
-            if len(tasks):
+            if search_params:
                 tasks = tasks.filter(
-                    **process_search_query(
-                        request.GET, "data", list(tasks.first().data.keys())
-                    )
+                    **process_task_search_query(request.GET, project.project_type)
                 )
             ann_filter1 = annotations.filter(task__in=tasks)
             task_ids = [an.task_id for an in ann_filter1]
@@ -1976,11 +1843,7 @@ class ProjectViewSet(viewsets.ModelViewSet):
             return Response(ret_dict, status=ret_status)
         # Check if task_status is passed
         if task_status != None:
-            if (
-                request.user in project.annotation_reviewers.all()
-                or request.user in project.annotators.all()
-                or request.user in project.review_supercheckers.all()
-            ):
+            if is_project_member:
                 if mode == "review":
                     tasks = Task.objects.filter(
                         project_id__exact=project.id,
@@ -2005,11 +1868,9 @@ class ProjectViewSet(viewsets.ModelViewSet):
                     task_status=task_status,
                 )
 
-            if len(tasks):
+            if search_params:
                 tasks = tasks.filter(
-                    **process_search_query(
-                        request.GET, "data", list(tasks.first().data.keys())
-                    )
+                    **process_task_search_query(request.GET, project.project_type)
                 )
 
             queryset = tasks.order_by("id")
@@ -2025,11 +1886,17 @@ class ProjectViewSet(viewsets.ModelViewSet):
 
         else:
             # Check if there are unattended tasks
-            if (
-                request.user in project.annotation_reviewers.all()
-                or request.user in project.annotators.all()
-                or request.user in project.review_supercheckers.all()
-            ) and not request.user.is_superuser:
+            if is_project_member and not request.user.is_superuser:
+                # Serve the plain "next task" request from the user's work queue
+                if mode in QUEUE_MODES and not search_params:
+                    task = get_next_task(
+                        project.id, request.user.id, mode, current_task_id
+                    )
+                    if task is not None:
+                        return Response(TaskSerializer(task, many=False).data)
+                    ret_dict = {"message": "No more unlabeled tasks!"}
+                    ret_status = status.HTTP_204_NO_CONTENT
+                    return Response(ret_dict, status=ret_status)
                 # Filter Tasks based on whether the request is in review mode or not
                 if mode == "review":
                     tasks = Task.objects.filter(
@@ -2068,11 +1935,9 @@ class ProjectViewSet(viewsets.ModelViewSet):
                         task_status=REVIEWED,
                     )
 
-            if len(tasks):
+            if search_params:
                 tasks = tasks.filter(
-                    **process_search_query(
-                        request.GET, "data", list(tasks.first().data.keys())
-                    )
+                    **process_task_search_query(request.GET, project.project_type)
                 )
 
             unattended_tasks = tasks.order_by("id")
@@ -2249,9 +2114,13 @@ class ProjectViewSet(viewsets.ModelViewSet):
                 tasks = Task.objects.filter(
                     project_id=pk, annotation_users=request.user
                 ).order_by("id")
+            if not tasks.exists():
+                return Response(
+                    {"message": "No tasks found!"}, status=status.HTTP_404_NOT_FOUND
+                )
             tasks = tasks.filter(
-                **process_search_query(
-                    request.GET, "data", list(tasks.first().data.keys())
+                **process_task_search_query(
+                    request.GET, Project.objects.get(pk=pk).project_type
                 )
             )
             serializer = TaskSerializer(tasks, many=True)
@@ -2301,7 +2170,7 @@ class ProjectViewSet(viewsets.ModelViewSet):
         proj_annotations = Annotation_model.objects.filter(task__project_id=pk).filter(
             annotation_status__exact=UNLABELED, completed_by=cur_user
         )
-        annotation_tasks = [anno.task.id for anno in proj_annotations]
+        annotation_tasks = proj_annotations.values_list("task_id", flat=True)
         pending_tasks = (
             Task.objects.filter(project_id=pk)
             .filter(annotation_users=cur_user.id)
@@ -2326,88 +2195,27 @@ class ProjectViewSet(viewsets.ModelViewSet):
             task_pull_count = project.tasks_pull_count_per_batch
         tasks_to_be_assigned = min(tasks_to_be_assigned, task_pull_count)
 
-        lock_set = False
-        while lock_set == False:
-            if project.is_locked(ANNOTATION_LOCK):
-                sleep(settings.PROJECT_LOCK_RETRY_INTERVAL)
-                continue
-            else:
-                try:
-                    project.set_lock(cur_user, ANNOTATION_LOCK)
-                    lock_set = True
-                except Exception as e:
-                    continue
-        # check if the project contains eligible tasks to pull
-        tasks = Task.objects.filter(project_id=pk)
-        tasks = tasks.order_by("id")
-        tasks = (
-            tasks.filter(task_status__in=[INCOMPLETE, UNLABELED])
-            .exclude(annotation_users=cur_user.id)
-            .annotate(annotator_count=Count("annotation_users"))
+        if project.project_type in [
+            "AcousticNormalisedTranscriptionEditing",
+            "AudioTranscriptionEditing",
+            "OCRTranscriptionEditing",
+            "OCRSegmentCategorizationEditing",
+        ]:
+            prediction_converter = (
+                lambda task: convert_prediction_json_to_annotation_result(
+                    task.input_data.id, project.project_type
+                )
+            )
+        else:
+            prediction_converter = None
+        assigned_count = assign_annotation_tasks(
+            project, cur_user, tasks_to_be_assigned, prediction_converter
         )
-        tasks = tasks.filter(
-            annotator_count__lt=project.required_annotators_per_task
-        ).distinct()
-        if not tasks:
-            project.release_lock(ANNOTATION_LOCK)
+        if not assigned_count:
             return Response(
                 {"message": "No tasks left for assignment in this project"},
                 status=status.HTTP_404_NOT_FOUND,
             )
-        tasks = tasks[:tasks_to_be_assigned]
-        # tasks = tasks.order_by("id")
-        for task in tasks:
-            task.annotation_users.add(cur_user)
-            task.save()
-            result = []
-            if project.project_type in [
-                "AcousticNormalisedTranscriptionEditing",
-                "AudioTranscriptionEditing",
-                "OCRTranscriptionEditing",
-                "OCRSegmentCategorizationEditing",
-            ]:
-                try:
-                    result = convert_prediction_json_to_annotation_result(
-                        task.input_data.id, project.project_type
-                    )
-                except Exception as e:
-                    print(
-                        f"The prediction json of the data item-{task.input_data.id} is corrupt."
-                    )
-                    task.delete()
-                    continue
-            annotator_anno_count = Annotation_model.objects.filter(
-                task_id=task, annotation_type=ANNOTATOR_ANNOTATION
-            ).count()
-            if annotator_anno_count < project.required_annotators_per_task:
-                cur_user_anno_count = Annotation_model.objects.filter(
-                    task_id=task,
-                    annotation_type=ANNOTATOR_ANNOTATION,
-                    completed_by=cur_user,
-                ).count()
-                if cur_user_anno_count == 0:
-                    base_annotation_obj = Annotation_model(
-                        result=result,
-                        task=task,
-                        completed_by=cur_user,
-                    )
-                    try:
-                        base_annotation_obj.save()
-                    except IntegrityError as e:
-                        print(
-                            f"Task and completed_by fields are same while assigning new task "
-                            f"for project id-{project.id}, user-{cur_user.email}"
-                        )
-            else:
-                cur_user_anno_count = Annotation_model.objects.filter(
-                    task_id=task,
-                    annotation_type=ANNOTATOR_ANNOTATION,
-                    completed_by=cur_user,
-                ).count()
-                if cur_user_anno_count == 0:
-                    task.annotation_users.remove(cur_user)
-                    task.save()
-        project.release_lock(ANNOTATION_LOCK)
         return Response(
             {"message": "Tasks assigned successfully"}, status=status.HTTP_200_OK
         )
@@ -2491,6 +2299,7 @@ class ProjectViewSet(viewsets.ModelViewSet):
             reviewed_tasks = Task.objects.filter(id__in=reviewer_pulled_tasks)
             if reviewed_tasks.count() > 0:
                 reviewed_tasks.update(review_user=None)
+            invalidate_project_queues(pk)
 
             ann.delete()
 
@@ -2599,80 +2408,15 @@ class ProjectViewSet(viewsets.ModelViewSet):
                 {"message": "You are not assigned to review this project"},
                 status=status.HTTP_403_FORBIDDEN,
             )
-        lock_set = False
-        while lock_set == False:
-            if project.is_locked(REVIEW_LOCK):
-                sleep(settings.PROJECT_LOCK_RETRY_INTERVAL)
-                continue
-            else:
-                try:
-                    project.set_lock(cur_user, REVIEW_LOCK)
-                    lock_set = True
-                except Exception as e:
-                    continue
-        # check if the project contains eligible tasks to pull
-        tasks = (
-            Task.objects.filter(project_id=pk)
-            .filter(task_status=ANNOTATED)
-            .filter(review_user__isnull=True)
-            .exclude(annotation_users=cur_user.id)
-            .distinct()
-        )
-        if not tasks:
-            project.release_lock(REVIEW_LOCK)
-            return Response(
-                {"message": "No tasks available for review in this project"},
-                status=status.HTTP_404_NOT_FOUND,
-            )
         task_pull_count = project.tasks_pull_count_per_batch
         if "num_tasks" in dict(request.data):
             task_pull_count = request.data["num_tasks"]
-        # Sort by most recently updated annotation; temporary change
-        task_ids = (
-            Annotation_model.objects.filter(task__in=tasks)
-            .filter(annotation_type=ANNOTATOR_ANNOTATION)
-            .distinct()
-            .order_by("-updated_at")
-            .values_list("task", flat=True)
-        )
-        # tasks = tasks.order_by("id")
-        task_ids = list(task_ids)
-        task_ids = task_ids[:task_pull_count]
-        for task_id in task_ids:
-            task = Task.objects.get(pk=task_id)
-            task.review_user = cur_user
-            task.save()
-            rec_ann = (
-                Annotation_model.objects.filter(task_id=task_id)
-                .filter(annotation_type=ANNOTATOR_ANNOTATION)
-                .order_by("-updated_at")
-            )
-            reviewer_anno = Annotation_model.objects.filter(
-                task_id=task_id, annotation_type=REVIEWER_ANNOTATION
+        assigned_count = assign_review_tasks(project, cur_user, task_pull_count)
+        if not assigned_count:
+            return Response(
+                {"message": "No tasks available for review in this project"},
+                status=status.HTTP_404_NOT_FOUND,
             )
-            reviewer_anno_count = Annotation_model.objects.filter(
-                task_id=task_id, annotation_type=REVIEWER_ANNOTATION
-            ).count()
-            if reviewer_anno_count == 0:
-                base_annotation_obj = Annotation_model(
-                    result=[],
-                    task=task,
-                    completed_by=cur_user,
-                    annotation_status="unreviewed",
-                    parent_annotation=rec_ann[0],
-                    annotation_type=REVIEWER_ANNOTATION,
-                )
-                try:
-                    base_annotation_obj.save()
-                except IntegrityError as e:
-                    print(
-                        f"Task and completed_by fields are same while assigning new review task "
-                        f"for project id-{project.id}, user-{cur_user.email}"
-                    )
-            else:
-                task.review_user = reviewer_anno[0].completed_by
-                task.save()
-        project.release_lock(REVIEW_LOCK)
         return Response(
             {"message": "Tasks assigned successfully"}, status=status.HTTP_200_OK
         )
@@ -2754,6 +2498,7 @@ class ProjectViewSet(viewsets.ModelViewSet):
                 tasks.update(review_user=None)
                 tasks.update(revision_loop_count=default_revision_loop_count_value())
                 tasks.update(task_status=ANNOTATED)
+                invalidate_project_queues(pk)
                 return Response(
                     {"message": "Tasks unassigned"}, status=status.HTTP_200_OK
                 )
@@ -2800,32 +2545,6 @@ class ProjectViewSet(viewsets.ModelViewSet):
                 {"message": "You are not assigned to supercheck this project"},
                 status=status.HTTP_403_FORBIDDEN,
             )
-        lock_set = False
-        while lock_set == False:
-            if project.is_locked(SUPERCHECK_LOCK):
-                sleep(settings.PROJECT_LOCK_RETRY_INTERVAL)
-                continue
-            else:
-                try:
-                    project.set_lock(cur_user, SUPERCHECK_LOCK)
-                    lock_set = True
-                except Exception as e:
-                    continue
-        # check if the project contains eligible tasks to pull
-        tasks = (
-            Task.objects.filter(project_id=pk)
-            .filter(task_status=REVIEWED)
-            .filter(super_check_user__isnull=True)
-            .exclude(annotation_users=cur_user.id)
-            .exclude(review_user=cur_user.id)
-            .distinct()
-        )
-        if not tasks:
-            project.release_lock(SUPERCHECK_LOCK)
-            return Response(
-                {"message": "No tasks available for supercheck in this project"},
-                status=status.HTTP_404_NOT_FOUND,
-            )
         task_pull_count = project.tasks_pull_count_per_batch
         if "num_tasks" in dict(request.data):
             task_pull_count = request.data["num_tasks"]
@@ -2854,52 +2573,12 @@ class ProjectViewSet(viewsets.ModelViewSet):
         task_pull_count = min(
             task_pull_count, max_super_check_tasks_count - sup_exp_tasks_count
         )
-        # Sort by most recently updated annotation; temporary change
-        task_ids = (
-            Annotation_model.objects.filter(task__in=tasks)
-            .filter(annotation_type=REVIEWER_ANNOTATION)
-            .distinct()
-            .order_by("-updated_at")
-            .values_list("task", flat=True)
-        )
-        # tasks = tasks.order_by("id")
-        task_ids = list(task_ids)
-        task_ids = task_ids[:task_pull_count]
-        for task_id in task_ids:
-            task = Task.objects.get(pk=task_id)
-            task.super_check_user = cur_user
-            task.save()
-            rec_ann = (
-                Annotation_model.objects.filter(task_id=task_id)
-                .filter(annotation_type=REVIEWER_ANNOTATION)
-                .order_by("-updated_at")
-            )
-            superchecker_anno = Annotation_model.objects.filter(
-                task_id=task_id, annotation_type=SUPER_CHECKER_ANNOTATION
+        assigned_count = assign_supercheck_tasks(project, cur_user, task_pull_count)
+        if not assigned_count:
+            return Response(
+                {"message": "No tasks available for supercheck in this project"},
+                status=status.HTTP_404_NOT_FOUND,
             )
-            superchecker_anno_count = Annotation_model.objects.filter(
-                task_id=task_id, annotation_type=SUPER_CHECKER_ANNOTATION
-            ).count()
-            if superchecker_anno_count == 0:
-                base_annotation_obj = Annotation_model(
-                    result=[],
-                    task=task,
-                    completed_by=cur_user,
-                    annotation_status="unvalidated",
-                    parent_annotation=rec_ann[0],
-                    annotation_type=SUPER_CHECKER_ANNOTATION,
-                )
-                try:
-                    base_annotation_obj.save()
-                except IntegrityError as e:
-                    print(
-                        f"Task and completed_by fields are same while assigning super-check task for "
-                        f"project id-{project.id}, user-{cur_user.email}"
-                    )
-            else:
-                task.super_check_user = superchecker_anno[0].completed_by
-                task.save()
-        project.release_lock(SUPERCHECK_LOCK)
         return Response(
             {"message": "Tasks assigned successfully"}, status=status.HTTP_200_OK
         )
@@ -2963,6 +2642,7 @@ class ProjectViewSet(viewsets.ModelViewSet):
             tasks = Task.objects.filter(id__in=task_ids)
             if tasks.count() > 0:
                 tasks.update(super_check_user=None)
+                invalidate_project_queues(pk)
                 for task in tasks:
                     rev_loop_count = task.revision_loop_count
                     rev_loop_count["super_check_count"] = 0
@@ -3780,6 +3460,7 @@ class ProjectViewSet(viewsets.ModelViewSet):
                     # change all reviewed task status from "reviewed" to "annotate"
                     reviewed_tasks.update(task_status=ANNOTATED)
                     tasks.update(review_user=None)
+                    invalidate_project_queues(project.id)
                     for tas in ann_rew_exp_tasks:
                         anns = Annotation_model.objects.filter(
                             task_id=tas.id, annotation_type=ANNOTATOR_ANNOTATION
@@ -3848,6 +3529,7 @@ class ProjectViewSet(viewsets.ModelViewSet):
                     )
                     super_checked_tasks.update(task_status=REVIEWED)
                     tasks.update(super_check_user=None)
+                    invalidate_project_queues(project.id)
                     for tas in rev_exp_sup_tasks:
                         anns = Annotation_model.objects.filter(
                             task_id=tas.id, annotation_type=REVIEWER_ANNOTATION
@@ -4068,10 +3750,33 @@ class ProjectViewSet(viewsets.ModelViewSet):
                 task_status = task_status.split(",")
                 tasks = tasks.filter(task_status__in=task_status)
 
-            if len(tasks) == 0:
+            if not tasks.exists():
                 ret_dict = {"message": "No tasks in project!"}
                 ret_status = status.HTTP_200_OK
                 return Response(ret_dict, status=ret_status)
+
+            if request.query_params.get("stream") == "true":
+                if export_type not in STREAMING_EXPORT_TYPES:
+                    return Response(
+                        {
+                            "message": f"Streaming is supported for {', '.join(STREAMING_EXPORT_TYPES)} exports only"
+                        },
+                        status=status.HTTP_400_BAD_REQUEST,
+                    )
+                filename = (
+                    f"project-{project.id}-at-{datetime.now().strftime('%Y-%m-%d-%H-%M')}"
+                    f".{export_type.lower()}"
+                )
+                response = StreamingHttpResponse(
+                    stream_project_export(
+                        project, tasks, export_type, include_input_data_metadata_json
+                    ),
+                    content_type=EXPORT_CONTENT_TYPES[export_type],
+                )
+                response["Content-Disposition"] = 'attachment; filename="%s"' % filename
+                response["filename"] = filename
+                return response
+
             tasks_list = []
             is_audio_project_type = (
                 True if project_type in get_audio_project_types() else False
@@ -4387,18 +4092,8 @@ class ProjectViewSet(viewsets.ModelViewSet):
                 },
                 status=status.HTTP_400_BAD_REQUEST,
             )
-        # Handle 'create_parameter' task separately
-        if task_name == "projects.tasks.create_parameters_for_task_creation":
-            # Create the keyword argument for dataset instance ID
-            project_id_keyword_arg = "'project_id': " + str(pk) + "}"
-        else:
-            # Create the keyword argument for dataset instance ID
-            project_id_keyword_arg = "'project_id': " + "'" + str(pk) + "'"
-        # Check the celery project export status
-        task_queryset = TaskResult.objects.filter(
-            task_name=task_name,
-            task_kwargs__contains=project_id_keyword_arg,
-        )
+        # Check the celery tasks of the project
+        task_queryset = get_task_results(get_jobs([task_name], project_id=pk))
 
         # Check if queryset is empty
         if not task_queryset:
@@ -4444,9 +4139,10 @@ class ProjectViewSet(viewsets.ModelViewSet):
             task_data = task.data
             task_data["output_language"] = project.tgt_language
             setattr(task, "data", task_data)
+            task.search_text = get_task_search_text(task_data, project.project_type)
             tasks_list.append(task)
 
-        Task.objects.bulk_update(tasks_list, ["data"])
+        Task.objects.bulk_update(tasks_list, ["data", "search_text"])
 
         return Response(
             {"message": "language field of task data succesfully updated!"},
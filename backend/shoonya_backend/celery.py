@@ -38,6 +38,22 @@ celery_app.conf.beat_schedule = {
         "task": "check_size",
         "schedule": crontab(minute=0, hour=0),  # every mid night
     },
+    "refresh-annotation-stats": {
+        "task": "refresh_annotation_stats",
+        "schedule": crontab(),  # every minute
+    },
+    "rebuild-annotation-stats": {
+        "task": "rebuild_annotation_stats",
+        "schedule": crontab(minute=30, hour=0),  # every night at 00:30
+    },
+    "purge-celery-task-events": {
+        "task": "purge_celery_task_events",
+        "schedule": crontab(minute=0, hour=1),  # every night at 01:00
+    },
+    "trim-notifications": {
+        "task": "trim_notifications",
+        "schedule": crontab(minute=15),  # every hour at minute 15
+    },
 }
 
 # Celery Task related settings
@@ -1,17 +1,23 @@
-import os
-import json
-import redis
-import time
-import logging
-from dotenv import load_dotenv
+import uuid
 
+from utils.redis_connection import get_redis_connection
+
+"""
+The locks are stored in redis with one key per lock
+lock:userid:taskname -> token
+
+Each lock is set with SET NX PX, so redis expires it on its own once the
+timeout is over, and it is released through a compare-and-delete script so
+that a lock which has expired and been taken again is not released by its
+previous holder.
 """
-The locks are stored in redis with the format
-userid: {
-    taskname1:validity,
-    taskname2:validity
-}
-userid is the key in redis, and the python dictionary is stored as a JSON string
+
+# Delete the lock only if it still holds the token of the releasing instance
+RELEASE_LOCK_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
 """
 
 
@@ -21,80 +27,56 @@ class LockException(Exception):
 
 class Lock:
     def __init__(self, user_id, task_name):
-        load_dotenv()
-        self.redis_host = os.getenv("REDIS_HOST")
-        self.redis_port = os.getenv("REDIS_PORT")
-        self.redis_connection = redis.StrictRedis(
-            host=self.redis_host, port=self.redis_port, db=0
-        )
+        self.redis_connection = get_redis_connection()
         self.user_id = user_id
         self.task_name = task_name
-        # self.logger = logging.getLogger(f"Lock-{self.user_id}-{self.task_name}")
-        # self.logger.setLevel(logging.INFO)
+        self.key = f"lock:{user_id}:{task_name}"
+        # Token of the lock if it was set through this instance
+        self.token = None
 
     # Return 1 if the lock is set and 0 if lock is not set
     def lockStatus(self):
         try:
-            retrieved_json_str = self.redis_connection.get(self.user_id)
-            if retrieved_json_str:
-                retrieved_dict = json.loads(retrieved_json_str.decode("utf-8"))
-                if self.task_name in retrieved_dict:
-                    validity = retrieved_dict[self.task_name]
-                    if time.time() > validity:
-                        return 0  # Lock has expired
-                    else:
-                        return 1  # Lock is valid
-                else:
-                    return 0  # Task name doesn't exist in locks
-            else:
-                return 0  # user id doesn't exist in Redis
+            return 1 if self.redis_connection.exists(self.key) else 0
         except Exception as e:
-            raise LockException(f"Error setting lock: {str(e)}")
+            raise LockException(f"Error getting lock status: {str(e)}")
 
     def setLock(self, timeout):
+        """
+        Set the lock for timeout seconds if it is not held already.
+        Returns True if the lock was acquired.
+        """
         try:
-            if self.lockStatus() == 0:
-                retrieved_json_str = self.redis_connection.get(self.user_id)
-                if retrieved_json_str:
-                    # JSON for user already exists, append the task name and validity
-                    retrieved_dict = json.loads(retrieved_json_str.decode("utf-8"))
-                    retrieved_dict[self.task_name] = time.time() + timeout
-                    new_json_str = json.dumps(retrieved_dict)
-                    self.redis_connection.set(self.user_id, new_json_str)
-                    # self.logger.info(f"Lock set for task {self.task_name} and user {self.user_id} for {timeout} seconds")
-
-                else:
-                    # create new JSON for redis entry
-                    new_dict = {self.task_name: time.time() + timeout}
-                    new_json_str = json.dumps(new_dict)
-                    self.redis_connection.set(self.user_id, new_json_str)
-                    # self.logger.info(f"Lock set for task {self.task_name} and user {self.user_id} for {timeout} seconds")
+            token = uuid.uuid4().hex
+            acquired = self.redis_connection.set(
+                self.key, token, nx=True, px=int(timeout * 1000)
+            )
+            if acquired:
+                self.token = token
+            return bool(acquired)
         except Exception as e:
             raise LockException(f"Error setting lock: {str(e)}")
 
     def releaseLock(self):
+        """
+        Release the lock. An instance which set the lock only releases it while
+        it still holds it, other instances (e.g. the celery task finishing the
+        work requested by a view) release it unconditionally.
+        """
         try:
-            if self.lockStatus() == 1:
-                retrieved_json_str = self.redis_connection.get(self.user_id)
-                retrieved_dict = json.loads(retrieved_json_str.decode("utf-8"))
-                if len(retrieved_dict) > 1:
-                    del retrieved_dict[self.task_name]
-                    new_json_str = json.dumps(retrieved_dict)
-                    self.redis_connection.set(self.user_id, new_json_str)
-                    # self.logger.info(f"Lock released for task {self.task_name} and user {self.user_id}")
-                else:
-                    self.redis_connection.delete(self.user_id)
-                    # self.logger.info(f"Lock released for task {self.task_name} and user {self.user_id}")
+            if self.token is None:
+                self.redis_connection.delete(self.key)
+            else:
+                self.redis_connection.eval(RELEASE_LOCK_SCRIPT, 1, self.key, self.token)
+                self.token = None
         except Exception as e:
             raise LockException(f"Error releasing lock: {str(e)}")
 
     def getRemainingTimeForLock(self):
         try:
-            if self.lockStatus() == 1:
-                retrieved_json_str = self.redis_connection.get(self.user_id)
-                retrieved_dict = json.loads(retrieved_json_str.decode("utf-8"))
-                remaining_time = retrieved_dict[self.task_name] - time.time()
-                return remaining_time
+            remaining_time = self.redis_connection.pttl(self.key)
+            if remaining_time > 0:
+                return remaining_time / 1000
         except Exception as e:
             raise LockException(f"Error getting remaining time for lock: {str(e)}")
 
@@ -117,16 +99,6 @@ class Lock:
 #     lock.releaseLock()
 #     print(f"after releasing the lock the lock status is {lock.lockStatus()}")
 #
-#     #test2 part 1
-#     lock = Lock(user_id, task_name)
-#     print(f"Before setting the lock for 200sec the lock status is {lock.lockStatus()}")
-#     lock.setLock(200)
-#     print(f"Just after setting the lock for 200sec the lock status is {lock.lockStatus()}")
-#
-#     #test2 part2
-#     lock = Lock(user_id, task_name)
-#     print(f"few seconds after setting the lock for 200sec the lock status is {lock.lockStatus()}")
-#
 #     #test 3 for testing remanining time
 #     lock =Lock(user_id,task_name)
 #     lock.setLock(100)
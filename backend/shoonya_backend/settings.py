@@ -310,3 +310,57 @@ CELERY_BEAT_SCHEDULER = "django_celery_beat.schedulers:DatabaseScheduler"
 # Project lock TTL for task pulling(in seconds)
 PROJECT_LOCK_TTL = 5
 PROJECT_LOCK_RETRY_INTERVAL = 1
+
+# TTL of the per-user work queues used to fetch the next task(in seconds)
+TASK_QUEUE_TTL = 60 * 60
+
+# Machine translation cache TTL(in seconds) and the number of batches translated in parallel
+TRANSLATION_CACHE_TTL = 60 * 60 * 24 * 30
+TRANSLATION_MAX_WORKERS = 4
+
+# OCR/ASR prediction generation: items written per chunk, parallel API calls,
+# API calls per second (0 for no limit) and TTL of the resume checkpoint(in seconds)
+PREDICTION_CHUNK_SIZE = 100
+PREDICTION_MAX_WORKERS = 8
+PREDICTION_RATE_LIMIT = 5
+PREDICTION_CHECKPOINT_TTL = 60 * 60 * 24 * 7
+
+# Processes used to score large batches of sentence pairs (BLEU, CED, WER), 1 scores them in the calling process
+SCORING_MAX_WORKERS = 1
+
+# Daily report mails: annotations read per query and users mailed per celery task
+DAILY_REPORT_CHUNK_SIZE = 2000
+DAILY_REPORT_MAIL_CHUNK_SIZE = 100
+
+# Celery task events served by get_celery_tasks: days they are kept and tasks which are not recorded
+CELERY_TASK_EVENTS_RETENTION_DAYS = 30
+CELERY_TASK_EVENTS_EXCLUDED_TASKS = [
+    "refresh_annotation_stats",
+    "purge_celery_task_events",
+    "trim_notifications",
+]
+
+# Download of all the projects: projects exported in parallel, bytes of an export kept in memory
+# before it is spooled to disk and size of the blocks the archive is uploaded in
+PROJECT_ARCHIVE_MAX_WORKERS = 4
+PROJECT_ARCHIVE_SPOOL_SIZE = 16 * 1024 * 1024
+PROJECT_ARCHIVE_BLOCK_SIZE = 8 * 1024 * 1024
+
+# Time the row counts of the paginated managerial task listings are cached(in seconds)
+TASK_LIST_COUNT_TTL = 60
+
+# Dataset file uploads: directory of the default storage the files are kept in until they are
+# ingested, rows validated and inserted at once and invalid rows reported in the task result
+DATASET_UPLOAD_DIR = "dataset_uploads"
+DATASET_UPLOAD_CHUNK_SIZE = 5000
+DATASET_UPLOAD_MAX_REPORTED_ERRORS = 1000
+
+# Processes used to split large batches of Indic paragraphs into sentences, 1 splits them in the calling process.
+# Every celery worker process keeps its own pool, so the CPUs are shared by the CELERY_WORKER_CONCURRENCY processes.
+# The workers of the default prefork pool are daemonic and can't start a pool, they always split in the calling process
+SENTENCE_SPLITTING_MAX_WORKERS = int(
+    os.getenv(
+        "SENTENCE_SPLITTING_MAX_WORKERS",
+        max(1, (os.cpu_count() or 1) // int(os.getenv("CELERY_WORKER_CONCURRENCY", 2))),
+    )
+)
@@ -0,0 +1,321 @@
+import datetime
+import json
+from collections import defaultdict
+
+import redis
+from dateutil.parser import parse as date_parse
+from django.db import transaction
+from django.db.models import Sum
+from django.utils import timezone
+
+from projects.utils import (
+    get_audio_project_types,
+    get_audio_transcription_duration,
+    get_audio_segments_count,
+    ocr_word_count,
+)
+from utils.redis_connection import get_redis_connection
+from .models import Annotation, AnnotationStats, get_stats_bucket
+
+"""
+Daily annotation rollups for the analytics reports
+
+Every AnnotationStats row holds the totals of the annotations of one user in
+one project with a given type and status, last updated on a given day (UTC).
+
+A (user, type, status, day) bucket is marked dirty in a redis set whenever
+one of its annotations is saved or deleted, see the signal handlers in
+tasks/models.py. Annotations written with bulk_create don't send signals,
+their writers mark them with schedule_bulk_annotation_stats_refresh. The
+dirty buckets are drained and recomputed every minute, so a bucket saved
+many times in a minute, as by the draft autosaves, is recomputed once.
+rebuild_annotation_stats recomputes a whole date range and is run every
+night for the previous days, as a last resort for writes which bypass the
+signals or couldn't be marked.
+"""
+
+STATS_METRICS = (
+    "annotations_count",
+    "lead_time",
+    "word_count",
+    "audio_duration",
+    "raw_audio_duration",
+    "audio_segments_count",
+)
+
+STATS_CHUNK_SIZE = 1000
+
+DIRTY_BUCKETS_KEY = "annotation_stats:dirty_buckets"
+
+
+def get_annotation_metrics(annotation, project_type):
+    """
+    Contribution of a single annotation to the totals of its bucket
+    """
+    metrics = dict.fromkeys(STATS_METRICS, 0)
+    metrics["annotations_count"] = 1
+    metrics["lead_time"] = annotation.lead_time
+    if (
+        "translation" in project_type.lower()
+        or project_type == "SemanticTextualSimilarity_Scale5"
+    ):
+        try:
+            metrics["word_count"] = annotation.task.data["word_count"]
+        except:
+            pass
+    elif "OCRTranscription" in project_type:
+        metrics["word_count"] = ocr_word_count(annotation.result)
+    elif project_type in get_audio_project_types():
+        try:
+            metrics["audio_duration"] = get_audio_transcription_duration(
+                annotation.result
+            )
+            metrics["audio_segments_count"] = get_audio_segments_count(
+                annotation.result
+            )
+            metrics["raw_audio_duration"] = annotation.task.data["audio_duration"]
+        except:
+            pass
+    return metrics
+
+
+def get_stats_annotations(annotations):
+    return annotations.select_related("task__project_id").only(
+        "completed_by",
+        "annotation_type",
+        "annotation_status",
+        "updated_at",
+        "lead_time",
+        "result",
+        "task__project_id__project_type",
+        "task__data",
+    )
+
+
+def aggregate_annotations(annotations):
+    """
+    Map of (user id, project id, annotation type, annotation status, day) to
+    the totals of the given annotations
+    """
+    stats = defaultdict(lambda: dict.fromkeys(STATS_METRICS, 0))
+    for annotation in get_stats_annotations(annotations).iterator(
+        chunk_size=STATS_CHUNK_SIZE
+    ):
+        project = annotation.task.project_id
+        key = (
+            annotation.completed_by_id,
+            project.id,
+            annotation.annotation_type,
+            annotation.annotation_status,
+            annotation.updated_at.date(),
+        )
+        metrics = get_annotation_metrics(annotation, project.project_type)
+        for metric, value in metrics.items():
+            stats[key][metric] += value
+    return stats
+
+
+def get_day_range(day):
+    start = datetime.datetime.combine(day, datetime.time.min, tzinfo=timezone.utc)
+    return start, start + datetime.timedelta(days=1)
+
+
+def refresh_annotation_stats(buckets):
+    """
+    Recompute the rows of the given (user id, annotation type, annotation
+    status, day) buckets from their annotations
+    """
+    for user_id, annotation_type, annotation_status, day in buckets:
+        day_start, day_end = get_day_range(day)
+        stats = aggregate_annotations(
+            Annotation.objects.filter(
+                completed_by_id=user_id,
+                annotation_type=annotation_type,
+                annotation_status=annotation_status,
+                updated_at__gte=day_start,
+                updated_at__lt=day_end,
+            )
+        )
+        with transaction.atomic():
+            for key, metrics in stats.items():
+                AnnotationStats.objects.update_or_create(
+                    completed_by_id=user_id,
+                    project_id=key[1],
+                    annotation_type=annotation_type,
+                    annotation_status=annotation_status,
+                    day=day,
+                    defaults=metrics,
+                )
+            AnnotationStats.objects.filter(
+                completed_by_id=user_id,
+                annotation_type=annotation_type,
+                annotation_status=annotation_status,
+                day=day,
+            ).exclude(project_id__in=[key[1] for key in stats]).delete()
+
+
+def rebuild_annotation_stats(start_day, end_day):
+    """
+    Recompute every row from start_day to end_day (both inclusive)
+    """
+    range_start, _ = get_day_range(start_day)
+    _, range_end = get_day_range(end_day)
+    stats = aggregate_annotations(
+        Annotation.objects.filter(updated_at__gte=range_start, updated_at__lt=range_end)
+    )
+    with transaction.atomic():
+        AnnotationStats.objects.filter(day__range=[start_day, end_day]).delete()
+        AnnotationStats.objects.bulk_create(
+            [
+                AnnotationStats(
+                    completed_by_id=key[0],
+                    project_id=key[1],
+                    annotation_type=key[2],
+                    annotation_status=key[3],
+                    day=key[4],
+                    **metrics,
+                )
+                for key, metrics in stats.items()
+            ],
+            batch_size=STATS_CHUNK_SIZE,
+        )
+
+
+def schedule_annotation_stats_refresh(buckets):
+    """
+    Mark the given (user id, annotation type, annotation status, updated at)
+    buckets dirty once the current transaction commits, they are refreshed by
+    the next drain_annotation_stats_buckets
+    """
+    buckets = {
+        json.dumps(
+            [user_id, annotation_type, annotation_status, updated_at.date().isoformat()]
+        )
+        for user_id, annotation_type, annotation_status, updated_at in buckets
+        if updated_at is not None
+    }
+    if not buckets:
+        return
+
+    def mark_dirty():
+        try:
+            get_redis_connection().sadd(DIRTY_BUCKETS_KEY, *buckets)
+        except redis.RedisError as e:
+            print(f"Unable to schedule the annotation stats refresh. Error: {e}")
+
+    transaction.on_commit(mark_dirty)
+
+
+def drain_annotation_stats_buckets():
+    """
+    Refresh the buckets marked dirty, STATS_CHUNK_SIZE at a time, until the
+    set is empty. A chunk which fails is marked dirty again.
+    """
+    connection = get_redis_connection()
+    while True:
+        members = connection.spop(DIRTY_BUCKETS_KEY, STATS_CHUNK_SIZE)
+        if not members:
+            break
+        buckets = []
+        for member in members:
+            user_id, annotation_type, annotation_status, day = json.loads(member)
+            buckets.append(
+                (
+                    user_id,
+                    annotation_type,
+                    annotation_status,
+                    datetime.date.fromisoformat(day),
+                )
+            )
+        try:
+            refresh_annotation_stats(buckets)
+        except Exception:
+            connection.sadd(DIRTY_BUCKETS_KEY, *members)
+            raise
+
+
+def schedule_bulk_annotation_stats_refresh(annotations):
+    """
+    Refresh the buckets of annotations written with bulk_create, which
+    doesn't send post_save
+    """
+    schedule_annotation_stats_refresh(
+        bucket for bucket in map(get_stats_bucket, annotations) if bucket is not None
+    )
+
+
+def to_aware_datetime(value):
+    if isinstance(value, str):
+        value = date_parse(value)
+    elif not isinstance(value, datetime.datetime):
+        value = datetime.datetime.combine(value, datetime.time.min)
+    if timezone.is_naive(value):
+        value = timezone.make_aware(value, timezone.utc)
+    return value
+
+
+def get_annotation_stats(
+    proj_ids,
+    user_id,
+    annotation_type,
+    annotation_statuses,
+    start_date=None,
+    end_date=None,
+):
+    """
+    Totals of the annotations of a user in the given projects, optionally
+    limited to the ones updated between start_date and end_date (both
+    inclusive).
+
+    Days fully inside the range are read from the daily rollups, only the
+    annotations of the partially covered days at its ends are read one by one.
+    """
+    stats = AnnotationStats.objects.filter(
+        completed_by_id=user_id,
+        project_id__in=proj_ids,
+        annotation_type=annotation_type,
+        annotation_status__in=annotation_statuses,
+    )
+    annotations = Annotation.objects.filter(
+        completed_by_id=user_id,
+        task__project_id__in=proj_ids,
+        annotation_type=annotation_type,
+        annotation_status__in=annotation_statuses,
+    )
+    partial_ranges = []
+    if start_date is not None:
+        start_date = to_aware_datetime(start_date)
+        end_date = to_aware_datetime(end_date)
+        first_day_start, _ = get_day_range(start_date.date())
+        first_full_day = start_date.date()
+        if start_date > first_day_start:
+            first_full_day += datetime.timedelta(days=1)
+        _, last_day_end = get_day_range(end_date.date())
+        last_full_day = end_date.date()
+        if end_date < last_day_end - datetime.timedelta(microseconds=1):
+            last_full_day -= datetime.timedelta(days=1)
+
+        if first_full_day > last_full_day:
+            stats = stats.none()
+            partial_ranges.append({"updated_at__range": [start_date, end_date]})
+        else:
+            stats = stats.filter(day__range=[first_full_day, last_full_day])
+            full_range_start, _ = get_day_range(first_full_day)
+            _, full_range_end = get_day_range(last_full_day)
+            if start_date < full_range_start:
+                partial_ranges.append(
+                    {"updated_at__gte": start_date, "updated_at__lt": full_range_start}
+                )
+            if end_date >= full_range_end:
+                partial_ranges.append(
+                    {"updated_at__gte": full_range_end, "updated_at__lte": end_date}
+                )
+
+    totals = stats.aggregate(**{metric: Sum(metric) for metric in STATS_METRICS})
+    totals = {metric: value or 0 for metric, value in totals.items()}
+    for partial_range in partial_ranges:
+        partial_stats = aggregate_annotations(annotations.filter(**partial_range))
+        for metrics in partial_stats.values():
+            for metric, value in metrics.items():
+                totals[metric] += value
+    return totals
@@ -4,3 +4,8 @@ from django.apps import AppConfig
 class TasksConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "tasks"
+
+    def ready(self):
+        # Connects the celery signal receivers recording the task events and
+        # the async jobs
+        from . import celery_task_events
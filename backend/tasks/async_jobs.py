@@ -0,0 +1,81 @@
+from django_celery_results.models import TaskResult
+
+from .models import AsyncJob
+
+"""
+Async jobs of the projects and dataset instances
+
+The celery tasks run on a project or a dataset instance are recorded in
+AsyncJob with a foreign key to their target, read from the keyword argument
+of the task given in JOB_TARGETS, by the celery signal receivers of
+tasks.celery_task_events. The status pages read the latest job of a target
+from the indexes of AsyncJob instead of searching the arguments of the
+django-celery-results TaskResult rows, whose result is read by task_id.
+"""
+
+# Field of AsyncJob and keyword argument of the target of the recorded tasks
+JOB_TARGETS = {
+    "dataset.tasks.upload_data_to_data_instance": ("dataset_instance_id", "pk"),
+    "projects.tasks.add_new_data_items_into_project": ("project_id", "project_id"),
+    "projects.tasks.pull_new_data_items_into_project": ("project_id", "project_id"),
+    "projects.tasks.create_parameters_for_task_creation": (
+        "project_id",
+        "project_id",
+    ),
+    "projects.tasks.export_project_in_place": ("project_id", "project_id"),
+    "projects.tasks.export_project_new_record": ("project_id", "project_id"),
+}
+
+
+def get_job_target(task_name, task_kwargs):
+    """
+    Target of a task as keyword arguments of AsyncJob, None if the task isn't
+    recorded or its target is missing
+    """
+    if task_name not in JOB_TARGETS or not isinstance(task_kwargs, dict):
+        return None
+    field, kwarg = JOB_TARGETS[task_name]
+    try:
+        return {field: int(task_kwargs[kwarg])}
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+def get_jobs(task_names, **target):
+    """
+    Jobs of the given tasks on a target, given as project_id or
+    dataset_instance_id, newest first
+    """
+    return AsyncJob.objects.filter(task_name__in=task_names, **target).order_by("-id")
+
+
+def get_latest_job(task_names, **target):
+    return get_jobs(task_names, **target).first()
+
+
+def get_task_results(jobs):
+    """
+    TaskResult rows of the given jobs
+    """
+    return TaskResult.objects.filter(task_id__in=jobs.values("task_id"))
+
+
+def get_job_result(job):
+    """
+    Result of a job as stored by django-celery-results, None if the task has
+    no result yet
+    """
+    return (
+        TaskResult.objects.filter(task_id=job.task_id)
+        .values_list("result", flat=True)
+        .first()
+    )
+
+
+def get_job_status_date_time(job):
+    """
+    Status of a job with the date and the time of its last change
+    """
+    task_date = job.date_done.date()
+    task_time = f"{str(job.date_done.time().replace(microsecond=0))} UTC"
+    return job.status, task_date, task_time
@@ -0,0 +1,215 @@
+import hashlib
+import json
+
+from celery.signals import (
+    after_task_publish,
+    task_failure,
+    task_prerun,
+    task_retry,
+    task_revoked,
+    task_success,
+)
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from .async_jobs import JOB_TARGETS, get_job_target
+from .models import AsyncJob, CeleryTaskEvent
+from .utils import Queued_Task_name
+
+"""
+Celery task events
+
+The state of every celery task is recorded in CeleryTaskEvent from the celery
+signals: the publishing process records the task when it is queued and the
+worker records when it starts and how it ends. get_celery_tasks serves the
+task list from that table, old rows are removed by purge_celery_task_events.
+The same receivers record the status of the jobs of tasks.async_jobs in
+AsyncJob.
+
+Recording an event or a job never raises, a task must not fail because its
+state couldn't be saved.
+"""
+
+# Longest args, kwargs, result and traceback text kept for a task
+MAX_TEXT_LENGTH = 2000
+
+
+def truncate(value):
+    return str(value)[:MAX_TEXT_LENGTH]
+
+
+def get_args_digest(args, kwargs):
+    return hashlib.sha256(
+        json.dumps([args, kwargs], sort_keys=True, default=str).encode()
+    ).hexdigest()
+
+
+def get_task_user_id(kwargs):
+    user_id = kwargs.get("user_id") if isinstance(kwargs, dict) else None
+    return user_id if isinstance(user_id, int) else None
+
+
+def is_recorded(name):
+    return name not in settings.CELERY_TASK_EVENTS_EXCLUDED_TASKS
+
+
+def save_task_row(model, task_id, create_fields, fields):
+    """
+    Update the row of a task in model, creating it with create_fields too if
+    the task wasn't recorded when it was published
+    """
+    if model.objects.filter(task_id=task_id).update(**fields):
+        return
+    try:
+        with transaction.atomic():
+            model.objects.create(task_id=task_id, **create_fields, **fields)
+    except IntegrityError:
+        # Recorded meanwhile by the other process
+        model.objects.filter(task_id=task_id).update(**fields)
+
+
+def update_task_event(task_id, name, **fields):
+    if not task_id or not is_recorded(name):
+        return
+    # QuerySet.update() doesn't set the auto_now field, which the purge reads
+    fields["updated_at"] = timezone.now()
+    try:
+        save_task_row(CeleryTaskEvent, task_id, {"name": name}, fields)
+    except Exception as e:
+        print(f"Unable to record the event of celery task {task_id}. Error: {e}")
+
+
+def record_job(task_id, name, task_kwargs, status):
+    if not task_id or name not in JOB_TARGETS:
+        return
+    fields = {"status": status, "date_done": timezone.now()}
+    target = get_job_target(name, task_kwargs)
+    try:
+        if target is None:
+            AsyncJob.objects.filter(task_id=task_id).update(**fields)
+        else:
+            save_task_row(AsyncJob, task_id, {"task_name": name, **target}, fields)
+    except Exception as e:
+        print(f"Unable to record the job of celery task {task_id}. Error: {e}")
+
+
+@after_task_publish.connect
+def record_task_published(sender=None, headers=None, body=None, **kwargs):
+    headers = headers or {}
+    if "task" in headers:
+        task_id = headers.get("id")
+        task_args, task_kwargs = body[0], body[1]
+    else:
+        task_id = body.get("id")
+        task_args, task_kwargs = body.get("args", []), body.get("kwargs", {})
+    record_job(task_id, sender, task_kwargs, "PENDING")
+    if not task_id or not is_recorded(sender):
+        return
+    fields = {
+        "args": truncate(task_args),
+        "kwargs": truncate(task_kwargs),
+        "args_digest": get_args_digest(task_args, task_kwargs),
+        "user_id": get_task_user_id(task_kwargs),
+        "received": timezone.now(),
+    }
+    try:
+        try:
+            with transaction.atomic():
+                CeleryTaskEvent.objects.create(
+                    task_id=task_id, name=sender, state="PENDING", **fields
+                )
+        except IntegrityError:
+            # The worker picked up the task before the event was recorded
+            CeleryTaskEvent.objects.filter(task_id=task_id).update(
+                updated_at=timezone.now(), **fields
+            )
+    except Exception as e:
+        print(f"Unable to record the event of celery task {task_id}. Error: {e}")
+
+
+@task_prerun.connect
+def record_task_started(sender=None, task_id=None, task=None, kwargs=None, **extra):
+    record_job(task_id, sender.name, kwargs, "STARTED")
+    update_task_event(
+        task_id,
+        sender.name,
+        state="STARTED",
+        started=timezone.now(),
+        worker=task.request.hostname or "",
+        retries=task.request.retries or 0,
+    )
+
+
+@task_success.connect
+def record_task_succeeded(sender=None, result=None, **kwargs):
+    record_job(sender.request.id, sender.name, sender.request.kwargs, "SUCCESS")
+    update_task_event(
+        sender.request.id,
+        sender.name,
+        state="SUCCESS",
+        succeeded=timezone.now(),
+        result=truncate(result),
+    )
+
+
+@task_failure.connect
+def record_task_failed(
+    sender=None, task_id=None, exception=None, einfo=None, kwargs=None, **extra
+):
+    record_job(task_id, sender.name, kwargs, "FAILURE")
+    update_task_event(
+        task_id,
+        sender.name,
+        state="FAILURE",
+        failed=timezone.now(),
+        exception=truncate(repr(exception)),
+        traceback=str(einfo)[-MAX_TEXT_LENGTH:],
+    )
+
+
+@task_retry.connect
+def record_task_retried(sender=None, request=None, reason=None, **kwargs):
+    record_job(request.id, sender.name, request.kwargs, "RETRY")
+    update_task_event(
+        request.id,
+        sender.name,
+        state="RETRY",
+        retries=(request.retries or 0) + 1,
+        exception=truncate(reason),
+    )
+
+
+@task_revoked.connect
+def record_task_revoked(sender=None, request=None, **kwargs):
+    name = getattr(sender, "name", request.task)
+    record_job(request.id, name, getattr(request, "kwargs", None), "REVOKED")
+    update_task_event(request.id, name, state="REVOKED")
+
+
+def format_timestamp(value):
+    return value.strftime("%Y-%m-%dT%H:%M:%S.%fZ") if value else None
+
+
+def serialize_task_event(event):
+    """
+    Task event in the format of the flower tasks API used before, with the
+    display name of the task
+    """
+    return {
+        "uuid": event.task_id,
+        "name": Queued_Task_name.get(event.name, event.name),
+        "state": event.state,
+        "args": event.args,
+        "kwargs": event.kwargs,
+        "user_id": event.user_id,
+        "worker": event.worker,
+        "retries": event.retries,
+        "result": event.result or None,
+        "exception": event.exception or None,
+        "traceback": event.traceback or None,
+        "received": format_timestamp(event.received),
+        "started": format_timestamp(event.started),
+        "succeeded": format_timestamp(event.succeeded),
+        "failed": format_timestamp(event.failed),
+    }
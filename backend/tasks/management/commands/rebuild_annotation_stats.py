@@ -0,0 +1,40 @@
+import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from tasks.annotation_stats import rebuild_annotation_stats
+from tasks.models import Annotation
+
+
+class Command(BaseCommand):
+    """
+    Command to backfill the daily annotation rollups used by the reports.
+    """
+
+    help = "Rebuild the daily annotation stats of a date range, one month at a time"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--start-date", help="First day (YYYY-MM-DD)")
+        parser.add_argument("--end-date", help="Last day (YYYY-MM-DD)")
+
+    def handle(self, *args, **kwargs):
+        try:
+            if kwargs["start_date"]:
+                start_day = datetime.date.fromisoformat(kwargs["start_date"])
+            else:
+                first_annotation = Annotation.objects.order_by("updated_at").first()
+                if first_annotation is None:
+                    return
+                start_day = first_annotation.updated_at.date()
+            if kwargs["end_date"]:
+                end_day = datetime.date.fromisoformat(kwargs["end_date"])
+            else:
+                end_day = datetime.datetime.now(datetime.timezone.utc).date()
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        while start_day <= end_day:
+            chunk_end_day = min(start_day + datetime.timedelta(days=30), end_day)
+            rebuild_annotation_stats(start_day, chunk_end_day)
+            print(f"Rebuilt the annotation stats from {start_day} to {chunk_end_day}")
+            start_day = chunk_end_day + datetime.timedelta(days=1)
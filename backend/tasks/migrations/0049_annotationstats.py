@@ -0,0 +1,118 @@
+# Generated by Django 3.2.14 on 2026-10-18 10:12
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("projects", "0052_alter_project_project_type"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ("tasks", "0048_alter_annotation_unique_together"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="AnnotationStats",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "annotation_type",
+                    models.PositiveSmallIntegerField(
+                        choices=[
+                            (1, "Annotator's Annotation"),
+                            (2, "Reviewer's Annotation"),
+                            (3, "Super Checker's Annotation"),
+                        ]
+                    ),
+                ),
+                (
+                    "annotation_status",
+                    models.CharField(
+                        choices=[
+                            ("unlabeled", "unlabeled"),
+                            ("labeled", "labeled"),
+                            ("skipped", "skipped"),
+                            ("draft", "draft"),
+                            ("unreviewed", "unreviewed"),
+                            ("accepted", "accepted"),
+                            ("to_be_revised", "to_be_revised"),
+                            (
+                                "accepted_with_minor_changes",
+                                "accepted_with_minor_changes",
+                            ),
+                            (
+                                "accepted_with_major_changes",
+                                "accepted_with_major_changes",
+                            ),
+                            ("unvalidated", "unvalidated"),
+                            ("validated", "validated"),
+                            ("validated_with_changes", "validated_with_changes"),
+                            ("rejected", "rejected"),
+                        ],
+                        max_length=100,
+                    ),
+                ),
+                ("day", models.DateField(verbose_name="annotation_stats_day")),
+                ("annotations_count", models.PositiveIntegerField(default=0)),
+                (
+                    "lead_time",
+                    models.FloatField(default=0.0, verbose_name="total_lead_time"),
+                ),
+                ("word_count", models.PositiveIntegerField(default=0)),
+                (
+                    "audio_duration",
+                    models.FloatField(
+                        default=0.0,
+                        help_text="Total duration of the annotated audio segments",
+                    ),
+                ),
+                (
+                    "raw_audio_duration",
+                    models.FloatField(
+                        default=0.0,
+                        help_text="Total duration of the audio of the tasks",
+                    ),
+                ),
+                ("audio_segments_count", models.PositiveIntegerField(default=0)),
+                (
+                    "completed_by",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="annotation_stats",
+                        to=settings.AUTH_USER_MODEL,
+                        verbose_name="annotation_stats_completed_by",
+                    ),
+                ),
+                (
+                    "project",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="annotation_stats",
+                        to="projects.project",
+                        verbose_name="annotation_stats_project",
+                    ),
+                ),
+            ],
+            options={
+                "unique_together": {
+                    (
+                        "completed_by",
+                        "project",
+                        "annotation_type",
+                        "annotation_status",
+                        "day",
+                    )
+                },
+            },
+        ),
+    ]
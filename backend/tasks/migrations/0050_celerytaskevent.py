@@ -0,0 +1,79 @@
+# Generated by Django 3.2.14 on 2026-10-18 14:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("tasks", "0049_annotationstats"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="CeleryTaskEvent",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "task_id",
+                    models.CharField(
+                        max_length=255, unique=True, verbose_name="task_id"
+                    ),
+                ),
+                ("name", models.CharField(max_length=255, verbose_name="task_name")),
+                ("state", models.CharField(max_length=50, verbose_name="task_state")),
+                ("args", models.TextField(blank=True, default="")),
+                ("kwargs", models.TextField(blank=True, default="")),
+                (
+                    "args_digest",
+                    models.CharField(
+                        blank=True,
+                        default="",
+                        help_text="SHA-256 of the arguments of the task",
+                        max_length=64,
+                    ),
+                ),
+                (
+                    "user_id",
+                    models.PositiveIntegerField(
+                        blank=True, null=True, verbose_name="task_user_id"
+                    ),
+                ),
+                ("worker", models.CharField(blank=True, default="", max_length=255)),
+                ("retries", models.PositiveIntegerField(default=0)),
+                ("result", models.TextField(blank=True, default="")),
+                ("exception", models.TextField(blank=True, default="")),
+                ("traceback", models.TextField(blank=True, default="")),
+                ("received", models.DateTimeField(blank=True, null=True)),
+                ("started", models.DateTimeField(blank=True, null=True)),
+                ("succeeded", models.DateTimeField(blank=True, null=True)),
+                ("failed", models.DateTimeField(blank=True, null=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name="celerytaskevent",
+            index=models.Index(
+                fields=["state", "-id"], name="celery_task_event_state_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="celerytaskevent",
+            index=models.Index(
+                fields=["name", "-id"], name="celery_task_event_name_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="celerytaskevent",
+            index=models.Index(
+                fields=["updated_at"], name="celery_task_event_updated_idx"
+            ),
+        ),
+    ]
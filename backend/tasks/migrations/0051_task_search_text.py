@@ -0,0 +1,163 @@
+# Generated by Django 3.2.14 on 2026-10-18 16:10
+
+import django.contrib.postgres.indexes
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations, models
+
+# Searchable task data fields of every project type when the search text was
+# added, frozen from tasks.search.get_search_fields so that later registry
+# changes don't change this migration. The JSON fields of the datasets are
+# left out, they are searched on the task data
+SEARCH_FIELDS = {
+    "MonolingualTranslation": ("input_language", "input_text", "output_language"),
+    "TranslationEditing": (
+        "input_language",
+        "input_text",
+        "machine_translation",
+        "output_language",
+    ),
+    "SemanticTextualSimilarity_Scale5": (
+        "input_language",
+        "input_text",
+        "output_language",
+        "output_text",
+    ),
+    "ContextualTranslationEditing": (
+        "context",
+        "input_language",
+        "input_text",
+        "machine_translation",
+        "output_language",
+    ),
+    "OCRTranscription": ("image_url",),
+    "OCRTranscriptionEditing": ("image_url",),
+    "OCRSegmentCategorization": ("image_url", "language", "ocr_domain"),
+    "OCRSegmentCategorizationEditing": ("image_url", "language", "ocr_domain"),
+    "MonolingualCollection": ("language",),
+    "SentenceSplitting": ("language", "text"),
+    "ContextualSentenceVerification": ("context", "language", "text"),
+    "ContextualSentenceVerificationAndDomainClassification": (
+        "context",
+        "language",
+        "text",
+    ),
+    "ConversationTranslation": (
+        "domain",
+        "language",
+        "prompt",
+        "scenario",
+        "speaker_count",
+        "topic",
+    ),
+    "ConversationTranslationEditing": (
+        "domain",
+        "language",
+        "parent_data",
+        "prompt",
+        "scenario",
+        "speaker_count",
+        "topic",
+    ),
+    "ConversationVerification": (
+        "domain",
+        "prompt",
+        "scenario",
+        "speaker_count",
+        "topic",
+    ),
+    "AudioTranscription": (
+        "audio_duration",
+        "audio_url",
+        "domain",
+        "reference_raw_transcript",
+        "scenario",
+    ),
+    "AudioSegmentation": ("audio_duration", "audio_url", "domain", "scenario"),
+    "AudioTranscriptionEditing": (
+        "audio_duration",
+        "audio_url",
+        "domain",
+        "reference_raw_transcript",
+        "scenario",
+    ),
+    "AcousticNormalisedTranscriptionEditing": (
+        "audio_duration",
+        "audio_url",
+        "domain",
+        "reference_raw_transcript",
+        "scenario",
+    ),
+}
+
+SEARCH_FIELD_SEPARATOR = "\x1f"
+SEARCH_VALUE_SEPARATOR = "\x1e"
+
+
+def build_search_text(data, fields):
+    # Frozen copy of utils.search.build_search_text
+    search_text = []
+    for field in fields:
+        value = data.get(field)
+        if isinstance(value, bool) or not isinstance(value, (str, int, float)):
+            continue
+        value = (
+            str(value)
+            .replace(SEARCH_FIELD_SEPARATOR, " ")
+            .replace(SEARCH_VALUE_SEPARATOR, " ")
+        )
+        search_text.append(
+            f"{SEARCH_FIELD_SEPARATOR}{field}{SEARCH_VALUE_SEPARATOR}{value}"
+        )
+    return "".join(search_text)
+
+
+def update_search_text(apps, schema_editor):
+    Project = apps.get_model("projects", "Project")
+    Task = apps.get_model("tasks", "Task")
+
+    for project_id, project_type in Project.objects.values_list("id", "project_type"):
+        search_fields = SEARCH_FIELDS.get(project_type, ())
+        tasks = Task.objects.filter(project_id=project_id).order_by("id")
+        last_id = 0
+        while True:
+            chunk = list(tasks.filter(id__gt=last_id).only("id", "data")[:10000])
+            if not chunk:
+                break
+            for task in chunk:
+                task.search_text = build_search_text(task.data or {}, search_fields)
+            Task.objects.bulk_update(chunk, ["search_text"])
+            last_id = chunk[-1].id
+
+
+class Migration(migrations.Migration):
+    # The search texts of the existing tasks are written project by project
+    atomic = False
+
+    dependencies = [
+        ("projects", "0001_initial"),
+        ("tasks", "0050_celerytaskevent"),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddField(
+            model_name="task",
+            name="search_text",
+            field=models.TextField(
+                blank=True,
+                default="",
+                editable=False,
+                help_text="Searchable fields of the task data, see tasks.search",
+                verbose_name="search_text",
+            ),
+        ),
+        migrations.RunPython(update_search_text, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name="task",
+            index=django.contrib.postgres.indexes.GinIndex(
+                fields=["search_text"],
+                name="task_search_text_trgm_idx",
+                opclasses=["gin_trgm_ops"],
+            ),
+        ),
+    ]
@@ -0,0 +1,154 @@
+# Generated by Django 3.2.14 on 2026-10-18 18:40
+
+import re
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+# Field of AsyncJob and keyword argument of the target of the recorded tasks
+JOB_TARGETS = {
+    "dataset.tasks.upload_data_to_data_instance": ("dataset_instance_id", "pk"),
+    "projects.tasks.add_new_data_items_into_project": ("project_id", "project_id"),
+    "projects.tasks.pull_new_data_items_into_project": ("project_id", "project_id"),
+    "projects.tasks.create_parameters_for_task_creation": (
+        "project_id",
+        "project_id",
+    ),
+    "projects.tasks.export_project_in_place": ("project_id", "project_id"),
+    "projects.tasks.export_project_new_record": ("project_id", "project_id"),
+}
+
+
+def record_existing_jobs(apps, schema_editor):
+    TaskResult = apps.get_model("django_celery_results", "TaskResult")
+    AsyncJob = apps.get_model("tasks", "AsyncJob")
+    Project = apps.get_model("projects", "Project")
+    DatasetInstance = apps.get_model("dataset", "DatasetInstance")
+
+    target_ids = {
+        "project_id": set(Project.objects.values_list("id", flat=True)),
+        "dataset_instance_id": set(
+            DatasetInstance.objects.values_list("instance_id", flat=True)
+        ),
+    }
+    # The keyword arguments are stored as their repr, which is truncated for
+    # long arguments
+    kwarg_patterns = {
+        kwarg: re.compile(r"[{\s]'" + kwarg + r"': '?(\d+)")
+        for _, kwarg in JOB_TARGETS.values()
+    }
+
+    jobs = []
+    task_results = (
+        TaskResult.objects.filter(task_name__in=list(JOB_TARGETS))
+        .order_by("date_done", "id")
+        .values_list("task_id", "task_name", "task_kwargs", "status", "date_done")
+    )
+    for task_id, task_name, task_kwargs, status, date_done in task_results.iterator():
+        field, kwarg = JOB_TARGETS[task_name]
+        match = kwarg_patterns[kwarg].search(task_kwargs or "")
+        if match is None or int(match.group(1)) not in target_ids[field]:
+            continue
+        jobs.append(
+            AsyncJob(
+                task_id=task_id,
+                task_name=task_name,
+                status=status,
+                date_done=date_done,
+                **{field: int(match.group(1))},
+            )
+        )
+        if len(jobs) == 1000:
+            AsyncJob.objects.bulk_create(jobs, ignore_conflicts=True)
+            jobs = []
+    AsyncJob.objects.bulk_create(jobs, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("django_celery_results", "0008_chordcounter"),
+        ("dataset", "0001_initial"),
+        ("projects", "0001_initial"),
+        ("tasks", "0051_task_search_text"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="AsyncJob",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "task_id",
+                    models.CharField(
+                        max_length=255, unique=True, verbose_name="task_id"
+                    ),
+                ),
+                (
+                    "task_name",
+                    models.CharField(max_length=255, verbose_name="task_name"),
+                ),
+                (
+                    "status",
+                    models.CharField(max_length=50, verbose_name="task_status"),
+                ),
+                (
+                    "date_done",
+                    models.DateTimeField(
+                        default=django.utils.timezone.now,
+                        help_text="Time of the last change of the status",
+                    ),
+                ),
+                (
+                    "dataset_instance",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="async_jobs",
+                        to="dataset.datasetinstance",
+                        verbose_name="async_job_dataset_instance",
+                    ),
+                ),
+                (
+                    "project",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="async_jobs",
+                        to="projects.project",
+                        verbose_name="async_job_project",
+                    ),
+                ),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name="asyncjob",
+            index=models.Index(
+                fields=["project", "task_name", "-id"], name="async_job_project_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="asyncjob",
+            index=models.Index(
+                fields=["dataset_instance", "task_name", "-id"],
+                name="async_job_dataset_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="asyncjob",
+            index=models.Index(
+                fields=["status", "date_done"], name="async_job_status_idx"
+            ),
+        ),
+        migrations.RunPython(record_existing_jobs, migrations.RunPython.noop),
+    ]
@@ -17,11 +17,15 @@ from label_studio_tools.core.label_config import parse_config
 from django.conf import settings
 import pandas as pd
 
+from django.contrib.postgres.indexes import GinIndex
 from django.db import models
+from django.db.models.signals import post_init, post_save, post_delete, m2m_changed
+from django.dispatch import receiver
 
 from users.models import User
 from dataset.models import DatasetBase, DatasetInstance
 from projects.models import Project
+from utils.search import get_search_values
 
 # Create your models here.
 
@@ -182,6 +186,50 @@ class Task(models.Model):
         default=default_revision_loop_count_value,
         help_text=("Has the revision_loop_count of both supercheck and review"),
     )
+    search_text = models.TextField(
+        verbose_name="search_text",
+        blank=True,
+        default="",
+        editable=False,
+        help_text=("Searchable fields of the task data, see tasks.search"),
+    )
+
+    class Meta:
+        indexes = [
+            GinIndex(
+                fields=["search_text"],
+                name="task_search_text_trgm_idx",
+                opclasses=["gin_trgm_ops"],
+            )
+        ]
+
+    def save(self, *args, **kwargs):
+        # Rewrite the search text when a searchable value of the data changed
+        # since the task was loaded
+        update_fields = kwargs.get("update_fields")
+        if "data" in self.__dict__ and (
+            update_fields is None or "data" in update_fields
+        ):
+            search_values = get_search_values(self.data)
+            if search_values != self._search_values:
+                self.refresh_search_text()
+                if update_fields is not None:
+                    kwargs["update_fields"] = {*update_fields, "search_text"}
+            self._search_values = search_values
+        super().save(*args, **kwargs)
+
+    def refresh_search_text(self):
+        from tasks.search import get_task_search_text
+
+        if Task.project_id.is_cached(self):
+            project_type = self.project_id.project_type
+        else:
+            project_type = (
+                Project.objects.filter(pk=self.project_id_id)
+                .values_list("project_type", flat=True)
+                .first()
+            )
+        self.search_text = get_task_search_text(self.data, project_type)
 
     def assign(self, annotators):
         """
@@ -200,6 +248,72 @@ class Task(models.Model):
         return str(self.id)
 
 
+@receiver(post_init, sender=Task)
+def track_task_search_values(sender, instance, **kwargs):
+    # Searchable values of the data as loaded, to tell in save whether the
+    # search text is out of date. New tasks always get one.
+    if instance.pk is None or "data" not in instance.__dict__:
+        instance._search_values = None
+    else:
+        instance._search_values = get_search_values(instance.data)
+
+
+# Fields of a task which decide the work queues it belongs to
+TASK_QUEUE_FIELDS = ("task_status", "review_user_id", "super_check_user_id")
+
+
+def get_task_queue_fields(task):
+    """
+    Work queue fields of the task from its loaded fields, None if any of them
+    is deferred
+    """
+    if any(field not in task.__dict__ for field in TASK_QUEUE_FIELDS):
+        return None
+    return tuple(task.__dict__[field] for field in TASK_QUEUE_FIELDS)
+
+
+@receiver(post_init, sender=Task)
+def track_task_queue_fields(sender, instance, **kwargs):
+    # Work queue fields as loaded, saves which don't change them don't push
+    # the task. New tasks are always pushed.
+    instance._queue_fields = (
+        get_task_queue_fields(instance) if instance.pk is not None else None
+    )
+
+
+@receiver(post_save, sender=Task)
+def push_task_to_work_queues(sender, instance, update_fields=None, **kwargs):
+    from projects.task_queue import get_task_queue_entries, push_task
+
+    queue_fields = get_task_queue_fields(instance)
+    old_queue_fields = getattr(instance, "_queue_fields", None)
+    instance._queue_fields = queue_fields
+    if update_fields is not None and not {
+        "task_status",
+        "review_user",
+        "review_user_id",
+        "super_check_user",
+        "super_check_user_id",
+    }.intersection(update_fields):
+        return
+    if old_queue_fields is not None and old_queue_fields == queue_fields:
+        return
+    for user_id, mode in get_task_queue_entries(instance):
+        push_task(instance.project_id_id, user_id, mode, instance.id)
+
+
+@receiver(m2m_changed, sender=Task.annotation_users.through)
+def push_assigned_task_to_work_queues(sender, instance, action, pk_set, **kwargs):
+    from projects.task_queue import ANNOTATION_MODE, push_task
+
+    if action != "post_add" or not isinstance(instance, Task):
+        return
+    if instance.task_status != INCOMPLETE:
+        return
+    for user_id in pk_set:
+        push_task(instance.project_id_id, user_id, ANNOTATION_MODE, instance.id)
+
+
 class Annotation(models.Model):
     """
     Annotation Model
@@ -271,6 +385,217 @@ class Annotation(models.Model):
         )
 
 
+class AnnotationStats(models.Model):
+    """
+    Daily rollup of the annotations of a user in a project, for every
+    annotation type and status. The analytics reports sum these buckets
+    instead of scanning the annotations.
+    """
+
+    completed_by = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        verbose_name="annotation_stats_completed_by",
+        related_name="annotation_stats",
+    )
+    project = models.ForeignKey(
+        Project,
+        on_delete=models.CASCADE,
+        verbose_name="annotation_stats_project",
+        related_name="annotation_stats",
+    )
+    annotation_type = models.PositiveSmallIntegerField(choices=ANNOTATION_TYPE)
+    annotation_status = models.CharField(choices=ANNOTATION_STATUS, max_length=100)
+    day = models.DateField(verbose_name="annotation_stats_day")
+    annotations_count = models.PositiveIntegerField(default=0)
+    lead_time = models.FloatField(default=0.0, verbose_name="total_lead_time")
+    word_count = models.PositiveIntegerField(default=0)
+    audio_duration = models.FloatField(
+        default=0.0, help_text=("Total duration of the annotated audio segments")
+    )
+    raw_audio_duration = models.FloatField(
+        default=0.0, help_text=("Total duration of the audio of the tasks")
+    )
+    audio_segments_count = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.completed_by_id} - {self.project_id} - {self.day}"
+
+    class Meta:
+        unique_together = (
+            "completed_by",
+            "project",
+            "annotation_type",
+            "annotation_status",
+            "day",
+        )
+
+
+# Fields of an annotation which select its AnnotationStats bucket
+STATS_BUCKET_FIELDS = (
+    "completed_by_id",
+    "annotation_type",
+    "annotation_status",
+    "updated_at",
+)
+
+
+def get_stats_bucket(annotation):
+    """
+    Stats bucket of the annotation from its loaded fields, None if any of them
+    is deferred
+    """
+    if any(field not in annotation.__dict__ for field in STATS_BUCKET_FIELDS):
+        return None
+    return tuple(annotation.__dict__[field] for field in STATS_BUCKET_FIELDS)
+
+
+@receiver(post_init, sender=Annotation)
+def track_annotation_stats_bucket(sender, instance, **kwargs):
+    # The bucket the annotation was loaded in, which has to be refreshed too
+    # if a save moves the annotation out of it
+    instance._old_stats_bucket = (
+        get_stats_bucket(instance) if instance.pk is not None else None
+    )
+
+
+@receiver(post_save, sender=Annotation)
+def update_annotation_stats_on_save(sender, instance, **kwargs):
+    from tasks.annotation_stats import schedule_annotation_stats_refresh
+
+    bucket = get_stats_bucket(instance)
+    buckets = [bucket] if bucket is not None else []
+    old_bucket = getattr(instance, "_old_stats_bucket", None)
+    if old_bucket is not None and old_bucket != bucket:
+        buckets.append(old_bucket)
+    schedule_annotation_stats_refresh(buckets)
+    instance._old_stats_bucket = bucket
+
+
+@receiver(post_save, sender=Annotation)
+def update_project_membership_on_save(sender, instance, update_fields=None, **kwargs):
+    from projects.memberships import record_project_work
+
+    # Saves which don't write updated_at don't move the last work
+    if update_fields is not None and "updated_at" not in update_fields:
+        return
+    if Annotation.task.is_cached(instance):
+        project_id = instance.task.project_id_id
+    else:
+        project_id = (
+            Task.objects.filter(pk=instance.task_id)
+            .values_list("project_id", flat=True)
+            .first()
+        )
+    record_project_work(instance.completed_by_id, project_id, instance.updated_at)
+
+
+@receiver(post_delete, sender=Annotation)
+def update_annotation_stats_on_delete(sender, instance, **kwargs):
+    from tasks.annotation_stats import schedule_annotation_stats_refresh
+
+    schedule_annotation_stats_refresh(
+        [
+            (
+                instance.completed_by_id,
+                instance.annotation_type,
+                instance.annotation_status,
+                instance.updated_at,
+            )
+        ]
+    )
+
+
+class CeleryTaskEvent(models.Model):
+    """
+    State and timestamps of a celery task, recorded from the celery signals
+    by tasks.celery_task_events
+    """
+
+    task_id = models.CharField(max_length=255, unique=True, verbose_name="task_id")
+    name = models.CharField(max_length=255, verbose_name="task_name")
+    state = models.CharField(max_length=50, verbose_name="task_state")
+    args = models.TextField(blank=True, default="")
+    kwargs = models.TextField(blank=True, default="")
+    args_digest = models.CharField(
+        max_length=64,
+        blank=True,
+        default="",
+        help_text=("SHA-256 of the arguments of the task"),
+    )
+    # Not a foreign key, tasks are also queued for users which are deleted
+    # before the task runs
+    user_id = models.PositiveIntegerField(
+        null=True, blank=True, verbose_name="task_user_id"
+    )
+    worker = models.CharField(max_length=255, blank=True, default="")
+    retries = models.PositiveIntegerField(default=0)
+    result = models.TextField(blank=True, default="")
+    exception = models.TextField(blank=True, default="")
+    traceback = models.TextField(blank=True, default="")
+    received = models.DateTimeField(null=True, blank=True)
+    started = models.DateTimeField(null=True, blank=True)
+    succeeded = models.DateTimeField(null=True, blank=True)
+    failed = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.name} - {self.task_id} - {self.state}"
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["state", "-id"], name="celery_task_event_state_idx"),
+            models.Index(fields=["name", "-id"], name="celery_task_event_name_idx"),
+            models.Index(fields=["updated_at"], name="celery_task_event_updated_idx"),
+        ]
+
+
+class AsyncJob(models.Model):
+    """
+    Celery task run on a project or a dataset instance, recorded from the
+    celery signals by tasks.async_jobs to find the latest run of a task on
+    its target
+    """
+
+    task_id = models.CharField(max_length=255, unique=True, verbose_name="task_id")
+    task_name = models.CharField(max_length=255, verbose_name="task_name")
+    project = models.ForeignKey(
+        Project,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name="async_jobs",
+        verbose_name="async_job_project",
+    )
+    dataset_instance = models.ForeignKey(
+        DatasetInstance,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name="async_jobs",
+        verbose_name="async_job_dataset_instance",
+    )
+    status = models.CharField(max_length=50, verbose_name="task_status")
+    date_done = models.DateTimeField(
+        default=now, help_text=("Time of the last change of the status")
+    )
+
+    def __str__(self):
+        return f"{self.task_name} - {self.task_id} - {self.status}"
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["project", "task_name", "-id"], name="async_job_project_idx"
+            ),
+            models.Index(
+                fields=["dataset_instance", "task_name", "-id"],
+                name="async_job_dataset_idx",
+            ),
+            models.Index(fields=["status", "date_done"], name="async_job_status_idx"),
+        ]
+
+
 class Prediction(models.Model):
     """ML predictions"""
 
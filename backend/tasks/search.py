@@ -0,0 +1,107 @@
+from functools import lru_cache
+
+from django.apps import apps
+from django.core.exceptions import FieldDoesNotExist
+from django.db import models
+
+from projects.registry_helper import ProjectRegistry
+from utils.search import (
+    build_search_text,
+    extract_search_params,
+    flatten,
+    process_search_query,
+)
+from .models import Task
+
+"""
+Task search
+
+The searchable fields of the data of a task are copied into Task.search_text
+when the task is created, and again by Task.save when its data changes. Bulk
+updates of the data have to set it themselves. A trigram index serves the
+substring searches of the search_* query params. The searchable fields of a
+project type are the task data fields which come from its input dataset in
+the project registry, except the JSON fields of the datasets, whose lists
+and dictionaries are searched with icontains on the task data.
+"""
+
+# Fields of the task dictionaries returned by the task listings, the search
+# text is only used to filter the tasks
+TASK_VALUES_FIELDS = [
+    field.attname for field in Task._meta.concrete_fields if field.name != "search_text"
+]
+
+
+def is_json_field(dataset_type, field):
+    try:
+        model_field = apps.get_model("dataset", dataset_type)._meta.get_field(field)
+    except (LookupError, FieldDoesNotExist):
+        return False
+    return isinstance(model_field, models.JSONField)
+
+
+@lru_cache(maxsize=None)
+def get_search_fields(project_type):
+    """
+    Task data fields of a project type kept in Task.search_text: the fields of
+    the input dataset, renamed as they are copied into the task, and the
+    variable parameters of the output dataset, leaving out the JSON fields
+    """
+    registry = ProjectRegistry.get_instance()
+    try:
+        input_dataset_info = registry.get_input_dataset_and_fields(project_type)
+    except KeyError:
+        # The collection project types have no input dataset
+        input_dataset_info = {}
+    output_dataset_info = registry.get_output_dataset_and_fields(project_type)
+    output_fields = output_dataset_info.get("fields") or {}
+    if not isinstance(output_fields, dict):
+        output_fields = {}
+    copy_from_input = output_fields.get("copy_from_input") or {}
+
+    input_dataset_type = input_dataset_info.get("dataset_type")
+    parent_dataset_type = input_dataset_info.get("parent_class")
+    output_dataset_type = output_dataset_info.get("dataset_type")
+    fields = [
+        copy_from_input.get(field, field)
+        for field in input_dataset_info.get("fields", [])
+        if not is_json_field(input_dataset_type, field)
+    ]
+    fields += [
+        task_field
+        for field, task_field in (
+            input_dataset_info.get("copy_from_parent") or {}
+        ).items()
+        if not is_json_field(parent_dataset_type, field)
+    ]
+    fields += [
+        field
+        for field in output_fields.get("variable_parameters") or []
+        if not is_json_field(output_dataset_type, field)
+    ]
+    return tuple(sorted(set(fields)))
+
+
+def get_task_search_text(data, project_type):
+    return build_search_text(data or {}, get_search_fields(project_type))
+
+
+def process_task_search_query(query_dict, project_type):
+    """
+    Filters of the tasks of a project type for the search_* query params.
+
+    Params on fields of Task filter the field, the other ones search the
+    task data, through the trigram index of Task.search_text for the
+    searchable fields of the project type and with icontains on the task
+    data for the JSON fields.
+    """
+    search_fields = get_search_fields(project_type)
+    task_fields = {field.name for field in Task._meta.get_fields()}
+    searchable_fields = [
+        field
+        for field in flatten(extract_search_params(query_dict))
+        if field in search_fields or field.split("__")[0] not in task_fields
+    ]
+    return process_search_query(
+        query_dict, "data", searchable_fields, "search_text", search_fields
+    )
@@ -6,7 +6,7 @@ from tasks.models import Task, Annotation, Prediction
 class TaskSerializer(serializers.ModelSerializer):
     class Meta:
         model = Task
-        fields = "__all__"
+        exclude = ("search_text",)
 
 
 class AnnotationSerializer(serializers.ModelSerializer):
@@ -32,4 +32,4 @@ class TaskAnnotationSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Task
-        fields = "__all__"
+        exclude = ("search_text",)
@@ -0,0 +1,146 @@
+import hashlib
+import json
+
+import redis
+from django.conf import settings
+from django.db.models import Q
+
+from projects.utils import get_audio_project_types, get_ocr_project_types
+from utils.redis_connection import get_redis_connection
+from .search import TASK_VALUES_FIELDS
+
+"""
+Task listings of the managerial views of TaskViewSet.list
+
+Every row is an annotation of a listed task, with the fields of its task,
+its status and the email of its user, read with one query ordered by task
+and annotation id. Pages are read either by number or after a cursor,
+"<task id>:<annotation id>" of the last row of the previous page, which
+doesn't depend on the position of the page. The total count is cached in
+redis for TASK_LIST_COUNT_TTL seconds, a page by number is available when
+it has rows and the last page corrects the count.
+"""
+
+PAGINATION_PARAMS = ("page", "records", "cursor")
+
+DEFAULT_PAGE_SIZE = 10
+
+
+def get_count_cache_key(project_id, status_key, query_params):
+    params = sorted(
+        (key, value)
+        for key, value in query_params.items()
+        if key not in PAGINATION_PARAMS
+    )
+    digest = hashlib.sha256(json.dumps([status_key, params]).encode()).hexdigest()
+    return f"task_list_count:{project_id}:{digest}"
+
+
+def get_cached_count(rows, cache_key):
+    """
+    Count of the rows, cached for TASK_LIST_COUNT_TTL seconds
+    """
+    try:
+        count = get_redis_connection().get(cache_key)
+        if count is not None:
+            return int(count)
+    except redis.RedisError as e:
+        print(f"Unable to read the cached task count. Error: {e}")
+    count = rows.count()
+    try:
+        get_redis_connection().set(cache_key, count, ex=settings.TASK_LIST_COUNT_TTL)
+    except redis.RedisError as e:
+        print(f"Unable to cache the task count. Error: {e}")
+    return count
+
+
+def parse_cursor(cursor):
+    task_id, annotation_id = cursor.split(":")
+    return int(task_id), int(annotation_id)
+
+
+def get_cursor(row):
+    return f"{row['task_id']}:{row['id']}"
+
+
+def remove_media_urls(task_dicts, project_type):
+    if project_type in get_audio_project_types():
+        for task_dict in task_dicts:
+            if task_dict["data"]:
+                task_dict["data"].pop("audio_url", None)
+    elif project_type in get_ocr_project_types():
+        for task_dict in task_dicts:
+            if task_dict["data"]:
+                task_dict["data"].pop("image_url", None)
+
+
+def list_annotation_tasks(annotations, tasks, status_key, project, query_params):
+    """
+    List the annotations of the given tasks with the fields of their tasks.
+
+    Args:
+        annotations (QuerySet): Annotations to list.
+        tasks (QuerySet): Tasks whose annotations are listed.
+        status_key (str): Key of the annotation status in the task dictionaries.
+        project (Project): Project of the tasks.
+        query_params (QueryDict): Query params of the request, the rows are
+            paginated with "records" rows per page when "page" or "cursor"
+            is passed.
+
+    Returns:
+        dict: The total count, the task dictionaries and, when a cursor is
+            passed, the cursor of the next page (None on the last page).
+
+    Raises:
+        ValueError: The page or the cursor is not valid.
+    """
+    rows = annotations.filter(task__in=tasks).order_by("task_id", "id")
+    task_fields = {f"task__{field}": field for field in TASK_VALUES_FIELDS}
+    values = rows.values(
+        "id", "task_id", "annotation_status", "completed_by__email", *task_fields
+    )
+
+    def to_task_dict(row):
+        task_dict = {field: row[key] for key, field in task_fields.items()}
+        task_dict[status_key] = row["annotation_status"]
+        task_dict["user_mail"] = row["completed_by__email"]
+        return task_dict
+
+    if "page" not in query_params and "cursor" not in query_params:
+        task_dicts = [to_task_dict(row) for row in values]
+        return {"total_count": len(task_dicts), "result": task_dicts}
+
+    records = int(query_params.get("records", DEFAULT_PAGE_SIZE))
+    if records < 1:
+        raise ValueError(f"Invalid number of records: {records}")
+    total_count = get_cached_count(
+        rows, get_count_cache_key(project.id, status_key, query_params)
+    )
+    final_dict = {"total_count": total_count}
+    if "cursor" in query_params:
+        task_id, annotation_id = parse_cursor(query_params["cursor"])
+        page = list(
+            values.filter(
+                Q(task_id__gt=task_id) | Q(task_id=task_id, id__gt=annotation_id)
+            )[:records]
+        )
+        final_dict["next_cursor"] = (
+            get_cursor(page[-1]) if len(page) == records else None
+        )
+    else:
+        page_number = int(query_params["page"])
+        if page_number < 1:
+            raise ValueError(f"Page {page_number} is not available")
+        offset = (page_number - 1) * records
+        page = list(values[offset : offset + records])
+        # The cached count may be stale, whether the page exists is decided by
+        # the rows read
+        if not page and page_number > 1:
+            raise ValueError(f"Page {page_number} is not available")
+        if len(page) < records:
+            final_dict["total_count"] = offset + len(page)
+
+    task_dicts = [to_task_dict(row) for row in page]
+    remove_media_urls(task_dicts, project.project_type)
+    final_dict["result"] = task_dicts
+    return final_dict
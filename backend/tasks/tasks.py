@@ -0,0 +1,44 @@
+import datetime
+
+from celery import shared_task
+from django.conf import settings
+from django.utils import timezone
+
+from .annotation_stats import drain_annotation_stats_buckets, rebuild_annotation_stats
+from .models import CeleryTaskEvent
+
+
+@shared_task(name="refresh_annotation_stats")
+def refresh_annotation_stats_task():
+    """Recompute the daily annotation rollups of the buckets marked dirty since
+    the last run"""
+    drain_annotation_stats_buckets()
+
+
+@shared_task(name="rebuild_annotation_stats")
+def rebuild_annotation_stats_task(start_day=None, end_day=None):
+    """Recompute the daily annotation rollups of a date range, the previous two
+    days by default, to pick up the annotations written without signals
+
+    Args:
+        start_day (str, optional): ISO formatted first day of the range.
+        end_day (str, optional): ISO formatted last day of the range.
+    """
+    today = datetime.datetime.now(datetime.timezone.utc).date()
+    start_day = (
+        datetime.date.fromisoformat(start_day)
+        if start_day
+        else today - datetime.timedelta(days=2)
+    )
+    end_day = datetime.date.fromisoformat(end_day) if end_day else today
+    rebuild_annotation_stats(start_day, end_day)
+
+
+@shared_task(name="purge_celery_task_events")
+def purge_celery_task_events_task():
+    """Remove the celery task events which were last updated before the
+    retention period"""
+    CeleryTaskEvent.objects.filter(
+        updated_at__lt=timezone.now()
+        - datetime.timedelta(days=settings.CELERY_TASK_EVENTS_RETENTION_DAYS)
+    ).delete()
@@ -1,3 +1,386 @@
-from django.test import TestCase
+import datetime
+import json
+from unittest import mock
 
-# Create your tests here.
+from django.test import RequestFactory, TestCase
+from django.utils import timezone
+
+from projects.models import Project
+from tasks.annotation_stats import (
+    drain_annotation_stats_buckets,
+    get_annotation_stats,
+    rebuild_annotation_stats,
+    refresh_annotation_stats,
+    schedule_annotation_stats_refresh,
+    DIRTY_BUCKETS_KEY,
+)
+from tasks.celery_task_events import update_task_event
+from tasks.models import (
+    Annotation,
+    AnnotationStats,
+    CeleryTaskEvent,
+    Task,
+    ACCEPTED,
+    ANNOTATED,
+    ANNOTATOR_ANNOTATION,
+    LABELED,
+    SKIPPED,
+)
+from tasks.search import get_search_fields, process_task_search_query
+from tasks.task_listing import list_annotation_tasks
+from tasks.views import get_celery_tasks
+from users.models import User
+
+DAY = datetime.date(2023, 5, 10)
+
+
+def at(day, hour):
+    return datetime.datetime.combine(
+        day, datetime.time(hour), tzinfo=datetime.timezone.utc
+    )
+
+
+class AnnotationStatsTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email="annotator@shoonya.org", username="annotator"
+        )
+        self.project = Project.objects.create(
+            title="Annotation stats",
+            project_type="ContextualTranslationEditing",
+            project_mode="Annotation",
+        )
+
+    def create_annotation(self, updated_at, word_count, lead_time, status=LABELED):
+        task = Task.objects.create(
+            project_id=self.project, data={"word_count": word_count}
+        )
+        # bulk_create doesn't send post_save, the rollups are refreshed by the
+        # tests themselves
+        (annotation,) = Annotation.objects.bulk_create(
+            [
+                Annotation(
+                    result=[],
+                    task=task,
+                    completed_by=self.user,
+                    annotation_status=status,
+                    annotation_type=ANNOTATOR_ANNOTATION,
+                    lead_time=lead_time,
+                )
+            ]
+        )
+        Annotation.objects.filter(id=annotation.id).update(updated_at=updated_at)
+        return annotation
+
+    def get_stats(self, status=LABELED, day=DAY):
+        return AnnotationStats.objects.get(
+            completed_by=self.user,
+            project=self.project,
+            annotation_type=ANNOTATOR_ANNOTATION,
+            annotation_status=status,
+            day=day,
+        )
+
+    def test_refresh_sums_the_annotations_of_a_bucket(self):
+        self.create_annotation(at(DAY, 9), word_count=5, lead_time=2.0)
+        self.create_annotation(at(DAY, 17), word_count=7, lead_time=3.5)
+        self.create_annotation(
+            at(DAY, 10), word_count=11, lead_time=1.0, status=SKIPPED
+        )
+
+        refresh_annotation_stats([(self.user.id, ANNOTATOR_ANNOTATION, LABELED, DAY)])
+
+        stats = self.get_stats()
+        self.assertEqual(stats.annotations_count, 2)
+        self.assertEqual(stats.lead_time, 5.5)
+        self.assertEqual(stats.word_count, 12)
+        self.assertFalse(
+            AnnotationStats.objects.filter(annotation_status=SKIPPED).exists()
+        )
+
+    def test_refresh_removes_emptied_buckets(self):
+        annotation = self.create_annotation(at(DAY, 9), word_count=5, lead_time=2.0)
+        refresh_annotation_stats([(self.user.id, ANNOTATOR_ANNOTATION, LABELED, DAY)])
+
+        Annotation.objects.filter(id=annotation.id).update(annotation_status=ACCEPTED)
+        refresh_annotation_stats(
+            [
+                (self.user.id, ANNOTATOR_ANNOTATION, LABELED, DAY),
+                (self.user.id, ANNOTATOR_ANNOTATION, ACCEPTED, DAY),
+            ]
+        )
+
+        self.assertFalse(
+            AnnotationStats.objects.filter(annotation_status=LABELED).exists()
+        )
+        self.assertEqual(self.get_stats(status=ACCEPTED).word_count, 5)
+
+    def test_rebuild_matches_refresh(self):
+        next_day = DAY + datetime.timedelta(days=1)
+        self.create_annotation(at(DAY, 9), word_count=5, lead_time=2.0)
+        self.create_annotation(at(next_day, 9), word_count=7, lead_time=3.0)
+
+        rebuild_annotation_stats(DAY, next_day)
+        rebuilt = list(
+            AnnotationStats.objects.order_by("day").values_list(
+                "day", "annotations_count", "lead_time", "word_count"
+            )
+        )
+        refresh_annotation_stats(
+            [
+                (self.user.id, ANNOTATOR_ANNOTATION, LABELED, DAY),
+                (self.user.id, ANNOTATOR_ANNOTATION, LABELED, next_day),
+            ]
+        )
+        refreshed = list(
+            AnnotationStats.objects.order_by("day").values_list(
+                "day", "annotations_count", "lead_time", "word_count"
+            )
+        )
+
+        self.assertEqual(rebuilt, [(DAY, 1, 2.0, 5), (next_day, 1, 3.0, 7)])
+        self.assertEqual(refreshed, rebuilt)
+
+    def test_partial_days_are_read_from_the_annotations(self):
+        days = [DAY + datetime.timedelta(days=i) for i in range(3)]
+        for i, day in enumerate(days):
+            self.create_annotation(at(day, 12), word_count=i + 1, lead_time=1.0)
+        rebuild_annotation_stats(days[0], days[-1])
+
+        def get_word_count(start_date, end_date):
+            return get_annotation_stats(
+                [self.project.id],
+                self.user.id,
+                ANNOTATOR_ANNOTATION,
+                [LABELED],
+                start_date,
+                end_date,
+            )["word_count"]
+
+        self.assertEqual(get_word_count(at(days[0], 18), at(days[2], 6)), 2)
+        self.assertEqual(get_word_count(at(days[0], 6), at(days[2], 18)), 6)
+        self.assertEqual(get_word_count(at(days[0], 11), at(days[0], 13)), 1)
+        self.assertEqual(
+            get_word_count(
+                at(days[0], 0),
+                datetime.datetime.combine(
+                    days[2], datetime.time.max, tzinfo=datetime.timezone.utc
+                ),
+            ),
+            6,
+        )
+
+    def test_save_refreshes_the_old_and_the_new_bucket(self):
+        annotation = self.create_annotation(at(DAY, 9), word_count=5, lead_time=2.0)
+        annotation = Annotation.objects.get(id=annotation.id)
+
+        annotation.annotation_status = ACCEPTED
+        with mock.patch(
+            "tasks.annotation_stats.schedule_annotation_stats_refresh"
+        ) as schedule_refresh:
+            annotation.save()
+
+        (buckets,), _ = schedule_refresh.call_args
+        self.assertEqual(
+            set(bucket[:3] for bucket in buckets),
+            {
+                (self.user.id, ANNOTATOR_ANNOTATION, ACCEPTED),
+                (self.user.id, ANNOTATOR_ANNOTATION, LABELED),
+            },
+        )
+        self.assertIn(at(DAY, 9), [bucket[3] for bucket in buckets])
+
+    def test_deferred_bucket_fields_are_not_loaded(self):
+        annotation = self.create_annotation(at(DAY, 9), word_count=5, lead_time=2.0)
+
+        with self.assertNumQueries(1):
+            annotation = Annotation.objects.only("id").get(id=annotation.id)
+
+        self.assertIsNone(annotation._old_stats_bucket)
+
+    @mock.patch("tasks.annotation_stats.get_redis_connection")
+    def test_buckets_are_marked_dirty_once_on_commit(self, get_redis_connection):
+        bucket = (self.user.id, ANNOTATOR_ANNOTATION, LABELED, at(DAY, 9))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            schedule_annotation_stats_refresh([bucket, bucket[:3] + (at(DAY, 17),)])
+            get_redis_connection().sadd.assert_not_called()
+
+        get_redis_connection().sadd.assert_called_once_with(
+            DIRTY_BUCKETS_KEY,
+            json.dumps([self.user.id, ANNOTATOR_ANNOTATION, LABELED, DAY.isoformat()]),
+        )
+
+    @mock.patch("tasks.annotation_stats.get_redis_connection")
+    def test_drain_refreshes_the_dirty_buckets(self, get_redis_connection):
+        self.create_annotation(at(DAY, 9), word_count=5, lead_time=2.0)
+        member = json.dumps(
+            [self.user.id, ANNOTATOR_ANNOTATION, LABELED, DAY.isoformat()]
+        )
+        get_redis_connection().spop.side_effect = [[member], []]
+
+        drain_annotation_stats_buckets()
+
+        self.assertEqual(self.get_stats().word_count, 5)
+
+    @mock.patch("tasks.annotation_stats.get_redis_connection")
+    def test_drain_marks_failed_buckets_dirty_again(self, get_redis_connection):
+        member = json.dumps(
+            [self.user.id, ANNOTATOR_ANNOTATION, LABELED, DAY.isoformat()]
+        )
+        get_redis_connection().spop.side_effect = [[member], []]
+
+        with mock.patch(
+            "tasks.annotation_stats.refresh_annotation_stats", side_effect=ValueError
+        ):
+            with self.assertRaises(ValueError):
+                drain_annotation_stats_buckets()
+
+        get_redis_connection().sadd.assert_called_once_with(DIRTY_BUCKETS_KEY, member)
+
+
+class TaskSearchTextTests(TestCase):
+    def setUp(self):
+        self.project = Project.objects.create(
+            title="Task search",
+            project_type="ContextualTranslationEditing",
+            project_mode="Annotation",
+        )
+        self.task = Task.objects.create(
+            project_id=self.project,
+            data={"input_text": "first text", "word_count": 2},
+        )
+
+    def test_created_tasks_get_a_search_text(self):
+        self.assertIn("first text", self.task.search_text)
+
+    def test_data_changes_rewrite_the_search_text(self):
+        task = Task.objects.get(id=self.task.id)
+        task.data["input_text"] = "second text"
+        task.save()
+
+        task.refresh_from_db()
+        self.assertIn("second text", task.search_text)
+        self.assertNotIn("first text", task.search_text)
+
+    def test_data_changes_saved_with_update_fields_rewrite_the_search_text(self):
+        task = Task.objects.get(id=self.task.id)
+        task.data["input_text"] = "second text"
+        task.save(update_fields=["data"])
+
+        task.refresh_from_db()
+        self.assertIn("second text", task.search_text)
+
+    def test_saves_without_data_changes_keep_the_search_text(self):
+        task = Task.objects.get(id=self.task.id)
+        task.task_status = ANNOTATED
+
+        # The update only, the project type isn't read
+        with self.assertNumQueries(1):
+            task.save(update_fields=["task_status"])
+        with self.assertNumQueries(1):
+            task.save()
+
+    def test_conversation_fields_are_searched_on_the_task_data(self):
+        project = Project.objects.create(
+            title="Conversation search",
+            project_type="ConversationTranslation",
+            project_mode="Annotation",
+        )
+        task = Task.objects.create(
+            project_id=project,
+            data={
+                "domain": "travel",
+                "speakers_json": [{"name": "Asha", "gender": "female"}],
+            },
+        )
+        Task.objects.create(
+            project_id=project,
+            data={"domain": "travel", "speakers_json": [{"name": "Ravi"}]},
+        )
+
+        self.assertNotIn("speakers_json", get_search_fields(project.project_type))
+        filters = process_task_search_query(
+            {"search_speakers_json": "asha", "search_domain": "trav"},
+            project.project_type,
+        )
+        self.assertEqual(
+            list(Task.objects.filter(project_id=project, **filters)), [task]
+        )
+
+
+class TaskListingTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email="annotator@shoonya.org", username="annotator"
+        )
+        self.project = Project.objects.create(
+            title="Task listing",
+            project_type="ContextualTranslationEditing",
+            project_mode="Annotation",
+        )
+        tasks = [Task.objects.create(project_id=self.project) for _ in range(3)]
+        Annotation.objects.bulk_create(
+            [
+                Annotation(
+                    result=[],
+                    task=task,
+                    completed_by=self.user,
+                    annotation_type=ANNOTATOR_ANNOTATION,
+                )
+                for task in tasks
+            ]
+        )
+
+    def list_page(self, page):
+        return list_annotation_tasks(
+            Annotation.objects.all(),
+            Task.objects.filter(project_id=self.project),
+            "annotation_status",
+            self.project,
+            {"page": page, "records": 2},
+        )
+
+    # A count cached before the tasks were created
+    @mock.patch("tasks.task_listing.get_cached_count", return_value=0)
+    def test_pages_with_rows_are_available_with_a_stale_count(self, _):
+        self.assertEqual(len(self.list_page(1)["result"]), 2)
+
+        last_page = self.list_page(2)
+        self.assertEqual(len(last_page["result"]), 1)
+        self.assertEqual(last_page["total_count"], 3)
+
+    @mock.patch("tasks.task_listing.get_cached_count", return_value=10)
+    def test_pages_without_rows_are_not_available(self, _):
+        with self.assertRaises(ValueError):
+            self.list_page(3)
+        with self.assertRaises(ValueError):
+            self.list_page(0)
+
+
+class CeleryTaskEventTests(TestCase):
+    def setUp(self):
+        self.event = CeleryTaskEvent.objects.create(
+            task_id="task-1", name="projects.tasks.export_project_in_place"
+        )
+        CeleryTaskEvent.objects.filter(id=self.event.id).update(
+            updated_at=timezone.now() - datetime.timedelta(days=60)
+        )
+
+    def test_state_changes_move_updated_at(self):
+        update_task_event(self.event.task_id, self.event.name, state="STARTED")
+
+        self.event.refresh_from_db()
+        self.assertEqual(self.event.state, "STARTED")
+        self.assertGreater(
+            self.event.updated_at, timezone.now() - datetime.timedelta(minutes=1)
+        )
+
+    def test_page_sizes_below_one_are_rejected(self):
+        for page_size in ("0", "-1", "ten"):
+            response = get_celery_tasks(
+                RequestFactory().get(
+                    "/tasks/get_celery_tasks/", {"page_size": page_size}
+                )
+            )
+            self.assertEqual(response.status_code, 400)
@@ -7,14 +7,12 @@ import requests
 from django.http import JsonResponse
 from requests.exceptions import RequestException
 from dotenv import load_dotenv
-from tasks.utils import Queued_Task_name
 from django.utils import timezone
 from django.core.paginator import Paginator, EmptyPage, PageNotAnInteger
 import json
 
 from django.core.exceptions import ObjectDoesNotExist
 from django.http import StreamingHttpResponse, FileResponse
-from utils.pagination import paginate_queryset
 from rest_framework import viewsets
 from rest_framework import mixins
 from rest_framework import status
@@ -33,7 +31,7 @@ from tasks.serializers import (
     PredictionSerializer,
     TaskAnnotationSerializer,
 )
-from tasks.utils import query_flower
+from tasks.celery_task_events import serialize_task_event
 from notifications.views import createNotification
 from notifications.utils import get_userids_from_project_id
 
@@ -44,13 +42,13 @@ from utils.convert_result_to_chitralekha_format import (
     convert_result_to_chitralekha_format,
 )
 
-from utils.search import process_search_query
+from tasks.search import TASK_VALUES_FIELDS, process_task_search_query
+from tasks.task_listing import list_annotation_tasks
 
 from drf_yasg import openapi
 from drf_yasg.utils import swagger_auto_schema
 
-from rapidfuzz.distance import Levenshtein
-import sacrebleu
+from utils.sentence_scores import bleu_score, normalized_edit_distance
 
 from utils.date_time_conversions import utc_to_ist
 
@@ -239,63 +237,24 @@ class TaskViewSet(viewsets.ModelViewSet, mixins.ListModelMixin):
                             tasks = Task.objects.filter(annotations__in=ann)
                         tasks = tasks.distinct()
                         # Handle search query (if any)
-                        if len(tasks):
-                            tasks = tasks.filter(
-                                **process_search_query(
-                                    request.GET, "data", list(tasks.first().data.keys())
-                                )
+                        tasks = tasks.filter(
+                            **process_task_search_query(
+                                request.GET, proj_objs[0].project_type
+                            )
+                        )
+                        try:
+                            final_dict = list_annotation_tasks(
+                                ann,
+                                tasks,
+                                "annotation_status",
+                                proj_objs[0],
+                                request.query_params,
+                            )
+                        except ValueError:
+                            return Response(
+                                {"message": "page not available"},
+                                status=status.HTTP_400_BAD_REQUEST,
                             )
-                        ann_filter1 = ann.filter(task__in=tasks).order_by("id")
-
-                        task_objs = []
-                        for an in ann_filter1:
-                            task_obj = {}
-                            task_obj["id"] = an.task_id
-                            task_obj["annotation_status"] = an.annotation_status
-                            task_obj["user_mail"] = an.completed_by.email
-                            task_objs.append(task_obj)
-                        task_objs.sort(key=lambda x: x["id"])
-                        final_dict = {}
-                        ordered_tasks = []
-                        for task_obj in task_objs:
-                            tas = Task.objects.filter(id=task_obj["id"])
-                            tas = tas.values()[0]
-                            tas["annotation_status"] = task_obj["annotation_status"]
-                            tas["user_mail"] = task_obj["user_mail"]
-                            ordered_tasks.append(tas)
-                        if page_number is not None:
-                            page_object = Paginator(ordered_tasks, records)
-                            try:
-                                final_dict["total_count"] = len(ordered_tasks)
-                                page_items = page_object.page(page_number)
-                                ordered_tasks = page_items.object_list
-                                if (
-                                    proj_objs[0].project_type
-                                    in get_audio_project_types()
-                                ):
-                                    for tas in ordered_tasks:
-                                        data = tas["data"]
-                                        if "audio_url" in tas["data"]:
-                                            del data["audio_url"]
-                                        tas["data"] = data
-                                elif (
-                                    proj_objs[0].project_type in get_ocr_project_types()
-                                ):
-                                    for tas in ordered_tasks:
-                                        data = tas["data"]
-                                        if "image_url" in tas["data"]:
-                                            del data["image_url"]
-                                        tas["data"] = data
-                                final_dict["result"] = ordered_tasks
-                                return Response(final_dict)
-                            except:
-                                return Response(
-                                    {"message": "page not available"},
-                                    status=status.HTTP_400_BAD_REQUEST,
-                                )
-
-                        final_dict["total_count"] = len(ordered_tasks)
-                        final_dict["result"] = ordered_tasks
                         return Response(final_dict)
                 ann = Annotation.objects.filter(
                     task__project_id_id=proj_id,
@@ -315,12 +274,9 @@ class TaskViewSet(viewsets.ModelViewSet, mixins.ListModelMixin):
                     tasks = Task.objects.filter(annotations__in=ann)
                 tasks = tasks.distinct()
                 # Handle search query (if any)
-                if len(tasks):
-                    tasks = tasks.filter(
-                        **process_search_query(
-                            request.GET, "data", list(tasks.first().data.keys())
-                        )
-                    )
+                tasks = tasks.filter(
+                    **process_task_search_query(request.GET, proj_objs[0].project_type)
+                )
                 # editable filter
                 if "editable" in dict(request.query_params):
                     editable = False
@@ -355,7 +311,7 @@ class TaskViewSet(viewsets.ModelViewSet, mixins.ListModelMixin):
                 proj_type = proj_objs[0].project_type
                 for task_obj in task_objs:
                     tas = Task.objects.filter(id=task_obj["id"])
-                    tas = tas.values()[0]
+                    tas = tas.values(*TASK_VALUES_FIELDS)[0]
                     tas["annotation_status"] = task_obj["annotation_status"]
                     tas["user_mail"] = task_obj["user_mail"]
                     if (ann_status[0] in ["labeled", "draft", "to_be_revised"]) and (
@@ -424,65 +380,24 @@ class TaskViewSet(viewsets.ModelViewSet, mixins.ListModelMixin):
                             tasks = Task.objects.filter(annotations__in=ann)
                         tasks = tasks.distinct()
                         # Handle search query (if any)
-                        if len(tasks):
-                            tasks = tasks.filter(
-                                **process_search_query(
-                                    request.GET, "data", list(tasks.first().data.keys())
-                                )
+                        tasks = tasks.filter(
+                            **process_task_search_query(
+                                request.GET, proj_objs[0].project_type
+                            )
+                        )
+                        try:
+                            final_dict = list_annotation_tasks(
+                                ann,
+                                tasks,
+                                "review_status",
+                                proj_objs[0],
+                                request.query_params,
+                            )
+                        except ValueError:
+                            return Response(
+                                {"message": "page not available"},
+                                status=status.HTTP_400_BAD_REQUEST,
                             )
-                        ann_filter1 = ann.filter(task__in=tasks).order_by("id")
-
-                        task_objs = []
-                        for an in ann_filter1:
-                            task_obj = {}
-                            task_obj["id"] = an.task_id
-                            task_obj["annotation_status"] = an.annotation_status
-                            task_obj["user_mail"] = an.completed_by.email
-                            task_objs.append(task_obj)
-                        task_objs.sort(key=lambda x: x["id"])
-                        ordered_tasks = []
-                        final_dict = {}
-                        for task_obj in task_objs:
-                            tas = Task.objects.filter(id=task_obj["id"])
-                            tas = tas.values()[0]
-                            tas["review_status"] = task_obj["annotation_status"]
-                            tas["user_mail"] = task_obj["user_mail"]
-                            ordered_tasks.append(tas)
-
-                        if page_number is not None:
-                            page_object = Paginator(ordered_tasks, records)
-
-                            try:
-                                final_dict["total_count"] = len(ordered_tasks)
-                                page_items = page_object.page(page_number)
-                                ordered_tasks = page_items.object_list
-                                if (
-                                    proj_objs[0].project_type
-                                    in get_audio_project_types()
-                                ):
-                                    for tas in ordered_tasks:
-                                        data = tas["data"]
-                                        if "audio_url" in tas["data"]:
-                                            del data["audio_url"]
-                                        tas["data"] = data
-                                elif (
-                                    proj_objs[0].project_type in get_ocr_project_types()
-                                ):
-                                    for tas in ordered_tasks:
-                                        data = tas["data"]
-                                        if "image_url" in tas["data"]:
-                                            del data["image_url"]
-                                        tas["data"] = data
-                                final_dict["result"] = ordered_tasks
-                                return Response(final_dict)
-                            except:
-                                return Response(
-                                    {"message": "page not available"},
-                                    status=status.HTTP_400_BAD_REQUEST,
-                                )
-
-                        final_dict["total_count"] = len(ordered_tasks)
-                        final_dict["result"] = ordered_tasks
                         return Response(final_dict)
 
                 ann = Annotation.objects.filter(
@@ -504,12 +419,9 @@ class TaskViewSet(viewsets.ModelViewSet, mixins.ListModelMixin):
                 tasks = tasks.distinct()
                 tasks = tasks.order_by("id")
                 # Handle search query (if any)
-                if len(tasks):
-                    tasks = tasks.filter(
-                        **process_search_query(
-                            request.GET, "data", list(tasks.first().data.keys())
-                        )
-                    )
+                tasks = tasks.filter(
+                    **process_task_search_query(request.GET, proj_objs[0].project_type)
+                )
 
                 # editable filter
                 if "editable" in dict(request.query_params):
@@ -567,7 +479,7 @@ class TaskViewSet(viewsets.ModelViewSet, mixins.ListModelMixin):
                 final_dict = {}
                 for task_obj in task_objs:
                     tas = Task.objects.filter(id=task_obj["id"])
-                    tas = tas.values()[0]
+                    tas = tas.values(*TASK_VALUES_FIELDS)[0]
                     tas["review_status"] = task_obj["annotation_status"]
                     tas["user_mail"] = task_obj["user_mail"]
                     tas["annotator_mail"] = task_obj["parent_annotator_mail"]
@@ -659,64 +571,24 @@ class TaskViewSet(viewsets.ModelViewSet, mixins.ListModelMixin):
                         tasks = Task.objects.filter(annotations__in=ann)
                         tasks = tasks.distinct()
                         # Handle search query (if any)
-                        if len(tasks):
-                            tasks = tasks.filter(
-                                **process_search_query(
-                                    request.GET, "data", list(tasks.first().data.keys())
-                                )
+                        tasks = tasks.filter(
+                            **process_task_search_query(
+                                request.GET, proj_objs[0].project_type
+                            )
+                        )
+                        try:
+                            final_dict = list_annotation_tasks(
+                                ann,
+                                tasks,
+                                "supercheck_status",
+                                proj_objs[0],
+                                request.query_params,
+                            )
+                        except ValueError:
+                            return Response(
+                                {"message": "page not available"},
+                                status=status.HTTP_400_BAD_REQUEST,
                             )
-                        ann_filter1 = ann.filter(task__in=tasks)
-                        task_objs = []
-                        for an in ann_filter1:
-                            task_obj = {}
-                            task_obj["id"] = an.task_id
-                            task_obj["annotation_status"] = an.annotation_status
-                            task_obj["user_mail"] = an.completed_by.email
-                            task_objs.append(task_obj)
-                        task_objs.sort(key=lambda x: x["id"])
-                        ordered_tasks = []
-                        final_dict = {}
-                        for task_obj in task_objs:
-                            tas = Task.objects.filter(id=task_obj["id"])
-                            tas = tas.values()[0]
-                            tas["supercheck_status"] = task_obj["annotation_status"]
-                            tas["user_mail"] = task_obj["user_mail"]
-                            ordered_tasks.append(tas)
-
-                        if page_number is not None:
-                            page_object = Paginator(ordered_tasks, records)
-
-                            try:
-                                final_dict["total_count"] = len(ordered_tasks)
-                                page_items = page_object.page(page_number)
-                                ordered_tasks = page_items.object_list
-                                if (
-                                    proj_objs[0].project_type
-                                    in get_audio_project_types()
-                                ):
-                                    for tas in ordered_tasks:
-                                        data = tas["data"]
-                                        if "audio_url" in tas["data"]:
-                                            del data["audio_url"]
-                                        tas["data"] = data
-                                elif (
-                                    proj_objs[0].project_type in get_ocr_project_types()
-                                ):
-                                    for tas in ordered_tasks:
-                                        data = tas["data"]
-                                        if "image_url" in tas["data"]:
-                                            del data["image_url"]
-                                        tas["data"] = data
-                                final_dict["result"] = ordered_tasks
-                                return Response(final_dict)
-                            except:
-                                return Response(
-                                    {"message": "page not available"},
-                                    status=status.HTTP_400_BAD_REQUEST,
-                                )
-
-                        final_dict["total_count"] = len(ordered_tasks)
-                        final_dict["result"] = ordered_tasks
                         return Response(final_dict)
 
                 ann = Annotation.objects.filter(
@@ -728,12 +600,9 @@ class TaskViewSet(viewsets.ModelViewSet, mixins.ListModelMixin):
                 tasks = Task.objects.filter(annotations__in=ann)
                 tasks = tasks.distinct()
                 # Handle search query (if any)
-                if len(tasks):
-                    tasks = tasks.filter(
-                        **process_search_query(
-                            request.GET, "data", list(tasks.first().data.keys())
-                        )
-                    )
+                tasks = tasks.filter(
+                    **process_task_search_query(request.GET, proj_objs[0].project_type)
+                )
                 ann_filter1 = ann.filter(task__in=tasks).order_by("id")
 
                 task_objs = []
@@ -770,7 +639,7 @@ class TaskViewSet(viewsets.ModelViewSet, mixins.ListModelMixin):
                 proj_type = proj_objs[0].project_type
                 for task_obj in task_objs:
                     tas = Task.objects.filter(id=task_obj["id"])
-                    tas = tas.values()[0]
+                    tas = tas.values(*TASK_VALUES_FIELDS)[0]
                     tas["supercheck_status"] = task_obj["annotation_status"]
                     tas["user_mail"] = task_obj["user_mail"]
                     tas["reviewer_mail"] = task_obj["reviewer_mail"]
@@ -844,14 +713,13 @@ class TaskViewSet(viewsets.ModelViewSet, mixins.ListModelMixin):
                     )
 
                     # Handle search query (if any)
-                    if len(tasks):
-                        tasks = tasks.filter(
-                            **process_search_query(
-                                request.GET, "data", list(tasks.first().data.keys())
-                            )
+                    tasks = tasks.filter(
+                        **process_task_search_query(
+                            request.GET, proj_objs[0].project_type
                         )
+                    )
 
-                    ordered_tasks = list(tasks.values())
+                    ordered_tasks = list(tasks.values(*TASK_VALUES_FIELDS))
                     final_dict = {}
                     if page_number is not None:
                         page_object = Paginator(ordered_tasks, records)
@@ -895,14 +763,11 @@ class TaskViewSet(viewsets.ModelViewSet, mixins.ListModelMixin):
                 )
 
                 # Handle search query (if any)
-                if len(tasks):
-                    tasks = tasks.filter(
-                        **process_search_query(
-                            request.GET, "data", list(tasks.first().data.keys())
-                        )
-                    )
+                tasks = tasks.filter(
+                    **process_task_search_query(request.GET, proj_objs[0].project_type)
+                )
 
-                ordered_tasks = list(tasks.values())
+                ordered_tasks = list(tasks.values(*TASK_VALUES_FIELDS))
                 final_dict = {}
                 if page_number is not None:
                     page_object = Paginator(ordered_tasks, records)
@@ -943,14 +808,11 @@ class TaskViewSet(viewsets.ModelViewSet, mixins.ListModelMixin):
                 )
 
                 # Handle search query (if any)
-                if len(tasks):
-                    tasks = tasks.filter(
-                        **process_search_query(
-                            request.GET, "data", list(tasks.first().data.keys())
-                        )
-                    )
+                tasks = tasks.filter(
+                    **process_task_search_query(request.GET, proj_objs[0].project_type)
+                )
 
-                ordered_tasks = list(tasks.values())
+                ordered_tasks = list(tasks.values(*TASK_VALUES_FIELDS))
                 final_dict = {}
                 if page_number is not None:
                     page_object = Paginator(ordered_tasks, records)
@@ -992,14 +854,11 @@ class TaskViewSet(viewsets.ModelViewSet, mixins.ListModelMixin):
                 tasks = tasks.order_by("id")
 
                 # Handle search query (if any)
-                if len(tasks):
-                    tasks = tasks.filter(
-                        **process_search_query(
-                            request.GET, "data", list(tasks.first().data.keys())
-                        )
-                    )
+                tasks = tasks.filter(
+                    **process_task_search_query(request.GET, proj_objs[0].project_type)
+                )
 
-                ordered_tasks = list(tasks.values())
+                ordered_tasks = list(tasks.values(*TASK_VALUES_FIELDS))
                 final_dict = {}
                 if page_number is not None:
                     page_object = Paginator(ordered_tasks, records)
@@ -2478,23 +2337,20 @@ class SentenceOperationViewSet(viewsets.ViewSet):
                     {"message": "Invalid parameters in request body!"},
                     status=status.HTTP_400_BAD_REQUEST,
                 )
-        try:
-            character_level_edit_distance = Levenshtein.distance(sentence1, sentence2)
-            normalized_character_level_edit_distance = (
-                character_level_edit_distance / len(sentence1)
-            )
-
-            return Response(
-                {
-                    "normalized_character_level_edit_distance": normalized_character_level_edit_distance
-                },
-                status=status.HTTP_200_OK,
-            )
-        except:
+        normalized_character_level_edit_distance = normalized_edit_distance(
+            sentence1, sentence2
+        )
+        if normalized_character_level_edit_distance is None:
             return Response(
                 {"message": "Invalid parameters in request body!"},
                 status=status.HTTP_400_BAD_REQUEST,
             )
+        return Response(
+            {
+                "normalized_character_level_edit_distance": normalized_character_level_edit_distance
+            },
+            status=status.HTTP_200_OK,
+        )
 
     @swagger_auto_schema(
         method="post",
@@ -2531,28 +2387,21 @@ class SentenceOperationViewSet(viewsets.ViewSet):
                     status=status.HTTP_400_BAD_REQUEST,
                 )
 
-        try:
-            sentence1 = [sentence1]
-            sentence2 = [[sentence2]]
-
-            bleu = sacrebleu.corpus_bleu(sentence1, sentence2)
-
-            bleu_score = bleu.score
-
-            return Response(
-                {"bleu_score": str(bleu_score)},
-                status=status.HTTP_200_OK,
-            )
-        except:
+        bleu = bleu_score(sentence1, sentence2)
+        if bleu is None:
             return Response(
                 {"message": "Invalid parameters in request body!"},
                 status=status.HTTP_400_BAD_REQUEST,
             )
+        return Response(
+            {"bleu_score": str(bleu)},
+            status=status.HTTP_200_OK,
+        )
 
 
 @swagger_auto_schema(
     method="get",
-    operation_description="Get a list of Celery tasks with an optional filter by task state. use State = 'FAILURE' for retrieving failed tasks, State = 'SUCCESS' for retrieving successful tasks, State = 'STARTED' for retrieving active tasks and State = None for all retrieving tasks",
+    operation_description="Get a list of Celery tasks, most recently queued first, with an optional filter by task state. use State = 'FAILURE' for retrieving failed tasks, State = 'SUCCESS' for retrieving successful tasks, State = 'STARTED' for retrieving active tasks and State = None for all retrieving tasks. Every task is returned unless page or before is given. Pass the uuid of the last task of a page as before to get the next page without counting the tasks",
     responses={
         200: "Success",
         400: "Bad Request",
@@ -2565,36 +2414,69 @@ class SentenceOperationViewSet(viewsets.ViewSet):
             description="Filter tasks by state",
             required=False,
         ),
+        openapi.Parameter(
+            name="name",
+            in_=openapi.IN_QUERY,
+            type=openapi.TYPE_STRING,
+            description="Filter tasks by task name",
+            required=False,
+        ),
+        openapi.Parameter(
+            name="page",
+            in_=openapi.IN_QUERY,
+            type=openapi.TYPE_INTEGER,
+            description="Page number",
+            required=False,
+        ),
+        openapi.Parameter(
+            name="before",
+            in_=openapi.IN_QUERY,
+            type=openapi.TYPE_STRING,
+            description="uuid of the last task of the previous page",
+            required=False,
+        ),
+        openapi.Parameter(
+            name="page_size",
+            in_=openapi.IN_QUERY,
+            type=openapi.TYPE_INTEGER,
+            description="Number of tasks per page, a positive number, 10 by default",
+            required=False,
+        ),
     ],
 )
 @api_view(["GET"])
 def get_celery_tasks(request):
-    filters = request.GET
-    filtered_tasks = query_flower(filters)
-    for i in filtered_tasks:
-        if filtered_tasks[i]["name"] in Queued_Task_name:
-            filtered_tasks[i]["name"] = Queued_Task_name[filtered_tasks[i]["name"]]
-    for i in filtered_tasks:
-        if filtered_tasks[i]["succeeded"] is not None:
-            filtered_tasks[i]["succeeded"] = timezone.datetime.utcfromtimestamp(
-                filtered_tasks[i]["succeeded"]
-            ).strftime("%Y-%m-%dT%H:%M:%S.%fZ")
-        if filtered_tasks[i]["failed"] is not None:
-            filtered_tasks[i]["failed"] = timezone.datetime.utcfromtimestamp(
-                filtered_tasks[i]["failed"]
-            ).strftime("%Y-%m-%dT%H:%M:%S.%fZ")
-        if filtered_tasks[i]["started"] is not None:
-            filtered_tasks[i]["started"] = timezone.datetime.utcfromtimestamp(
-                filtered_tasks[i]["started"]
-            ).strftime("%Y-%m-%dT%H:%M:%S.%fZ")
-        if filtered_tasks[i]["received"] is not None:
-            filtered_tasks[i]["received"] = timezone.datetime.utcfromtimestamp(
-                filtered_tasks[i]["received"]
-            ).strftime("%Y-%m-%dT%H:%M:%S.%fZ")
-
-    if "error" in filtered_tasks:
-        return JsonResponse({"message": filtered_tasks["error"]}, status=503)
-    page_number = request.GET.get("page")
-    page_size = int(request.GET.get("page_size", 10))
-    data = paginate_queryset(filtered_tasks, page_number, page_size)
-    return JsonResponse(data["results"], safe=False)
+    try:
+        page_size = int(request.GET.get("page_size", 10))
+        if page_size < 1:
+            raise ValueError(f"Invalid page_size: {page_size}")
+    except ValueError:
+        return JsonResponse({"message": "Invalid page_size"}, status=400)
+
+    task_events = CeleryTaskEvent.objects.order_by("-id")
+    if request.GET.get("state"):
+        task_events = task_events.filter(state=request.GET["state"])
+    if request.GET.get("name"):
+        task_events = task_events.filter(name=request.GET["name"])
+    if request.GET.get("before"):
+        before_id = (
+            CeleryTaskEvent.objects.filter(task_id=request.GET["before"])
+            .values_list("id", flat=True)
+            .first()
+        )
+        if before_id is None:
+            return JsonResponse({"message": "Task not found"}, status=400)
+        task_events = task_events.filter(id__lt=before_id)[:page_size]
+    elif request.GET.get("page"):
+        paginator = Paginator(task_events, page_size)
+        try:
+            task_events = paginator.page(request.GET["page"]).object_list
+        except PageNotAnInteger:
+            task_events = paginator.page(1).object_list
+        except EmptyPage:
+            task_events = paginator.page(paginator.num_pages).object_list
+
+    data = {
+        event.task_id: serialize_task_event(event) for event in task_events.iterator()
+    }
+    return JsonResponse(data, safe=False)
@@ -0,0 +1,365 @@
+from datetime import datetime, timedelta
+
+import pandas as pd
+from django.conf import settings
+from django.core.mail import get_connection, send_mail
+from django.db.models import Case, F, JSONField, Value, When
+from pretty_html_table import build_table
+
+from projects.models import Project
+from projects.utils import (
+    convert_seconds_to_hours,
+    get_audio_project_types,
+    get_audio_transcription_duration,
+    ocr_word_count,
+)
+from tasks.models import (
+    Annotation,
+    ANNOTATOR_ANNOTATION,
+    REVIEWER_ANNOTATION,
+    SUPER_CHECKER_ANNOTATION,
+)
+from .models import User
+
+"""
+Daily progress report mails
+
+The metrics of yesterday's annotations of every user are computed with one
+query per report type, grouped by user and project in a single pass, and the
+mails are rendered and sent in chunks of users by users.tasks. The tables are
+the ones of AnalyticsViewSet.get_user_analytics with project_type "all".
+"""
+
+REPORT_TYPES = {
+    "annotation": {
+        "title": "Annotation Reports",
+        "project_users": "annotators",
+        "task_user": "annotation_users",
+        "task_statuses": ["annotated", "reviewed", "exported", "super_checked"],
+        "annotation_type": ANNOTATOR_ANNOTATION,
+        "excluded_statuses": [],
+        "tasks_column": "Annotated Tasks",
+        "time_column": "Avg Annotation Time (sec)",
+        "colors": ("orange_light", "orange_dark"),
+    },
+    "review": {
+        "title": "Review Reports",
+        "project_users": "annotation_reviewers",
+        "task_user": "review_user",
+        "task_statuses": ["reviewed", "exported", "super_checked"],
+        "annotation_type": REVIEWER_ANNOTATION,
+        "excluded_statuses": ["to_be_revised", "draft", "skipped"],
+        "tasks_column": "Reviewed Tasks",
+        "time_column": "Avg Review Time (sec)",
+        "colors": ("green_light", "green_dark"),
+    },
+    "supercheck": {
+        "title": "SuperCheck Reports",
+        "project_users": "review_supercheckers",
+        "task_user": "super_check_user",
+        "task_statuses": ["exported", "super_checked"],
+        "annotation_type": SUPER_CHECKER_ANNOTATION,
+        "excluded_statuses": [],
+        "tasks_column": "SuperChecked Tasks",
+        "time_column": "Avg SuperCheck Time (sec)",
+        "colors": ("blue_light", "blue_dark"),
+    },
+}
+
+REPORT_USER_ROLES = [User.ANNOTATOR, User.REVIEWER, User.SUPER_CHECKER]
+
+
+def get_report_users():
+    """
+    Map of the users with mails enabled to the report types they get, a user
+    gets the reports of the roles they have in any project
+    """
+    report_users = {}
+    for reports_type, report in REPORT_TYPES.items():
+        project_users = getattr(Project, report["project_users"]).through
+        user_ids = (
+            project_users.objects.filter(
+                user__role__in=REPORT_USER_ROLES, user__enable_mail=True
+            )
+            .values_list("user_id", flat=True)
+            .distinct()
+        )
+        for user_id in user_ids:
+            report_users.setdefault(user_id, []).append(reports_type)
+    return report_users
+
+
+def get_project_metrics(reports_type, start_date, end_date, project_types):
+    """
+    Map of (user id, project id) to the metrics of the annotations of the
+    users in the projects, in one query for all the users. project_types is
+    a map of project id to project type.
+    """
+    report = REPORT_TYPES[reports_type]
+    audio_project_types = list(get_audio_project_types())
+    result_project_types = audio_project_types + [
+        project_type
+        for project_type in set(project_types.values())
+        if "OCRTranscription" in project_type
+    ]
+    annotations = (
+        Annotation.objects.filter(
+            annotation_type=report["annotation_type"],
+            updated_at__range=[start_date, end_date],
+            task__task_status__in=report["task_statuses"],
+            completed_by__role__in=REPORT_USER_ROLES,
+            completed_by__enable_mail=True,
+            **{
+                f"task__{report['task_user']}": F("completed_by"),
+                f"task__project_id__{report['project_users']}": F("completed_by"),
+            },
+        )
+        .exclude(annotation_status__in=report["excluded_statuses"])
+        .annotate(
+            report_result=Case(
+                When(
+                    task__project_id__project_type__in=result_project_types,
+                    then=F("result"),
+                ),
+                default=Value(None),
+                output_field=JSONField(),
+            )
+        )
+        .values_list(
+            "completed_by_id",
+            "task__project_id",
+            "lead_time",
+            "task__data__word_count",
+            "report_result",
+        )
+    )
+
+    metrics = {}
+    for user_id, project_id, lead_time, word_count, result in annotations.iterator(
+        chunk_size=settings.DAILY_REPORT_CHUNK_SIZE
+    ):
+        project_type = project_types[project_id]
+        project_metrics = metrics.setdefault(
+            (user_id, project_id),
+            {"tasks": 0, "lead_time": 0, "word_count": 0, "duration": 0},
+        )
+        project_metrics["tasks"] += 1
+        project_metrics["lead_time"] += lead_time
+        if "OCRTranscription" in project_type:
+            try:
+                project_metrics["word_count"] += ocr_word_count(result)
+            except:
+                pass
+        elif project_type in audio_project_types:
+            try:
+                project_metrics["duration"] += get_audio_transcription_duration(result)
+            except:
+                pass
+        elif isinstance(word_count, (int, float)):
+            project_metrics["word_count"] += word_count
+    return metrics
+
+
+def get_report_summaries(reports_type, user_metrics, projects, audio_project_types):
+    """
+    Project-wise and total summaries of a user, user_metrics is a map of project
+    id to the metrics of the user in the project
+    """
+    report = REPORT_TYPES[reports_type]
+    tasks_column = report["tasks_column"]
+    time_column = report["time_column"]
+
+    project_summary = []
+    total_tasks = 0
+    total_lead_time = 0
+    total_word_count = 0
+    total_duration = 0
+    for project_id in sorted(user_metrics):
+        metrics = user_metrics[project_id]
+        title, project_type = projects[project_id]
+        total_tasks += metrics["tasks"]
+        total_lead_time += metrics["lead_time"]
+        total_word_count += metrics["word_count"]
+        total_duration += metrics["duration"]
+
+        result = {
+            "Project Name": title,
+            tasks_column: metrics["tasks"],
+            "Word Count": metrics["word_count"],
+            "Total Segments Duration": convert_seconds_to_hours(metrics["duration"]),
+            time_column: round(metrics["lead_time"] / metrics["tasks"], 2),
+        }
+        if project_type in audio_project_types:
+            del result["Word Count"]
+        else:
+            del result["Total Segments Duration"]
+        project_summary.append(result)
+    project_summary = sorted(
+        project_summary, key=lambda x: x[tasks_column], reverse=True
+    )
+
+    total_summary = [
+        {
+            tasks_column: total_tasks,
+            "Word Count": total_word_count,
+            "Total Segments Duration": convert_seconds_to_hours(total_duration),
+            time_column: round(total_lead_time / total_tasks, 2) if total_tasks else 0,
+        }
+    ]
+    return project_summary, total_summary
+
+
+def get_daily_reports(report_date):
+    """
+    Reports of all the users with mails enabled for the annotations updated on
+    report_date.
+
+    Returns:
+        list: One dictionary per user with its id, username, email and, for
+            each of its report types, the project-wise and total summaries.
+    """
+    start_date = datetime.strptime(f"{report_date:%Y-%m-%d} 00:00", "%Y-%m-%d %H:%M")
+    end_date = datetime.strptime(f"{report_date:%Y-%m-%d} 23:59", "%Y-%m-%d %H:%M")
+    report_users = get_report_users()
+    if not report_users:
+        return []
+
+    projects = {
+        project_id: (title, project_type)
+        for project_id, title, project_type in Project.objects.values_list(
+            "id", "title", "project_type"
+        )
+    }
+    project_types = {
+        project_id: project_type for project_id, (_, project_type) in projects.items()
+    }
+    audio_project_types = list(get_audio_project_types())
+
+    user_metrics = {}
+    for reports_type in REPORT_TYPES:
+        metrics = get_project_metrics(reports_type, start_date, end_date, project_types)
+        for (user_id, project_id), project_metrics in metrics.items():
+            user_metrics.setdefault((user_id, reports_type), {})[
+                project_id
+            ] = project_metrics
+
+    reports = []
+    for user_id, username, email in User.objects.filter(
+        id__in=list(report_users)
+    ).values_list("id", "username", "email"):
+        user_reports = {}
+        for reports_type in report_users[user_id]:
+            project_summary, total_summary = get_report_summaries(
+                reports_type,
+                user_metrics.get((user_id, reports_type), {}),
+                projects,
+                audio_project_types,
+            )
+            user_reports[reports_type] = {
+                "project_summary": project_summary,
+                "total_summary": total_summary,
+            }
+        reports.append(
+            {
+                "id": user_id,
+                "username": username,
+                "email": email,
+                "reports": user_reports,
+            }
+        )
+    return reports
+
+
+def build_report_table(records, color):
+    df = pd.DataFrame.from_records(records)
+    df.index = [""] * len(df)
+    return build_table(
+        df,
+        color,
+        font_size="medium",
+        text_align="left",
+        width="auto",
+        index=False,
+    )
+
+
+def render_daily_report_mail(report, report_date):
+    """
+    Returns the plain text message and the html mail of a user's report
+    """
+    message = (
+        "Dear "
+        + str(report["username"])
+        + ",\n Your progress reports for "
+        + f"{report_date:%d-%m-%Y}"
+        + " are ready.\n Thanks for contributing on Shoonya!"
+    )
+
+    sections = []
+    for reports_type, report_type in REPORT_TYPES.items():
+        if reports_type not in report["reports"]:
+            continue
+        summaries = report["reports"][reports_type]
+        project_color, total_color = report_type["colors"]
+        project_table = ""
+        if len(summaries["project_summary"]) > 0:
+            project_table = build_report_table(
+                summaries["project_summary"], project_color
+            )
+        total_table = build_report_table(summaries["total_summary"], total_color)
+        sections.append((report_type["title"], total_table, project_table))
+
+    if len(sections) == 1:
+        _, total_table, project_table = sections[0]
+        return message, (
+            "<p>"
+            + message
+            + "</p><br><h><b>Total Reports</b></h>"
+            + total_table
+            + "<br><h><b>Project-wise Reports</b></h>"
+            + project_table
+        )
+    return message, (
+        "<p>"
+        + message
+        + "</p><br>"
+        + "<br><br><hr></p><br><br>".join(
+            "<h1><b>"
+            + title
+            + "</b></h1>"
+            + "<br><h2><b>Total Reports</b></h2>"
+            + total_table
+            + "<br><h2><b>Project-wise Reports</b></h2>"
+            + project_table
+            for title, total_table, project_table in sections
+        )
+    )
+
+
+def send_daily_report_mails(reports, report_date):
+    """
+    Render and send the mails of the given reports over a single connection.
+
+    Returns the number of mails sent.
+    """
+    sent_count = 0
+    connection = get_connection()
+    for report in reports:
+        message, html_message = render_daily_report_mail(report, report_date)
+        try:
+            sent_count += send_mail(
+                "Daily Annotation and Review Reports",
+                message,
+                settings.DEFAULT_FROM_EMAIL,
+                [report["email"]],
+                html_message=html_message,
+                connection=connection,
+            )
+        except Exception as e:
+            print(f"Unable to send the daily report of user-{report['id']}. Error: {e}")
+    connection.close()
+    return sent_count
+
+
+def get_report_date():
+    return (datetime.now() - timedelta(days=1)).date()
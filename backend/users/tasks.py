@@ -1,11 +1,38 @@
-from celery import shared_task
+import datetime
+
+from celery import chord, shared_task
 from django.conf import settings
-from django.core.mail import send_mail
-from celery.schedules import crontab
-from shoonya_backend.celery import celery_app
-from user_reports import calculate_reports
+
+from .daily_reports import get_daily_reports, get_report_date, send_daily_report_mails
 
 
 @shared_task(name="send_mail_task")
 def send_mail_task():
-    calculate_reports()
+    """Compute yesterday's reports of all the users and send their mails in
+    parallel chunks"""
+    report_date = get_report_date()
+    reports = get_daily_reports(report_date)
+    chunk_size = settings.DAILY_REPORT_MAIL_CHUNK_SIZE
+    chunks = [reports[i : i + chunk_size] for i in range(0, len(reports), chunk_size)]
+    if not chunks:
+        return
+    chord(
+        send_daily_report_mails_task.s(chunk, report_date.isoformat())
+        for chunk in chunks
+    )(daily_report_mails_sent.s(report_date.isoformat()))
+
+
+@shared_task
+def send_daily_report_mails_task(reports, report_date):
+    """Send the daily report mails of a chunk of users
+
+    Args:
+        reports (list): Reports of the users, as returned by get_daily_reports.
+        report_date (str): ISO formatted day of the reports.
+    """
+    return send_daily_report_mails(reports, datetime.date.fromisoformat(report_date))
+
+
+@shared_task
+def daily_report_mails_sent(sent_counts, report_date):
+    print(f"Sent {sum(sent_counts)} daily report mails for {report_date}")
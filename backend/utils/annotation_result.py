@@ -0,0 +1,133 @@
+import json
+
+"""
+Normalization of the speech annotation results
+
+A segment of a speech annotation is stored as up to three regions of the
+result with the same id: the speaker labels, the verbatim transcription and,
+for the acoustic normalised transcription projects, the acoustic normalised
+transcription. group_result_by_id reads a result once and returns its
+segments in the order of their first region, which the download and the
+chitralekha conversion format without searching the result again.
+"""
+
+LABELS = "labels"
+ACOUSTIC_TEXT = "acoustic_normalised_transcribed_json"
+STANDARDISED_TRANSCRIPTION = "standardised_transcription"
+
+
+def group_result_by_id(result):
+    """
+    Group the regions of a speech annotation result by segment.
+
+    Args:
+        result (list): Regions of the annotation result, as dictionaries or
+            JSON strings, which are decoded in place.
+
+    Returns:
+        list: Segments as dictionaries of their "id" and of their "labels",
+            "text" and "acoustic_text" regions, None when the segment doesn't
+            have one. The last region of a kind is kept.
+        dict: Region of the standardised transcription, None if there is none.
+    """
+    segments = {}
+    standardised_transcription = None
+    for i, region in enumerate(result):
+        if isinstance(region, str):
+            region = result[i] = json.loads(region)
+        try:
+            segment_id = region["id"]
+            from_name = region["from_name"]
+        except KeyError:
+            print(
+                f"The entry number {i} is not having an id or from_name hence it is skipped"
+            )
+            continue
+        if from_name == STANDARDISED_TRANSCRIPTION:
+            standardised_transcription = region
+            continue
+        if segment_id not in segments:
+            segments[segment_id] = {
+                "id": segment_id,
+                "labels": None,
+                "text": None,
+                "acoustic_text": None,
+            }
+        if from_name == LABELS:
+            segments[segment_id]["labels"] = region
+        elif from_name == ACOUSTIC_TEXT:
+            segments[segment_id]["acoustic_text"] = region
+        else:
+            segments[segment_id]["text"] = region
+    return list(segments.values()), standardised_transcription
+
+
+def get_speaker_ids(speakers_json):
+    """
+    Speaker id of every speaker name, the first speaker of a name is kept
+    """
+    speaker_ids = {}
+    for speaker in speakers_json or []:
+        if "name" in speaker:
+            speaker_ids.setdefault(speaker["name"], speaker.get("speaker_id"))
+    return speaker_ids
+
+
+def format_speech_result(result, speakers_json, is_acoustic=False):
+    """
+    Format a speech annotation result as the segments of the task data.
+
+    Args:
+        result (list): Regions of the annotation result.
+        speakers_json (list): Speakers of the task, with their name and
+            speaker_id.
+        is_acoustic (bool): Also format the acoustic normalised transcription.
+
+    Returns:
+        list: Speaker id, start, end and verbatim text of every segment.
+        list: The same segments with the acoustic normalised text, empty
+            unless is_acoustic.
+        str: Standardised transcription, empty if there is none.
+    """
+    segments, standardised_region = group_result_by_id(result)
+    speaker_ids = get_speaker_ids(speakers_json)
+
+    transcribed_json = []
+    acoustic_transcribed_json = []
+    for segment in segments:
+        formatted_result_dict = {}
+        labels_dict = segment["labels"]
+        if labels_dict is None:
+            formatted_result_dict["speaker_id"] = None
+        else:
+            try:
+                formatted_result_dict["speaker_id"] = speaker_ids.get(
+                    labels_dict["value"]["labels"][0]
+                )
+            except KeyError:
+                formatted_result_dict["speaker_id"] = None
+            formatted_result_dict["start"] = labels_dict["value"]["start"]
+            formatted_result_dict["end"] = labels_dict["value"]["end"]
+
+        text_dict = segment["text"]
+        if text_dict is None:
+            formatted_result_dict["text"] = ""
+        else:
+            formatted_result_dict["text"] = text_dict["value"]["text"][0]
+            formatted_result_dict["start"] = text_dict["value"]["start"]
+            formatted_result_dict["end"] = text_dict["value"]["end"]
+
+        transcribed_json.append(formatted_result_dict)
+
+        if is_acoustic:
+            acoustic_formatted_result_dict = dict(formatted_result_dict)
+            acoustic_dict = segment["acoustic_text"]
+            acoustic_formatted_result_dict["text"] = (
+                acoustic_dict["value"]["text"][0] if acoustic_dict else ""
+            )
+            acoustic_transcribed_json.append(acoustic_formatted_result_dict)
+
+    standardised_transcription = (
+        standardised_region["value"]["text"][0] if standardised_region else ""
+    )
+    return transcribed_json, acoustic_transcribed_json, standardised_transcription
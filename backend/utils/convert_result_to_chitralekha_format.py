@@ -1,74 +1,31 @@
-def create_memory(result):
-    memory = {}
-    for i in range(len(result)):
-        try:
-            key = result[i]["id"]
-            dict_type = result[i]["from_name"]
-        except KeyError:
-            print(
-                f"The entry number {i} is not having an id or from_name hence cannot be converted to chitralekha format"
-            )
-            del result[i]
-            continue
-        if key not in memory:
-            memory[key] = {
-                "labels_dict_idx": -1,
-                "text_dict_idx": -1,
-                "acoustic_text_dict_idx": -1,
-            }
-        if dict_type == "labels":
-            memory[key]["labels_dict_idx"] = i
-        elif dict_type == "acoustic_normalised_transcribed_json":
-            memory[key]["acoustic_text_dict_idx"] = i
-        elif dict_type == "standardised_transcription":
-            memory["standardised_transcription"] = i
-        else:
-            memory[key]["text_dict_idx"] = i
-    return memory
+from utils.annotation_result import group_result_by_id
 
 
 def convert_result_to_chitralekha_format(result, ann_id, project_type):
     if (len(result) == 1 and result[0] == {}) or len(result) == 0:
         return []
-    memory = create_memory(result)
+    segments, standardised_transcription = group_result_by_id(result)
     modified_result = []
     count = 1
-    seen = set()
-    for i in range(len(result)):
-        if i in seen:
-            continue
-        labels_dict_idx, text_dict_idx = (
-            memory[result[i]["id"]]["labels_dict_idx"],
-            memory[result[i]["id"]]["text_dict_idx"],
-        )
-        acoustic_text_dict_idx = memory[result[i]["id"]]["acoustic_text_dict_idx"]
-        if labels_dict_idx == -1:
-            text_dict = result[text_dict_idx]
-            if acoustic_text_dict_idx != -1:
-                acoustic_dict = result[acoustic_text_dict_idx]
-            speaker_id = "Speaker 0"
-            seen.add(text_dict_idx)
-        elif text_dict_idx == -1:
+    for segment in segments:
+        label_dict, text_dict = segment["labels"], segment["text"]
+        acoustic_dict = segment["acoustic_text"]
+        if text_dict is None:
             print(
-                f"The data is corrupt for annotation id-{ann_id}, data id- {result[i]['id']}. "
+                f"The data is corrupt for annotation id-{ann_id}, data id- {segment['id']}. "
                 f"It does not contain a corresponding text dictionary."
             )
             continue
+        if label_dict is None:
+            speaker_id = "Speaker 0"
         else:
-            label_dict = result[labels_dict_idx]
-            text_dict = result[text_dict_idx]
-            if acoustic_text_dict_idx != -1:
-                acoustic_dict = result[acoustic_text_dict_idx]
-                seen.add(acoustic_text_dict_idx)
-            seen.add(labels_dict_idx)
-            seen.add(text_dict_idx)
             try:
                 speaker_id = label_dict["value"]["labels"][0]
             except KeyError:
                 speaker_id = "Speaker 0"
 
         text = text_dict["value"]["text"][0] if text_dict["value"]["text"] else ""
-        if acoustic_text_dict_idx != -1:
+        if acoustic_dict is not None:
             acoustic_normalised_text = (
                 acoustic_dict["value"]["text"][0]
                 if acoustic_dict["value"]["text"]
@@ -86,7 +43,7 @@ def convert_result_to_chitralekha_format(result, ann_id, project_type):
                 ),
                 "id": count,
             }
-            if acoustic_text_dict_idx != -1:
+            if acoustic_dict is not None:
                 chitra_dict["acoustic_normalised_text"] = acoustic_normalised_text
         except Exception:
             continue
@@ -98,14 +55,14 @@ def convert_result_to_chitralekha_format(result, ann_id, project_type):
     )
     if (
         project_type == "AcousticNormalisedTranscriptionEditing"
-        and "standardised_transcription" in memory.keys()
-        and result[memory["standardised_transcription"]]["value"]["text"]
+        and standardised_transcription is not None
+        and standardised_transcription["value"]["text"]
     ):
         modified_result.append(
             {
-                "standardised_transcription": result[
-                    memory["standardised_transcription"]
-                ]["value"]["text"][0]
+                "standardised_transcription": standardised_transcription["value"][
+                    "text"
+                ][0]
             }
         )
 
@@ -21,7 +21,7 @@ def multi_inheritance_table_bulk_insert(data: List[M]) -> None:
 
     parent_objects = [
         parent_model(
-            **{field.name: getattr(obj, field.name) for field in parent_fields}
+            **{field.attname: getattr(obj, field.attname) for field in parent_fields}
         )
         for obj in data
     ]
@@ -1,12 +1,189 @@
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from django.conf import settings
 from mosestokenizer import MosesSentenceSplitter
 from indicnlp.tokenize import sentence_tokenize
 
+"""
+Sentence splitting of paragraphs
+
+English paragraphs are split by the Moses split-sentences.perl script. Its
+process is started once per language and process and kept running, every
+paragraph is written to the same pipe. Indic paragraphs are split by
+indicnlp, batches longer than SPLITTING_CHUNK_SIZE are split into chunks
+which are split on a process pool when more than one worker is allowed. The
+pool is started on first use and kept by the process, a broken pool is
+replaced on the next batch.
+
+Daemonic processes can't start a process pool, so the chunks are split in
+the calling process inside the workers of the default celery prefork pool.
+The fan-out needs a worker started with a non-prefork pool (--pool threads or
+solo) or a caller outside celery.
+
+Paragraphs of unsupported languages are split into None.
+"""
+
 INDIC = ["as", "bn", "gu", "hi", "kn", "ml", "mr", "or", "pa", "ta", "te"]
 
+SPLITTING_CHUNK_SIZE = 100
 
-def split_sentences(paragraph, language):
+_moses_splitters = {}
+_moses_splitters_lock = threading.Lock()
+
+# Process pool of the process which started it, by process id, as forked
+# processes can't use the pool of their parent
+_process_pool = None
+_process_pool_pid = None
+_process_pool_lock = threading.Lock()
+# Process which failed to start a pool, it doesn't try again
+_process_pool_failed_pid = None
+
+
+def get_moses_splitter(language):
+    """
+    Return the Moses sentence splitter of a language shared by the process
+    """
+    with _moses_splitters_lock:
+        if language not in _moses_splitters:
+            _moses_splitters[language] = MosesSentenceSplitter(language)
+        return _moses_splitters[language]
+
+
+def split_moses_paragraph(splitter, paragraph):
+    # Blank lines end a paragraph in split-sentences.perl, they would leave
+    # the output of the paragraph out of step with its input
+    lines = [line for line in paragraph.splitlines() if line.strip()]
+    try:
+        return splitter(lines)
+    except (BrokenPipeError, OSError):
+        splitter.restart()
+        return splitter(lines)
+
+
+def split_moses_paragraphs(paragraphs, language):
+    splitter = get_moses_splitter(language)
+    with _moses_splitters_lock:
+        return [split_moses_paragraph(splitter, paragraph) for paragraph in paragraphs]
+
+
+def split_indic_chunk(paragraphs, language):
+    return [
+        sentence_tokenize.sentence_split(paragraph, lang=language)
+        for paragraph in paragraphs
+    ]
+
+
+def get_process_pool(workers):
+    """
+    Return the process pool of the process with the given number of workers,
+    starting it on first use or when the number of workers changed
+    """
+    global _process_pool, _process_pool_pid
+    with _process_pool_lock:
+        if _process_pool_pid != os.getpid():
+            _process_pool = None
+        elif _process_pool is not None and _process_pool._max_workers != workers:
+            _process_pool.shutdown(wait=False)
+            _process_pool = None
+        if _process_pool is None:
+            _process_pool = ProcessPoolExecutor(max_workers=workers)
+            _process_pool_pid = os.getpid()
+        return _process_pool
+
+
+def can_start_process_pool():
+    return (
+        not multiprocessing.current_process().daemon
+        and _process_pool_failed_pid != os.getpid()
+    )
+
+
+def discard_process_pool(executor):
+    global _process_pool
+    with _process_pool_lock:
+        if _process_pool is executor:
+            _process_pool = None
+    executor.shutdown(wait=False)
+
+
+def split_indic_paragraphs(paragraphs, language, workers=None):
+    global _process_pool_failed_pid
+    if workers is None:
+        workers = settings.SENTENCE_SPLITTING_MAX_WORKERS
+    if (
+        workers > 1
+        and len(paragraphs) > SPLITTING_CHUNK_SIZE
+        and can_start_process_pool()
+    ):
+        chunks = [
+            paragraphs[i : i + SPLITTING_CHUNK_SIZE]
+            for i in range(0, len(paragraphs), SPLITTING_CHUNK_SIZE)
+        ]
+        executor = get_process_pool(workers)
+        try:
+            sentences = []
+            for chunk_sentences in executor.map(
+                split_indic_chunk, chunks, [language] * len(chunks)
+            ):
+                sentences.extend(chunk_sentences)
+            return sentences
+        except BrokenProcessPool as e:
+            print(f"Unable to split the paragraphs on a process pool. Error: {e}")
+            discard_process_pool(executor)
+        except (AssertionError, OSError) as e:
+            _process_pool_failed_pid = os.getpid()
+            print(
+                f"Unable to start a process pool, the paragraphs are split in the calling process. Error: {e}"
+            )
+            discard_process_pool(executor)
+    return split_indic_chunk(paragraphs, language)
+
+
+def split_paragraphs(paragraphs, language, workers=None):
+    """
+    Split paragraphs of the same language into sentences.
+
+    Args:
+        paragraphs (list): Paragraphs to split.
+        language (str): Language code of the paragraphs.
+        workers (int, optional): Processes splitting the Indic paragraphs,
+            SENTENCE_SPLITTING_MAX_WORKERS by default.
+
+    Returns:
+        list: Sentences of every paragraph, None for the paragraphs of an
+            unsupported language.
+    """
     if language == "en":
-        with MosesSentenceSplitter(language) as splitter:
-            return splitter([paragraph])
+        return split_moses_paragraphs(paragraphs, language)
     elif language in INDIC:
-        return sentence_tokenize.sentence_split(paragraph, lang=language)
+        return split_indic_paragraphs(paragraphs, language, workers)
+    return [None] * len(paragraphs)
+
+
+def split_sentences_by_language(paragraphs, languages, workers=None):
+    """
+    Split paragraphs in different languages into sentences, the paragraphs of
+    each language are split in one batch
+
+    Returns:
+        list: Sentences of every paragraph, in the order of the paragraphs.
+    """
+    indices_by_language = {}
+    for i, language in enumerate(languages):
+        indices_by_language.setdefault(language, []).append(i)
+    sentences = [None] * len(paragraphs)
+    for language, indices in indices_by_language.items():
+        language_sentences = split_paragraphs(
+            [paragraphs[i] for i in indices], language, workers
+        )
+        for i, paragraph_sentences in zip(indices, language_sentences):
+            sentences[i] = paragraph_sentences
+    return sentences
+
+
+def split_sentences(paragraph, language):
+    return split_paragraphs([paragraph], language)[0]
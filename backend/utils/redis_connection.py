@@ -0,0 +1,17 @@
+import os
+
+import redis
+
+_connection_pool = None
+
+
+def get_redis_connection():
+    """
+    Return a redis client backed by a connection pool shared by the process
+    """
+    global _connection_pool
+    if _connection_pool is None:
+        _connection_pool = redis.ConnectionPool(
+            host=os.getenv("REDIS_HOST"), port=os.getenv("REDIS_PORT"), db=0
+        )
+    return redis.StrictRedis(connection_pool=_connection_pool)
@@ -1,5 +1,10 @@
+import re
 from urllib.parse import unquote
 
+# Separators of the fields of a search text, they are removed from the values
+SEARCH_FIELD_SEPARATOR = "\x1f"
+SEARCH_VALUE_SEPARATOR = "\x1e"
+
 
 def parse_for_data_types(string: str):
     """
@@ -48,14 +53,71 @@ def flatten(to_flatten: dict, sep: str = "__") -> dict:
     return new_dict
 
 
+def get_search_values(data) -> dict:
+    """
+    Top level string and number values of data, the only values of data which
+    build_search_text writes
+    """
+    if not isinstance(data, dict):
+        return {}
+    return {
+        key: value
+        for key, value in data.items()
+        if isinstance(value, (str, int, float))
+    }
+
+
+def build_search_text(data: dict, fields: list) -> str:
+    """
+    Text of the string and number values of the given fields of data, matched
+    by process_search_query. The fields are written in sorted order, each one
+    as the field separator, the field name, the value separator and the value.
+    """
+    search_text = []
+    for field in sorted(set(fields)):
+        value = data.get(field)
+        if isinstance(value, bool) or not isinstance(value, (str, int, float)):
+            continue
+        value = (
+            str(value)
+            .replace(SEARCH_FIELD_SEPARATOR, " ")
+            .replace(SEARCH_VALUE_SEPARATOR, " ")
+        )
+        search_text.append(
+            f"{SEARCH_FIELD_SEPARATOR}{field}{SEARCH_VALUE_SEPARATOR}{value}"
+        )
+    return "".join(search_text)
+
+
+def get_search_text_regex(search_terms: dict) -> str:
+    """
+    Regular expression matching the search texts where the value of every
+    field of search_terms contains its term
+    """
+    return ".*".join(
+        f"{SEARCH_FIELD_SEPARATOR}{re.escape(field)}{SEARCH_VALUE_SEPARATOR}"
+        f"[^{SEARCH_FIELD_SEPARATOR}]*{re.escape(term)}"
+        for field, term in sorted(search_terms.items())
+    )
+
+
 def process_search_query(
-    query_dict: dict, search_field_name: str, searchable_fields: list
+    query_dict: dict,
+    search_field_name: str,
+    searchable_fields: list,
+    search_text_field_name: str = None,
+    search_text_fields: list = (),
 ) -> dict:
     """
     Extract the query params into a queryset dictionary.
+
+    String searches on the searchable fields which are in search_text_fields
+    are matched, with a single case insensitive regex, against the text built
+    by build_search_text stored in search_text_field_name.
     """
     parsed_value: any = None
     queryset_dict: dict = {}
+    search_terms: dict = {}
 
     print(query_dict)
 
@@ -64,7 +126,9 @@ def process_search_query(
             parsed_value = parse_for_data_types(j)
             print({i: j})
             if i in searchable_fields:
-                if type(parsed_value) == str:
+                if type(parsed_value) == str and i in search_text_fields:
+                    search_terms[i] = parsed_value
+                elif type(parsed_value) == str:
                     queryset_dict[
                         f"{search_field_name}__{i}__icontains"
                     ] = parsed_value  # Unaccent doesn't work as intended.
@@ -77,6 +141,10 @@ def process_search_query(
                     queryset_dict[
                         f"{i}__icontains"
                     ] = parsed_value  # Unaccent is not supported for CharField
+        if search_terms:
+            queryset_dict[f"{search_text_field_name}__iregex"] = get_search_text_regex(
+                search_terms
+            )
     except Exception as e:
         print(f"\033[1mError found while processing query dictionary. In: {e}\033[0m")
 
@@ -0,0 +1,101 @@
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from django.conf import settings
+from jiwer import wer
+from rapidfuzz.distance import Levenshtein
+from sacrebleu.metrics import BLEU
+
+"""
+Batch scoring of sentence pairs
+
+Every function takes two equally long lists of sentences and returns one score
+per pair, with None for the pairs which can't be scored. The scores are the
+ones of the sentenceoperation endpoints:
+
+- normalized character level edit distance: Levenshtein distance divided by
+  the length of the first sentence
+- BLEU: sacrebleu corpus BLEU of the first sentence against the second one
+- WER: jiwer word error rate of the second sentence against the first one, 0
+  when either of them is empty
+
+Lists longer than SCORING_CHUNK_SIZE are split into chunks which are scored on
+a process pool when more than one worker is allowed.
+"""
+
+SCORING_CHUNK_SIZE = 10000
+
+_bleu_metric = None
+
+
+def get_bleu_metric():
+    """
+    Return a BLEU metric shared by the process, it caches its tokenizer
+    """
+    global _bleu_metric
+    if _bleu_metric is None:
+        _bleu_metric = BLEU()
+    return _bleu_metric
+
+
+def normalized_edit_distance(sentence1, sentence2):
+    try:
+        return Levenshtein.distance(sentence1, sentence2) / len(sentence1)
+    except Exception as e:
+        return None
+
+
+def bleu_score(sentence1, sentence2):
+    try:
+        return get_bleu_metric().corpus_score([sentence1], [[sentence2]]).score
+    except Exception as e:
+        return None
+
+
+def word_error_rate(sentence1, sentence2):
+    try:
+        if len(sentence1) == 0 or len(sentence2) == 0:
+            return 0
+        return wer(sentence1, sentence2)
+    except Exception as e:
+        return None
+
+
+def score_chunk(scorer, pairs):
+    return [scorer(sentence1, sentence2) for sentence1, sentence2 in pairs]
+
+
+def score_pairs(scorer, sentences1, sentences2, workers=None):
+    if workers is None:
+        workers = settings.SCORING_MAX_WORKERS
+    pairs = list(zip(sentences1, sentences2))
+    if workers > 1 and len(pairs) > SCORING_CHUNK_SIZE:
+        chunks = [
+            pairs[i : i + SCORING_CHUNK_SIZE]
+            for i in range(0, len(pairs), SCORING_CHUNK_SIZE)
+        ]
+        try:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                scores = []
+                for chunk_scores in executor.map(
+                    score_chunk, [scorer] * len(chunks), chunks
+                ):
+                    scores.extend(chunk_scores)
+                return scores
+        except (AssertionError, OSError, BrokenProcessPool) as e:
+            # Daemonic processes, like the celery prefork workers, can't start
+            # a process pool
+            print(f"Unable to score the sentences on a process pool. Error: {e}")
+    return score_chunk(scorer, pairs)
+
+
+def normalized_edit_distances(sentences1, sentences2, workers=None):
+    return score_pairs(normalized_edit_distance, sentences1, sentences2, workers)
+
+
+def bleu_scores(sentences1, sentences2, workers=None):
+    return score_pairs(bleu_score, sentences1, sentences2, workers)
+
+
+def word_error_rates(sentences1, sentences2, workers=None):
+    return score_pairs(word_error_rate, sentences1, sentences2, workers)
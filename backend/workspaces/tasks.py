@@ -13,7 +13,9 @@ from tasks.models import (
     ANNOTATOR_ANNOTATION,
     REVIEWER_ANNOTATION,
     SUPER_CHECKER_ANNOTATION,
+    LABELED,
 )
+from tasks.annotation_stats import get_annotation_stats
 from .models import Workspace
 from users.models import User
 from projects.models import Project, ANNOTATION_STAGE, REVIEW_STAGE, SUPERCHECK_STAGE
@@ -51,23 +53,15 @@ def get_all_annotation_reports(
     email = user.email
     user_lang = user.languages
 
-    if not start_date:
-        submitted_tasks = Annotation.objects.filter(
-            annotation_status="labeled",
-            task__project_id__in=proj_ids,
-            annotation_type=ANNOTATOR_ANNOTATION,
-            completed_by=userid,
-        )
-    else:
-        submitted_tasks = Annotation.objects.filter(
-            annotation_status="labeled",
-            task__project_id__in=proj_ids,
-            annotation_type=ANNOTATOR_ANNOTATION,
-            completed_by=userid,
-            updated_at__range=[start_date, end_date],
-        )
-
-    submitted_tasks_count = submitted_tasks.count()
+    submitted_stats = get_annotation_stats(
+        proj_ids,
+        userid,
+        ANNOTATOR_ANNOTATION,
+        [LABELED],
+        start_date,
+        end_date,
+    )
+    submitted_tasks_count = submitted_stats["annotations_count"]
 
     project_type_lower = project_type.lower()
     is_translation_project = True if "translation" in project_type_lower else False
@@ -76,37 +70,17 @@ def get_all_annotation_reports(
         if project_type in ["ConversationTranslationEditing", "ConversationTranslation"]
         else False
     )
-    total_audio_duration_list = []
-    total_raw_audio_duration_list = []
-    total_word_count_list = []
-    only_tasks = False
-    if is_translation_project:
-        for anno in submitted_tasks:
-            try:
-                total_word_count_list.append(anno.task.data["word_count"])
-            except:
-                pass
-    elif "OCRTranscription" in project_type:
-        for anno in submitted_tasks:
-            total_word_count_list.append(ocr_word_count(anno.result))
-    elif (
-        project_type in get_audio_project_types() or project_type == "AllAudioProjects"
-    ):
-        for anno in submitted_tasks:
-            try:
-                total_audio_duration_list.append(
-                    get_audio_transcription_duration(anno.result)
-                )
-                total_raw_audio_duration_list.append(anno.task.data["audio_duration"])
-            except:
-                pass
-    else:
-        only_tasks = True
+    only_tasks = not (
+        is_translation_project
+        or "OCRTranscription" in project_type
+        or project_type in get_audio_project_types()
+        or project_type == "AllAudioProjects"
+    )
 
-    total_word_count = sum(total_word_count_list)
-    total_audio_duration = convert_seconds_to_hours(sum(total_audio_duration_list))
+    total_word_count = submitted_stats["word_count"]
+    total_audio_duration = convert_seconds_to_hours(submitted_stats["audio_duration"])
     total_raw_audio_duration = convert_seconds_to_hours(
-        sum(total_raw_audio_duration_list)
+        submitted_stats["raw_audio_duration"]
     )
 
     result = {
@@ -162,33 +136,20 @@ def get_all_review_reports(
     email = user.email
     user_lang = user.languages
 
-    if not start_date:
-        submitted_tasks = Annotation.objects.filter(
-            annotation_status__in=[
-                "accepted",
-                "to_be_revised",
-                "accepted_with_minor_changes",
-                "accepted_with_major_changes",
-            ],
-            task__project_id__in=proj_ids,
-            task__review_user=userid,
-            annotation_type=REVIEWER_ANNOTATION,
-        )
-    else:
-        submitted_tasks = Annotation.objects.filter(
-            annotation_status__in=[
-                "accepted",
-                "to_be_revised",
-                "accepted_with_minor_changes",
-                "accepted_with_major_changes",
-            ],
-            task__project_id__in=proj_ids,
-            task__review_user=userid,
-            annotation_type=REVIEWER_ANNOTATION,
-            updated_at__range=[start_date, end_date],
-        )
-
-    submitted_tasks_count = submitted_tasks.count()
+    submitted_stats = get_annotation_stats(
+        proj_ids,
+        userid,
+        REVIEWER_ANNOTATION,
+        [
+            "accepted",
+            "to_be_revised",
+            "accepted_with_minor_changes",
+            "accepted_with_major_changes",
+        ],
+        start_date,
+        end_date,
+    )
+    submitted_tasks_count = submitted_stats["annotations_count"]
 
     project_type_lower = project_type.lower()
     is_translation_project = True if "translation" in project_type_lower else False
@@ -197,36 +158,17 @@ def get_all_review_reports(
         if project_type in ["ConversationTranslationEditing", "ConversationTranslation"]
         else False
     )
-    total_audio_duration_list = []
-    total_raw_audio_duration_list = []
-    total_word_count_list = []
-    only_tasks = False
-    if is_translation_project:
-        for anno in submitted_tasks:
-            try:
-                total_word_count_list.append(anno.task.data["word_count"])
-            except:
-                pass
-    elif "OCRTranscription" in project_type:
-        for anno in submitted_tasks:
-            total_word_count_list.append(ocr_word_count(anno.result))
-    elif (
-        project_type in get_audio_project_types() or project_type == "AllAudioProjects"
-    ):
-        for anno in submitted_tasks:
-            try:
-                total_audio_duration_list.append(
-                    get_audio_transcription_duration(anno.result)
-                )
-                total_raw_audio_duration_list.append(anno.task.data["audio_duration"])
-            except:
-                pass
-    else:
-        only_tasks = True
-    total_word_count = sum(total_word_count_list)
-    total_audio_duration = convert_seconds_to_hours(sum(total_audio_duration_list))
+    only_tasks = not (
+        is_translation_project
+        or "OCRTranscription" in project_type
+        or project_type in get_audio_project_types()
+        or project_type == "AllAudioProjects"
+    )
+
+    total_word_count = submitted_stats["word_count"]
+    total_audio_duration = convert_seconds_to_hours(submitted_stats["audio_duration"])
     total_raw_audio_duration = convert_seconds_to_hours(
-        sum(total_raw_audio_duration_list)
+        submitted_stats["raw_audio_duration"]
     )
 
     result = {
@@ -277,23 +219,15 @@ def get_all_supercheck_reports(
     email = user.email
     user_lang = user.languages
 
-    if not start_date:
-        submitted_tasks = Annotation.objects.filter(
-            annotation_status__in=["validated", "validated_with_changes", "rejected"],
-            task__project_id__in=proj_ids,
-            task__super_check_user=userid,
-            annotation_type=SUPER_CHECKER_ANNOTATION,
-        )
-    else:
-        submitted_tasks = Annotation.objects.filter(
-            annotation_status__in=["validated", "validated_with_changes", "rejected"],
-            task__project_id__in=proj_ids,
-            task__super_check_user=userid,
-            annotation_type=SUPER_CHECKER_ANNOTATION,
-            updated_at__range=[start_date, end_date],
-        )
-
-    submitted_tasks_count = submitted_tasks.count()
+    validated_stats = get_annotation_stats(
+        proj_ids,
+        userid,
+        SUPER_CHECKER_ANNOTATION,
+        ["validated", "validated_with_changes", "rejected"],
+        start_date,
+        end_date,
+    )
+    submitted_tasks_count = validated_stats["annotations_count"]
 
     project_type_lower = project_type.lower()
     is_translation_project = True if "translation" in project_type_lower else False
@@ -302,41 +236,19 @@ def get_all_supercheck_reports(
         if project_type in ["ConversationTranslationEditing", "ConversationTranslation"]
         else False
     )
-    validated_word_count_list = []
-    validated_audio_duration_list = []
-    validated_raw_audio_duration_list = []
-    only_tasks = False
-    if is_translation_project:
-        for anno in submitted_tasks:
-            try:
-                validated_word_count_list.append(anno.task.data["word_count"])
-            except:
-                pass
-    elif "OCRTranscription" in project_type:
-        for anno in submitted_tasks:
-            validated_word_count_list.append(ocr_word_count(anno.result))
-    elif (
-        project_type in get_audio_project_types() or project_type == "AllAudioProjects"
-    ):
-        for anno in submitted_tasks:
-            try:
-                validated_audio_duration_list.append(
-                    get_audio_transcription_duration(anno.result)
-                )
-                validated_raw_audio_duration_list.append(
-                    anno.task.data["audio_duration"]
-                )
-            except:
-                pass
-    else:
-        only_tasks = True
+    only_tasks = not (
+        is_translation_project
+        or "OCRTranscription" in project_type
+        or project_type in get_audio_project_types()
+        or project_type == "AllAudioProjects"
+    )
 
-    validated_word_count = sum(validated_word_count_list)
+    validated_word_count = validated_stats["word_count"]
     validated_audio_duration = convert_seconds_to_hours(
-        sum(validated_audio_duration_list)
+        validated_stats["audio_duration"]
     )
     validated_raw_audio_duration = convert_seconds_to_hours(
-        sum(validated_raw_audio_duration_list)
+        validated_stats["raw_audio_duration"]
     )
 
     result = {
@@ -1617,64 +1529,53 @@ def un_pack_annotation_tasks(
         updated_at__range=[start_date, end_date],
         completed_by=each_annotation_user,
     )
-    labeled_annotation_ids = [ann.id for ann in labeled_annotations]
+    labeled_stats = get_annotation_stats(
+        proj_ids,
+        each_annotation_user,
+        ANNOTATOR_ANNOTATION,
+        [LABELED],
+        start_date,
+        end_date,
+    )
 
     reviewed_ann = (
         Annotation.objects.filter(
-            parent_annotation_id__in=labeled_annotation_ids,
+            parent_annotation__in=labeled_annotations,
             annotation_type=REVIEWER_ANNOTATION,
         )
         .exclude(annotation_status__in=["skipped", "draft"])
         .count()
     )
 
-    labeled = len(labeled_annotations) - reviewed_ann
+    labeled = labeled_stats["annotations_count"] - reviewed_ann
 
-    lead_time_annotated_tasks = [eachtask.lead_time for eachtask in labeled_annotations]
     avg_lead_time = 0
-    if len(lead_time_annotated_tasks) > 0:
-        avg_lead_time = sum(lead_time_annotated_tasks) / len(lead_time_annotated_tasks)
+    if labeled_stats["annotations_count"] > 0:
+        avg_lead_time = labeled_stats["lead_time"] / labeled_stats["annotations_count"]
     total_word_count = 0
-    if is_translation_project or project_type == "SemanticTextualSimilarity_Scale5":
-        total_word_count_list = []
-        for each_task in labeled_annotations:
-            try:
-                total_word_count_list.append(each_task.task.data["word_count"])
-            except:
-                pass
-
-        total_word_count = sum(total_word_count_list)
-    elif "OCRTranscription" in project_type:
-        total_word_count = 0
-        for each_anno in labeled_annotations:
-            total_word_count += ocr_word_count(each_anno.result)
+    if (
+        is_translation_project
+        or project_type == "SemanticTextualSimilarity_Scale5"
+        or "OCRTranscription" in project_type
+    ):
+        total_word_count = labeled_stats["word_count"]
 
     total_duration = "0:00:00"
     total_raw_duration = 0.0
     avg_segment_duration = 0
     avg_segments_per_task = 0
     if project_type in get_audio_project_types():
-        total_duration_list = []
-        total_raw_duration_list = []
-        total_audio_segments_list = []
-        for each_task in labeled_annotations:
-            try:
-                total_duration_list.append(
-                    get_audio_transcription_duration(each_task.result)
-                )
-                total_raw_duration_list.append(each_task.task.data["audio_duration"])
-                total_audio_segments_list.append(
-                    get_audio_segments_count(each_task.result)
-                )
-            except:
-                pass
-        total_duration = convert_seconds_to_hours(sum(total_duration_list))
-        total_raw_duration = convert_seconds_to_hours(sum(total_raw_duration_list))
-        total_audio_segments = sum(total_audio_segments_list)
+        total_duration = convert_seconds_to_hours(labeled_stats["audio_duration"])
+        total_raw_duration = convert_seconds_to_hours(
+            labeled_stats["raw_audio_duration"]
+        )
+        total_audio_segments = labeled_stats["audio_segments_count"]
         try:
-            avg_segment_duration = sum(total_duration_list) / total_audio_segments
-            avg_segments_per_task = total_audio_segments / len(
-                total_audio_segments_list
+            avg_segment_duration = (
+                labeled_stats["audio_duration"] / total_audio_segments
+            )
+            avg_segments_per_task = (
+                total_audio_segments / labeled_stats["annotations_count"]
             )
         except:
             avg_segment_duration = 0